@@ -9,15 +9,43 @@ GREEN='\033[0;32m'
 RED='\033[0;31m'
 NC='\033[0m' # No Color
 
+# Get the script directory
+SCRIPT_DIR="$( cd "$( dirname "${BASH_SOURCE[0]}" )" &> /dev/null && pwd )"
+
+# Ask pbxtool which subprojects changed since their last successful build
+# (see build-map.json). BUILD_ALL=1, or no python3, builds everything.
+pbxtool() {
+    (cd "$SCRIPT_DIR" && PYTHONPATH="$SCRIPT_DIR/ios-app" python3 -m pbxtool "$@")
+}
+
+AFFECTED="all"
+if [ -z "$BUILD_ALL" ] && command -v python3 &> /dev/null; then
+    AFFECTED=$(pbxtool affected --names 2>/dev/null) || AFFECTED="all"
+fi
+
+is_affected() {
+    [ "$AFFECTED" = "all" ] || echo "$AFFECTED" | grep -qx "$1"
+}
+
+record_built() {
+    command -v python3 &> /dev/null && pbxtool affected --record "$1" > /dev/null 2>&1
+}
+
 # Function to build a project
 build_project() {
     local project_name=$1
     local project_path=$2
+    local key=$3
     
     echo ""
     echo "Building $project_name..."
     echo "-------------------------"
     
+    if ! is_affected "$key"; then
+        echo -e "${GREEN}⏭  $project_name unchanged since its last build, skipped${NC}"
+        return
+    fi
+    
     if [ -d "$project_path" ]; then
         cd "$project_path"
         
@@ -32,6 +60,7 @@ build_project() {
         
         if [ $? -eq 0 ]; then
             echo -e "${GREEN}✓ $project_name built successfully${NC}"
+            record_built "$key"
         else
             echo -e "${RED}✗ $project_name build failed${NC}"
             exit 1
@@ -42,14 +71,39 @@ build_project() {
     fi
 }
 
-# Get the script directory
-SCRIPT_DIR="$( cd "$( dirname "${BASH_SOURCE[0]}" )" &> /dev/null && pwd )"
+# With python3, pbxtool runs the steps of build-map.json in parallel and
+# restores outputs whose inputs it has built before; BUILD_SEQUENTIAL=1
+# keeps the plain sequential build below.
+if [ -z "$BUILD_SEQUENTIAL" ] && command -v python3 &> /dev/null; then
+    echo ""
+    if ! pbxtool build ${BUILD_ALL:+--force} ${BUILD_JOBS:+--jobs "$BUILD_JOBS"}; then
+        echo -e "${RED}✗ Build failed${NC}"
+        exit 1
+    fi
+else
+    # Build client dashboard
+    build_project "Client Dashboard" "$SCRIPT_DIR/client-dashboard" client-dashboard
 
-# Build client dashboard
-build_project "Client Dashboard" "$SCRIPT_DIR/client-dashboard"
+    # Build company dashboard
+    build_project "Company Dashboard" "$SCRIPT_DIR/company-dashboard" company-dashboard
 
-# Build company dashboard
-build_project "Company Dashboard" "$SCRIPT_DIR/company-dashboard"
+    # Build the iOS app, only where Xcode is available and only if a compiled file changed
+    echo ""
+    echo "Building iOS App..."
+    echo "-------------------------"
+    if ! is_affected ios-app; then
+        echo -e "${GREEN}⏭  iOS App unchanged since its last build, skipped${NC}"
+    elif ! command -v xcodebuild &> /dev/null; then
+        echo "⏭  iOS App changed, but xcodebuild is not available here (macOS only)"
+    elif (cd "$SCRIPT_DIR/ios-app" && xcodebuild build -project Inventry.xcodeproj -scheme Inventry \
+            -destination 'generic/platform=iOS Simulator' -quiet); then
+        echo -e "${GREEN}✓ iOS App built successfully${NC}"
+        record_built ios-app
+    else
+        echo -e "${RED}✗ iOS App build failed${NC}"
+        exit 1
+    fi
+fi
 
 echo ""
 echo "================================="
@@ -0,0 +1,15 @@
+"""
+Shared tooling for reading and editing Inventry.xcodeproj/project.pbxproj
+"""
+from .manifest import ManifestError, load_manifest
+from .parser import PBXParseError, parse
+from .project import Project, load, resolve_path
+from .serializer import dump, dumps
+from .snapshots import SnapshotError, SnapshotStore
+from .transaction import MissingAnchorError, ProjectTransaction
+from .writer import save
+
+__all__ = [
+    'ManifestError', 'MissingAnchorError', 'PBXParseError', 'Project', 'ProjectTransaction',
+    'SnapshotError', 'SnapshotStore', 'dump', 'dumps', 'load', 'load_manifest', 'parse', 'resolve_path', 'save',
+]
@@ -0,0 +1,239 @@
+"""
+Change-impact analysis: which subprojects of the repository a change touches.
+
+build-map.json at the repository root lists each subproject's inputs as
+fnmatch patterns over repository paths (* crosses directories), plus
+patterns to ignore:
+
+    {
+      "client-dashboard": {"inputs": ["client-dashboard/*", "shared/*"], "ignore": ["*.md"]},
+      "ios-app": {"inputs": ["ios-app/Inventry/*", "..."], "xcodeproj": "ios-app/Inventry.xcodeproj"}
+    }
+
+For a subproject with an "xcodeproj", a matching file next to the project
+only counts if the project builds it: it is in a build phase of some target
+(or inside a folder that is, such as an asset catalog), or it is a target's
+Info.plist or entitlements. Files that are on disk but not compiled
+(RoomDetailView_Old.swift, notes, scripts) never trigger an iOS build.
+
+Changes come from a list of paths, from a git diff, or from comparing each
+subproject's input tree against the one recorded after its last successful
+build in .pbxtool-cache/affected.json. An input tree is the set of
+(path, git blob ID) pairs of its inputs, working-tree edits included, so
+the comparison costs one `git ls-files` plus hashing the files git sees as
+modified.
+"""
+import fnmatch
+import hashlib
+import json
+import os
+import posixpath
+import subprocess
+
+from . import profile
+from .cache import CACHE_DIR
+from .project import load
+from .writer import replace_file
+
+MAP_FILE = 'build-map.json'
+STATE_FILE = 'affected.json'
+
+# Build settings naming files a target reads without listing them in a phase
+_SETTING_FILES = ('INFOPLIST_FILE', 'CODE_SIGN_ENTITLEMENTS')
+
+
+class BuildMapError(ValueError):
+    """build-map.json is missing or malformed"""
+
+
+def _git(root, *args, stdin=None):
+    result = subprocess.run(['git', '-C', root, *args], input=stdin, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise OSError(f"git {args[0]} failed: {result.stderr.strip()}")
+    return result.stdout
+
+
+def repo_root(start='.'):
+    return _git(start, 'rev-parse', '--show-toplevel').strip()
+
+
+def load_map(root):
+    path = os.path.join(root, MAP_FILE)
+    try:
+        with open(path, encoding='utf-8') as f:
+            build_map = json.load(f)
+    except (OSError, ValueError) as e:
+        raise BuildMapError(f"Cannot read {path}: {e}") from None
+    for name, entry in build_map.items():
+        if not isinstance(entry, dict) or not isinstance(entry.get('inputs'), list):
+            raise BuildMapError(f"{MAP_FILE}: {name} needs an \"inputs\" list")
+    return build_map
+
+
+def _matches(path, patterns):
+    return any(fnmatch.fnmatchcase(path, pattern) for pattern in patterns)
+
+
+def _setting_path(value, base):
+    for prefix in ('$(SRCROOT)/', '${SRCROOT}/', '$(PROJECT_DIR)/', '${PROJECT_DIR}/'):
+        if value.startswith(prefix):
+            value = value[len(prefix):]
+    return None if '$' in value else posixpath.normpath(posixpath.join(base, value))
+
+
+def built_paths(root, xcodeproj):
+    """
+    Repository paths of everything the project builds: files and folders in
+    any target's build phases, and the files named by _SETTING_FILES
+    """
+    project = load(os.path.join(root, xcodeproj), cache=True)
+    base = posixpath.dirname(xcodeproj)
+    locations = project.locations()
+    built = set()
+    for _, target in project.targets():
+        for phase_id in target.get('buildPhases', []):
+            for build_id in project.objects.get(phase_id, {}).get('files', []):
+                ref = project.objects.get(build_id, {}).get('fileRef')
+                if ref in locations:
+                    built.add(posixpath.join(base, locations[ref]))
+        config_list = project.objects.get(target.get('buildConfigurationList'), {})
+        for config_id in config_list.get('buildConfigurations', []):
+            settings = project.objects.get(config_id, {}).get('buildSettings', {})
+            for key in _SETTING_FILES:
+                if isinstance(settings.get(key), str):
+                    path = _setting_path(settings[key], base)
+                    if path:
+                        built.add(path)
+    return built
+
+
+class _Scope:
+    """Decides whether a repository path is an input of one subproject"""
+
+    def __init__(self, root, name, entry):
+        self.name = name
+        self.inputs = entry['inputs']
+        self.ignore = entry.get('ignore', [])
+        self.xcodeproj = entry.get('xcodeproj')
+        self.root = root
+        self._built = None
+
+    def __contains__(self, path):
+        if not _matches(path, self.inputs) or _matches(path, self.ignore):
+            return False
+        if self.xcodeproj is None or path.startswith(self.xcodeproj + '/'):
+            return True
+        if self._built is None:
+            self._built = built_paths(self.root, self.xcodeproj)
+        # The file itself, or a folder holding it (an .xcassets, an .xcdatamodeld ...)
+        while path and path != '.':
+            if path in self._built:
+                return True
+            path = posixpath.dirname(path)
+        return False
+
+
+def _scopes(root, build_map):
+    return [_Scope(root, name, entry) for name, entry in build_map.items()]
+
+
+def affected_by(paths, root, build_map):
+    """{subproject: [the given paths it is affected by]}, for subprojects affected by any"""
+    result = {}
+    for scope in _scopes(root, build_map):
+        hits = [path for path in paths if path in scope]
+        if hits:
+            result[scope.name] = hits
+    return result
+
+
+def changed_since(root, rev):
+    """Paths that differ between rev and the working tree, untracked files included"""
+    changed = _git(root, 'diff', '--name-only', '--no-renames', rev, '--').splitlines()
+    changed += _git(root, 'ls-files', '--others', '--exclude-standard').splitlines()
+    return sorted(set(changed))
+
+
+def tree_blobs(root):
+    """
+    {path: git blob ID} of every tracked and untracked (not ignored) file as
+    it is in the working tree, deleted files left out
+    """
+    with profile.phase('affected.blobs') as p:
+        blobs = _tree_blobs(root)
+        p.add(files=len(blobs))
+    return blobs
+
+
+def _tree_blobs(root):
+    blobs = {}
+    for line in _git(root, 'ls-files', '--stage').splitlines():
+        meta, path = line.split('\t', 1)
+        blobs[path] = meta.split()[1]
+    dirty = _git(root, 'ls-files', '--modified', '--others', '--exclude-standard').splitlines()
+    dirty = sorted(set(dirty))
+    present = [path for path in dirty if os.path.isfile(os.path.join(root, path))]
+    for path in set(dirty) - set(present):
+        blobs.pop(path, None)
+    if present:
+        hashes = _git(root, 'hash-object', '--stdin-paths', stdin='\n'.join(present) + '\n').split()
+        blobs.update(zip(present, hashes))
+    return blobs
+
+
+def input_tree(scope, blobs):
+    """{path: blob ID} of the subproject's inputs, and a digest of the whole set"""
+    inputs = {path: blob for path, blob in blobs.items() if path in scope}
+    h = hashlib.sha256()
+    for path in sorted(inputs):
+        h.update(f"{path}\0{inputs[path]}\n".encode('utf-8'))
+    return inputs, h.hexdigest()
+
+
+def _state_path(root):
+    return os.path.join(root, CACHE_DIR, STATE_FILE)
+
+
+def _read_state(root):
+    try:
+        with open(_state_path(root), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def status(root, build_map, names=None):
+    """
+    Compare each subproject's input tree with the one recorded by its last
+    successful build. Returns {name: (digest, changed paths)}; changed is
+    None for a subproject never built and empty for one that is up to date.
+    """
+    state = _read_state(root)
+    blobs = tree_blobs(root)
+    result = {}
+    for scope in _scopes(root, build_map):
+        if names and scope.name not in names:
+            continue
+        inputs, tree = input_tree(scope, blobs)
+        recorded = state.get(scope.name)
+        if recorded is None:
+            result[scope.name] = (tree, None)
+        elif recorded['tree'] == tree:
+            result[scope.name] = (tree, [])
+        else:
+            before = recorded['inputs']
+            result[scope.name] = (tree, sorted(path for path in inputs.keys() | before.keys()
+                                               if inputs.get(path) != before.get(path)))
+    return result
+
+
+def record(root, build_map, names):
+    """Remember the current input trees of names as successfully built"""
+    state = _read_state(root)
+    blobs = tree_blobs(root)
+    for scope in _scopes(root, build_map):
+        if scope.name in names:
+            inputs, tree = input_tree(scope, blobs)
+            state[scope.name] = {'tree': tree, 'inputs': inputs}
+    os.makedirs(os.path.dirname(_state_path(root)), exist_ok=True)
+    replace_file(_state_path(root), [json.dumps(state, indent=1, sort_keys=True).encode('utf-8')], durable=False)
@@ -0,0 +1,106 @@
+"""
+One manifest applied to many projects: the branded copies of Inventry.xcodeproj.
+
+    python3 -m pbxtool batch manifests/services.json 'Brands/*/Inventry.xcodeproj'
+
+Each project is one task in a process pool: one lazy load, the manifest's
+delta planned against it, and one write (none when it already matches).
+The manifest is read once, in the parent. A project whose group, target
+or build phase is missing fails on its own, untouched, as does one that
+cannot be read or edited for any other reason; the others go ahead. Missing
+groups are only created with create_groups=True. Every project gets a
+Result, in the order the patterns named them.
+"""
+import glob
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from . import profile
+from .manifest import apply
+from .project import PROJECT_FILE
+
+CHANGED = 'changed'
+UNCHANGED = 'unchanged'
+PLANNED = 'planned'      # dry run with edits to make
+FAILED = 'failed'
+
+
+class Result:
+    def __init__(self, project):
+        self.project = project
+        self.status = None
+        self.changes = []
+        self.error = None
+        self.seconds = 0.0
+
+
+def expand(patterns):
+    """The .xcodeproj folders the glob patterns match, each once, in pattern order"""
+    projects, seen = [], set()
+    for pattern in patterns:
+        for path in sorted(glob.glob(pattern, recursive=True)):
+            path = os.path.normpath(path)
+            if os.path.basename(path) == PROJECT_FILE:
+                path = os.path.dirname(path)
+            if not path.endswith('.xcodeproj') or not os.path.isfile(os.path.join(path, PROJECT_FILE)):
+                continue
+            if os.path.abspath(path) not in seen:
+                seen.add(os.path.abspath(path))
+                projects.append(path)
+    return projects
+
+
+def _run(task):
+    """Worker: apply the manifest to one project"""
+    project, manifest, target, dry_run, deterministic, snapshot, create_groups, label = task
+    started = time.perf_counter()
+    result = Result(project)
+    try:
+        result.changes = apply(project, manifest, target=target, dry_run=dry_run, deterministic=deterministic,
+                               label=label, cache=False, snapshot=snapshot, create_groups=create_groups)
+        result.status = (PLANNED if dry_run else CHANGED) if result.changes else UNCHANGED
+    except Exception as e:  # a malformed project fails on its own rather than aborting the batch
+        result.status, result.error = FAILED, f"{type(e).__name__}: {e}"
+    result.seconds = time.perf_counter() - started
+    return result
+
+
+def _run_profiled(task):
+    """Worker: _run() with its phases recorded, for the parent to merge into its profile"""
+    return profile.recorded(_run, task)
+
+
+def run(projects, manifest, target=None, jobs=None, dry_run=False, deterministic=False, snapshot=None,
+        create_groups=False, label='pbxtool batch'):
+    """Apply manifest (as load_manifest() returns it) to every project; returns their Results"""
+    tasks = [(project, manifest, target, dry_run, deterministic, snapshot, create_groups, label)
+             for project in projects]
+    with profile.phase('batch', projects=len(tasks)):
+        if len(tasks) > 1 and jobs != 1:
+            with ProcessPoolExecutor(min(jobs or os.cpu_count() or 1, len(tasks))) as pool:
+                if not profile.enabled():
+                    return list(pool.map(_run, tasks))
+                results = []
+                for result, events in pool.map(_run_profiled, tasks):
+                    profile.merge(events)
+                    results.append(result)
+                return results
+        return [_run(task) for task in tasks]
+
+
+def report(results, wall):
+    """The per-project table printed after a batch"""
+    width = max([len(result.project) for result in results] + [7])
+    lines = [f"{'project':<{width}}  {'status':<9}  {'edits':>5}  {'time':>7}"]
+    for result in results:
+        lines.append(f"{result.project:<{width}}  {result.status:<9}  {len(result.changes):>5}  "
+                     f"{result.seconds:6.2f}s")
+    counts = {}
+    for result in results:
+        counts[result.status] = counts.get(result.status, 0) + 1
+    busy = sum(result.seconds for result in results)
+    summary = ', '.join(f"{count} {status}" for status, count in counts.items())
+    lines.append(f"{len(results)} projects ({summary}) in {wall:.2f} s wall, {busy:.2f} s of project time"
+                 + (f" ({busy / wall:.1f}x in parallel)" if wall > 0 and busy > wall * 1.05 else ""))
+    return lines
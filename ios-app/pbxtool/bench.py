@@ -0,0 +1,313 @@
+"""
+Benchmarks for pbxtool against synthetic projects shaped like Inventry.xcodeproj.
+
+    python3 -m pbxtool bench                       # 1k, 10k and 100k files
+    python3 -m pbxtool bench --sizes 1000,10000
+    python3 -m pbxtool bench --save-baseline       # record benchmarks/pbxtool-baseline.json
+
+Each operation runs on a fresh copy of the generated project. Times are the
+best of --repeat runs; peak memory is measured in a separate run with
+tracemalloc (Python allocations only, so the mmap'd file is not counted).
+The legacy_* operations replay what the original one-off scripts did (find
+and splice section ends, DOTALL regexes over group and phase bodies, one
+content.replace per literal line) as a baseline.
+"""
+import os
+import platform
+import re
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+from .ids import IdAllocator
+from .project import Project, load
+from .serializer import dumps
+from .transaction import ProjectTransaction
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+BASELINE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                        'benchmarks', 'pbxtool-baseline.json')
+TOP_GROUPS = ('Views', 'Models', 'Services', 'Data')
+GROUP_SIZE = 50
+EDIT_COUNT = 10
+
+
+def generate(files):
+    """
+    Return the text of a project with the given number of Swift files spread
+    over Inventry/{Views,Models,Services,Data}/FeatureNNN groups of
+    GROUP_SIZE files, each with a build file in the Sources phase.
+    """
+    ids = IdAllocator(deterministic=True)
+    objects = {}
+
+    def add(obj, *key):
+        oid = ids.allocate(obj['isa'], *key)
+        objects[oid] = obj
+        return oid
+
+    def group(key, children, **extra):
+        return add(dict(isa='PBXGroup', children=children, sourceTree='<group>', **extra), key)
+
+    def configuration(owner, name, settings):
+        return add({'isa': 'XCBuildConfiguration', 'buildSettings': settings, 'name': name}, owner, name)
+
+    sources, top = [], []
+    for index, top_name in enumerate(TOP_GROUPS):
+        count = files // len(TOP_GROUPS) + (index < files % len(TOP_GROUPS))
+        features = []
+        for start in range(0, count, GROUP_SIZE):
+            feature = f'Feature{start // GROUP_SIZE:03d}'
+            children = []
+            for i in range(start, min(start + GROUP_SIZE, count)):
+                name = f'{top_name[:-1]}{i:06d}.swift'
+                path = f'Inventry/{top_name}/{feature}/{name}'
+                ref = add({'isa': 'PBXFileReference', 'lastKnownFileType': 'sourcecode.swift',
+                           'path': name, 'sourceTree': '<group>'}, path)
+                children.append(ref)
+                sources.append(add({'isa': 'PBXBuildFile', 'fileRef': ref}, 'Synth', 'Sources', path))
+            features.append(group(f'Inventry/{top_name}/{feature}', children, path=feature))
+        top.append(group(f'Inventry/{top_name}', features, path=top_name))
+
+    assets = add({'isa': 'PBXFileReference', 'lastKnownFileType': 'folder.assetcatalog',
+                  'path': 'Assets.xcassets', 'sourceTree': '<group>'}, 'Inventry/Assets.xcassets')
+    app = add({'isa': 'PBXFileReference', 'explicitFileType': 'wrapper.application', 'includeInIndex': '0',
+               'path': 'Synth.app', 'sourceTree': 'BUILT_PRODUCTS_DIR'}, 'Synth.app')
+    inventry = group('Inventry', [assets] + top, path='Inventry')
+    products = group('Products', [app], name='Products')
+    main = group('', [inventry, products])
+
+    phase = {'buildActionMask': '2147483647', 'runOnlyForDeploymentPostprocessing': '0'}
+    sources_phase = add(dict(isa='PBXSourcesBuildPhase', files=sources, **phase), 'Sources')
+    frameworks_phase = add(dict(isa='PBXFrameworksBuildPhase', files=[], **phase), 'Frameworks')
+    resources_phase = add(dict(isa='PBXResourcesBuildPhase', files=[
+        add({'isa': 'PBXBuildFile', 'fileRef': assets}, 'Synth', 'Resources', 'Assets.xcassets')], **phase),
+        'Resources')
+
+    settings = {'PRODUCT_BUNDLE_IDENTIFIER': 'com.example.synth', 'PRODUCT_NAME': '$(TARGET_NAME)',
+                'SWIFT_VERSION': '5.0', 'IPHONEOS_DEPLOYMENT_TARGET': '17.0'}
+    lists = {}
+    for owner in ('project', 'target'):
+        lists[owner] = add({'isa': 'XCConfigurationList',
+                            'buildConfigurations': [configuration(owner, name, dict(settings))
+                                                    for name in ('Debug', 'Release')],
+                            'defaultConfigurationIsVisible': '0', 'defaultConfigurationName': 'Release'},
+                           owner)
+    target = add({'isa': 'PBXNativeTarget', 'buildConfigurationList': lists['target'],
+                  'buildPhases': [sources_phase, frameworks_phase, resources_phase],
+                  'buildRules': [], 'dependencies': [], 'name': 'Synth', 'productName': 'Synth',
+                  'productReference': app, 'productType': 'com.apple.product-type.application'}, 'Synth')
+    root_object = add({'isa': 'PBXProject', 'attributes': {'LastUpgradeCheck': '1540'},
+                       'buildConfigurationList': lists['project'], 'compatibilityVersion': 'Xcode 14.0',
+                       'developmentRegion': 'en', 'hasScannedForEncodings': '0', 'knownRegions': ['en', 'Base'],
+                       'mainGroup': main, 'productRefGroup': products, 'projectDirPath': '',
+                       'projectRoot': '', 'targets': [target]}, 'project')
+    root = {'archiveVersion': '1', 'classes': {}, 'objectVersion': '56', 'objects': objects,
+            'rootObject': root_object}
+    return dumps(Project(root, 'Synth.xcodeproj/project.pbxproj'))
+
+
+# -- operations ---------------------------------------------------------
+#
+# Each takes (path, fixture) where fixture holds IDs and names looked up once,
+# untimed, from the generated project.
+
+def _fixture(path):
+    project = load(path)
+    services = project.group('Inventry/Services')
+    feature = project.objects[services]['children'][0]
+    refs = project.objects[feature]['children'][:EDIT_COUNT]
+    sources = project.build_phase(project.target())
+    fixture = {
+        'services': services,
+        'sources': sources,
+        'inventry': project.group('Inventry'),
+        'remove': [(project.objects[ref]['path'], ref, project.build_files_for(ref, sources)[0]) for ref in refs],
+        'feature_path': f"Inventry/Services/{project.objects[feature]['path']}",
+    }
+    project.buffer.close()
+    return fixture
+
+
+def _new_names(prefix):
+    return [f'{prefix}{i:03d}.swift' for i in range(EDIT_COUNT)]
+
+
+def op_parse(path, fixture):
+    load(path).buffer.close()
+
+
+def op_serialize(path, fixture):
+    project = load(path)
+    dumps(project)
+    project.buffer.close()
+
+
+def op_add(path, fixture):
+    with ProjectTransaction(path, snapshot=False) as tx:
+        for name in _new_names('Added'):
+            tx.add_file(f'Inventry/Services/{name}')
+    tx.project.buffer.close()
+
+
+def op_remove(path, fixture):
+    with ProjectTransaction(path, snapshot=False) as tx:
+        for name, _, _ in fixture['remove']:
+            tx.remove_file(f"{fixture['feature_path']}/{name}")
+    tx.project.buffer.close()
+
+
+def op_group(path, fixture):
+    with ProjectTransaction(path, snapshot=False) as tx:
+        for name in _new_names('Grouped'):
+            tx.add_file(f'Inventry/Bench/{name}')
+    tx.project.buffer.close()
+
+
+def _legacy_id():
+    return IdAllocator().allocate()
+
+
+def _legacy_insert_objects(content, names):
+    """PBXBuildFile and PBXFileReference lines spliced in before each section's End marker"""
+    refs = {name: _legacy_id() for name in names}
+    builds = {name: _legacy_id() for name in names}
+    lines = [f"\t\t{builds[n]} /* {n} in Sources */ = {{isa = PBXBuildFile; fileRef = {refs[n]} /* {n} */; }};"
+             for n in names]
+    pos = content.find('/* End PBXBuildFile section */')
+    content = content[:pos] + "\n" + "\n".join(lines) + "\n" + content[pos:]
+    lines = [f"\t\t{refs[n]} /* {n} */ = {{isa = PBXFileReference; lastKnownFileType = sourcecode.swift; "
+             f"path = {n}; sourceTree = \"<group>\"; }};" for n in names]
+    pos = content.find('/* End PBXFileReference section */')
+    content = content[:pos] + "\n" + "\n".join(lines) + "\n" + content[pos:]
+    return content, refs, builds
+
+
+def _legacy_append(content, pattern, lines):
+    return re.sub(pattern, lambda m: m.group(1) + "\n" + "\n".join(lines) + "\n" + m.group(2),
+                  content, flags=re.DOTALL)
+
+
+def _legacy_add_to_sources(content, fixture, names, builds):
+    sources = rf"({fixture['sources']} /\* Sources \*/ = \{{[^}}]+files = \([^)]*?)((\s*\);.+?runOnlyForDeploymentPostprocessing = 0;))"
+    return _legacy_append(content, sources, [f"\t\t\t\t{builds[n]} /* {n} in Sources */," for n in names])
+
+
+def op_legacy_add(path, fixture):
+    with open(path) as f:
+        content = f.read()
+    names = _new_names('Added')
+    content, refs, builds = _legacy_insert_objects(content, names)
+    services = rf"({fixture['services']} /\* Services \*/ = \{{[^}}]+children = \([^)]*?)((\s*\);.+?sourceTree = \"<group>\";))"
+    content = _legacy_append(content, services, [f"\t\t\t\t{refs[n]} /* {n} */," for n in names])
+    content = _legacy_add_to_sources(content, fixture, names, builds)
+    with open(path, 'w') as f:
+        f.write(content)
+
+
+def op_legacy_remove(path, fixture):
+    with open(path) as f:
+        content = f.read()
+    for name, ref, build in fixture['remove']:
+        content = content.replace(f"\t\t{build} /* {name} in Sources */ = {{isa = PBXBuildFile; fileRef = {ref} /* {name} */; }};\n", '')
+        content = content.replace(f"\t\t{ref} /* {name} */ = {{isa = PBXFileReference; lastKnownFileType = sourcecode.swift; path = {name}; sourceTree = \"<group>\"; }};\n", '')
+        content = content.replace(f"\t\t\t\t{ref} /* {name} */,\n", '')
+        content = content.replace(f"\t\t\t\t{build} /* {name} in Sources */,\n", '')
+    with open(path, 'w') as f:
+        f.write(content)
+
+
+def op_legacy_group(path, fixture):
+    with open(path) as f:
+        content = f.read()
+    names = _new_names('Grouped')
+    content, refs, builds = _legacy_insert_objects(content, names)
+    group_id = _legacy_id()
+    inventry = rf"({fixture['inventry']} /\* Inventry \*/ = \{{[^}}]+children = \(\s*[^)]*?)(\s*\);\s*path = Inventry;)"
+    content = re.sub(inventry, lambda m: m.group(1) + f"\n\t\t\t\t{group_id} /* Bench */," + m.group(2),
+                     content, flags=re.DOTALL)
+    children = "\n".join(f"\t\t\t\t{refs[n]} /* {n} */," for n in names)
+    definition = (f"\n\t\t{group_id} /* Bench */ = {{\n\t\t\tisa = PBXGroup;\n\t\t\tchildren = (\n{children}\n"
+                  f"\t\t\t);\n\t\t\tpath = Bench;\n\t\t\tsourceTree = \"<group>\";\n\t\t}};")
+    end = content.find('path = Services;\n\t\t\tsourceTree = "<group>";\n\t\t};')
+    pos = content.find('\n', end + 50)
+    content = content[:pos] + definition + content[pos:]
+    content = _legacy_add_to_sources(content, fixture, names, builds)
+    with open(path, 'w') as f:
+        f.write(content)
+
+
+OPERATIONS = {
+    'parse': op_parse,
+    'serialize': op_serialize,
+    'add': op_add,
+    'remove': op_remove,
+    'group': op_group,
+    'legacy_add': op_legacy_add,
+    'legacy_remove': op_legacy_remove,
+    'legacy_group': op_legacy_group,
+}
+
+
+# -- runner -------------------------------------------------------------
+
+def _measure(operation, source, fixture, workdir, repeat):
+    target = os.path.join(workdir, 'Run.xcodeproj', 'project.pbxproj')
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    best = None
+    for _ in range(repeat):
+        shutil.copyfile(source, target)
+        start = time.perf_counter()
+        operation(target, fixture)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    shutil.copyfile(source, target)
+    tracemalloc.start()
+    try:
+        operation(target, fixture)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+
+def run(sizes=DEFAULT_SIZES, operations=None, repeat=3, log=None):
+    """Run the benchmarks and return a JSON-serializable report"""
+    report = {'python': platform.python_version(), 'machine': platform.machine(), 'results': {}}
+    with tempfile.TemporaryDirectory(prefix='pbxtool-bench-') as workdir:
+        for size in sizes:
+            source = os.path.join(workdir, 'Synth.xcodeproj', 'project.pbxproj')
+            os.makedirs(os.path.dirname(source), exist_ok=True)
+            with open(source, 'w', encoding='utf-8') as f:
+                f.write(generate(size))
+            nbytes = os.path.getsize(source)
+            fixture = _fixture(source)
+            results = report['results'][str(size)] = {'bytes': nbytes}
+            for name in operations or OPERATIONS:
+                seconds, peak = _measure(OPERATIONS[name], source, fixture, workdir, repeat)
+                results[name] = {
+                    'seconds': round(seconds, 6),
+                    'mb_per_s': round(nbytes / seconds / 1e6, 2),
+                    'peak_mb': round(peak / 1e6, 3),
+                }
+                if log:
+                    log(size, name, results[name])
+    return report
+
+
+def compare(report, baseline, tolerance=0.5, memory_tolerance=0.2):
+    """Return a list of regressions of report against baseline (both as returned by run())"""
+    regressions = []
+    for size, results in report['results'].items():
+        for name, current in results.items():
+            previous = baseline.get('results', {}).get(size, {}).get(name)
+            if not isinstance(previous, dict):
+                continue
+            if current['seconds'] > previous['seconds'] * (1 + tolerance):
+                regressions.append(f"{name} @ {size} files: {current['seconds'] * 1e3:.1f} ms, "
+                                   f"baseline {previous['seconds'] * 1e3:.1f} ms")
+            if current['peak_mb'] > previous['peak_mb'] * (1 + memory_tolerance) + 0.1:
+                regressions.append(f"{name} @ {size} files: peak {current['peak_mb']:.1f} MB, "
+                                   f"baseline {previous['peak_mb']:.1f} MB")
+    return regressions
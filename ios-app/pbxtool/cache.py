@@ -0,0 +1,106 @@
+"""
+Persistent parse cache: the parsed object graph and Layout of a project,
+marshalled into .pbxtool-cache/ next to the .xcodeproj.
+
+An entry is keyed by the size, mtime and inode of project.pbxproj and by
+a BLAKE2b digest of its content. When size, mtime and inode all match, the
+entry is used without reading the file. When only the stat changed (a
+checkout or touch that rewrote the same bytes), the content is hashed and
+the entry is still used if the digest matches. Anything else is a miss:
+the file is parsed and the entry rewritten.
+"""
+import hashlib
+import marshal
+import mmap
+import os
+import struct
+import sys
+
+from . import profile
+from .parser import Layout, PBXParseError, parse_layout
+from .records import pack_objects, unpack_objects
+from .writer import replace_file
+
+CACHE_DIR = '.pbxtool-cache'
+_MAGIC = b'PBXC'
+_VERSION = 3
+# magic, cache version, Python major/minor (marshal is version-specific), size, mtime_ns, inode, digest
+_HEADER = struct.Struct('<4s3BQqQ20s')
+
+
+def cache_path(pbxproj, prefix, suffix):
+    """Path of a per-project cache file, e.g. .pbxtool-cache/sync-Inventry.xcodeproj.json"""
+    xcodeproj = os.path.dirname(os.path.abspath(pbxproj))
+    return os.path.join(os.path.dirname(xcodeproj), CACHE_DIR,
+                        prefix + os.path.basename(xcodeproj) + suffix)
+
+
+def digest(buffer):
+    """Content digest used to tell whether project.pbxproj really changed"""
+    return hashlib.blake2b(buffer, digest_size=20).digest()
+
+
+def _stamp(st):
+    return st.st_size, st.st_mtime_ns, st.st_ino
+
+
+def _read(path, st, buffer):
+    """Return (root, layout) from a valid entry, or None"""
+    try:
+        with open(path, 'rb') as f:
+            header = f.read(_HEADER.size)
+            if len(header) != _HEADER.size:
+                return None
+            magic, version, major, minor, size, mtime_ns, ino, stored = _HEADER.unpack(header)
+            if (magic, version, major, minor) != (_MAGIC, _VERSION) + sys.version_info[:2] or size != st.st_size:
+                return None
+            if (mtime_ns, ino) != (st.st_mtime_ns, st.st_ino):
+                if stored != digest(buffer):
+                    return None
+                # Same bytes under a new stamp: refresh the header so the next load skips the hash
+                with open(path, 'r+b') as update:
+                    update.write(_HEADER.pack(_MAGIC, _VERSION, *sys.version_info[:2], *_stamp(st), stored))
+            # one read and loads() is several times faster than marshal.load() on the file object
+            root, spans, order, sections, objects_start, objects_end = marshal.loads(f.read())
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    root['objects'] = unpack_objects(*root['objects'])
+    layout = Layout()
+    layout.spans, layout.order, layout.sections = spans, order, sections
+    layout.objects_start, layout.objects_end = objects_start, objects_end
+    return root, layout
+
+
+def _write(path, st, buffer, root, layout):
+    header = _HEADER.pack(_MAGIC, _VERSION, *sys.version_info[:2], *_stamp(st), digest(buffer))
+    # records are not marshallable; they are stored packed and rebuilt on load
+    root = dict(root, objects=pack_objects(root['objects']))
+    payload = marshal.dumps((root, layout.spans, layout.order, layout.sections, layout.objects_start,
+                             layout.objects_end))
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        replace_file(path, [header, payload], durable=False)
+    except OSError:
+        pass  # a read-only checkout just never gets warm
+
+
+def parse_cached(pbxproj):
+    """
+    Map project.pbxproj and return (buffer, root, layout, hit), taking the
+    parse from the cache when it is still valid and refreshing it otherwise.
+    """
+    with open(pbxproj, 'rb') as f:
+        st = os.fstat(f.fileno())
+        if st.st_size == 0:
+            raise PBXParseError("Empty project file", 0)
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    path = cache_path(pbxproj, 'parse-', '.bin')
+    with profile.phase('cache.read') as p:
+        cached = _read(path, st, buffer)
+        p.add(hit=int(cached is not None))
+    if cached is not None:
+        return (buffer,) + cached + (True,)
+    root, layout = parse_layout(buffer)
+    with profile.phase('cache.write'):
+        _write(path, st, buffer, root, layout)
+    return buffer, root, layout, False
@@ -0,0 +1,691 @@
+"""
+Command-line entry point: python3 -m pbxtool <command> ...
+
+Run from ios-app/; --project defaults to the only .xcodeproj in the
+current directory.
+"""
+import argparse
+import glob
+import json
+import os
+import shlex
+import subprocess
+import sys
+import time
+
+from . import affected, batch, bench, coredata, icons, merge, orchestrator, profile, query, server, unused, verify, watch
+from .client import ServerError, connect
+from .manifest import ManifestError, apply, load_manifest
+from .parser import PBXParseError
+from .project import load
+from .snapshots import SnapshotError, SnapshotStore
+from .sync import sync
+from .transaction import MissingAnchorError
+from .writer import is_canonical, save
+
+
+def _default_project():
+    found = glob.glob('*.xcodeproj')
+    return found[0] if len(found) == 1 else None
+
+
+def _snapshot(args):
+    store = SnapshotStore(args.project)
+    try:
+        if args.action == 'list':
+            for position, entry in enumerate(store.entries()):
+                print(f"{position:4d}  {entry['hash'][:10]}  {entry['time']}  "
+                      f"{entry['size']:>9,d} B  {entry['label']}")
+        elif args.action == 'save':
+            data = None
+            if args.file:
+                with open(args.file, 'rb') as f:
+                    data = f.read()
+            entry = store.save(data, args.label or args.file or 'manual')
+            print(f"✅ Saved snapshot {entry['hash'][:10]}" if entry else "⏭️  Unchanged since the latest snapshot")
+        elif args.action == 'diff':
+            sys.stdout.writelines(store.diff(args.ref, args.other))
+        elif args.action == 'restore':
+            entry = store.restore(args.ref)
+            print(f"✅ Restored snapshot {entry['hash'][:10]} ({entry['label']})")
+    except SnapshotError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+def _sync(args):
+    try:
+        changes, tree = sync(args.project, args.dir, target=args.target, exclude=args.exclude,
+                             remove=not args.keep_missing, dry_run=args.dry_run,
+                             use_cache=not args.no_cache, deterministic=args.deterministic)
+    except (OSError, PBXParseError, MissingAnchorError) as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+    if args.dry_run and changes:
+        print("Dry run, nothing written:")
+    for change in changes:
+        print(f"  {change}" if args.dry_run else f"✅ {change}")
+    print(f"{len(tree.files)} files in {len(tree.dirs)} folders "
+          f"({tree.listed} listed, {tree.cached} unchanged since last sync)")
+    if not changes:
+        print("⏭️  Project already matches the folder")
+    return 0
+
+
+def _watch(args):
+    def log(message):
+        print(f"[{time.strftime('%H:%M:%S')}] {message}", flush=True)
+
+    try:
+        watch.watch(args.project, args.dir, debounce=args.debounce, poll=args.poll, log=log,
+                    max_delay=args.max_delay, target=args.target, exclude=args.exclude,
+                    remove=not args.keep_missing, deterministic=args.deterministic)
+    except KeyboardInterrupt:
+        log("Stopped")
+    return 0
+
+
+def _apply_via_server(args, client):
+    with client:
+        try:
+            # Written before the reply, so whatever runs next (xcodebuild, git add) sees the edit
+            result = client.call('apply', project=os.path.abspath(args.project),
+                                 manifest=os.path.abspath(args.manifest), target=args.target,
+                                 create_groups=args.create_groups, flush=True,
+                                 label=args.label or f"apply {os.path.basename(args.manifest)}")
+        except ServerError as e:
+            print(f"❌ {e}", file=sys.stderr)
+            return 1
+    if not result['changes']:
+        print("⏭️  Project already matches the manifest, nothing written")
+        return 0
+    for change in result['changes']:
+        print(f"✅ {change}")
+    return 0
+
+
+def _apply(args):
+    client = connect() if args.server and not (args.dry_run or args.check or args.deterministic) else None
+    if client is not None:
+        return _apply_via_server(args, client)
+    try:
+        manifest = load_manifest(args.manifest)
+        changes = apply(args.project, manifest, target=args.target, dry_run=args.dry_run or args.check,
+                        deterministic=args.deterministic, label=args.label or f"apply {os.path.basename(args.manifest)}",
+                        create_groups=args.create_groups)
+    except (OSError, ManifestError, MissingAnchorError) as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+    if not changes:
+        print("⏭️  Project already matches the manifest, nothing written")
+        return 0
+    if args.dry_run or args.check:
+        print("Out of date, nothing written:" if args.check else "Dry run, nothing written:")
+    for change in changes:
+        print(f"  {change}" if args.dry_run or args.check else f"✅ {change}")
+    return 1 if args.check else 0
+
+
+def _batch(args):
+    started = time.perf_counter()
+    try:
+        manifest = load_manifest(args.manifest)
+    except (OSError, ManifestError) as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 2
+    projects = batch.expand(args.projects)
+    if not projects:
+        print(f"❌ No .xcodeproj matches {' '.join(args.projects)}", file=sys.stderr)
+        return 2
+    results = batch.run(projects, manifest, target=args.target, jobs=args.jobs, dry_run=args.dry_run,
+                        deterministic=args.deterministic, snapshot=False if args.no_snapshot else None,
+                        create_groups=args.create_groups,
+                        label=args.label or f"batch {os.path.basename(args.manifest)}")
+    wall = time.perf_counter() - started
+    for result in results:
+        if result.status == batch.FAILED:
+            print(f"❌ {result.project}: {result.error}")
+        for change in result.changes:
+            print(f"  {result.project}: {change}" if args.dry_run else f"✅ {result.project}: {change}")
+    print()
+    for line in batch.report(results, wall):
+        print(line)
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump({'wall': wall, 'projects': [{'project': result.project, 'status': result.status,
+                                                   'changes': result.changes, 'error': result.error,
+                                                   'seconds': result.seconds} for result in results]}, f, indent=2)
+    return 1 if any(result.status == batch.FAILED for result in results) else 0
+
+
+def _serve(args):
+    def log(message):
+        print(f"[{time.strftime('%H:%M:%S')}] {message}", flush=True)
+
+    try:
+        daemon = server.ProjectServer(args.socket, args.debounce, log)
+    except OSError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+    if args.project:
+        daemon.rpc_open(args.project)
+    log(f"🟢 Listening on {daemon.socket_path} (writes after {args.debounce:g}s idle)")
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        daemon.rpc_flush()
+    finally:
+        daemon.server_close()
+    log("Stopped")
+    return 0
+
+
+def _rpc(args):
+    params = {}
+    for item in args.params:
+        key, sep, value = item.partition('=')
+        if not sep:
+            print(f"❌ Expected key=value, got {item!r}", file=sys.stderr)
+            return 2
+        try:
+            params[key] = json.loads(value)
+        except ValueError:
+            params[key] = value
+    handler = getattr(server.ProjectServer, 'rpc_' + args.method, None)
+    if handler and 'project' in handler.__code__.co_varnames and 'project' not in params and args.project:
+        params['project'] = args.project
+    client = connect(args.socket)
+    if client is None:
+        print(f"❌ No server listening on {args.socket or server.default_socket()} (start one with: python3 -m pbxtool serve)",
+              file=sys.stderr)
+        return 1
+    with client:
+        try:
+            result = client.call(args.method, **params)
+        except ServerError as e:
+            print(f"❌ {e}", file=sys.stderr)
+            return 1
+    print(json.dumps(result, indent=2))
+    return 0
+
+
+def _query(args):
+    if args.stdin:
+        lines = (line.strip() for line in sys.stdin)
+        queries = [line for line in lines if line and not line.startswith('#')]
+    elif args.query:
+        queries = [shlex.join(args.query)]
+    else:
+        print(f"❌ Pass a query or --stdin; queries: {', '.join(query.QUERIES)}", file=sys.stderr)
+        return 2
+    try:
+        session = query.Session(load(args.project, cache=not args.no_cache), args.target)
+    except (OSError, PBXParseError) as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+    failed = False
+    for text in queries:
+        try:
+            answer = {'query': text, 'result': session.run(text)}
+        except (query.QueryError, ValueError) as e:
+            answer = {'query': text, 'error': str(e)}
+            failed = True
+        print(json.dumps(answer, indent=None if args.stdin else 2))
+    return 1 if failed else 0
+
+
+def _bench(args):
+    sizes = [int(size) for size in args.sizes.split(',')]
+    operations = args.ops.split(',') if args.ops else None
+    print(f"{'files':>7}  {'operation':<14} {'time':>10} {'MB/s':>8} {'peak MB':>8}")
+
+    def log(size, name, result):
+        print(f"{size:>7}  {name:<14} {result['seconds'] * 1e3:>7.1f} ms {result['mb_per_s']:>8.1f} "
+              f"{result['peak_mb']:>8.1f}", flush=True)
+
+    report = bench.run(sizes, operations, args.repeat, log)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+            f.write('\n')
+        print(f"✅ Baseline saved to {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print("⏭️  No baseline to compare against (run with --save-baseline)")
+        return 0
+    with open(args.baseline) as f:
+        regressions = bench.compare(report, json.load(f), args.tolerance)
+    for regression in regressions:
+        print(f"❌ Regression: {regression}")
+    if not regressions:
+        print("✅ No regressions against the baseline")
+    return 1 if regressions else 0
+
+
+def _verify(args):
+    started = time.perf_counter()
+    try:
+        project = load(args.project, cache=not args.no_cache)
+    except (OSError, PBXParseError) as e:
+        issues = [{'check': 'parse', 'severity': verify.ERROR, 'id': None, 'isa': None, 'message': str(e)}]
+        objects = 0
+    else:
+        issues = verify.verify(project, check_disk=not args.no_disk)
+        objects = len(project.objects)
+    errors, warnings = verify.summarize(issues)
+    failed = errors or (args.strict and warnings)
+    if args.json:
+        json.dump({'ok': not failed, 'errors': errors, 'warnings': warnings, 'objects': objects,
+                   'seconds': round(time.perf_counter() - started, 3), 'issues': issues}, sys.stdout, indent=2)
+        print()
+    else:
+        for issue in issues:
+            print(verify.format_issue(issue))
+        print(f"{'❌' if failed else '✅'} {objects} objects checked: {errors} errors, {warnings} warnings "
+              f"({(time.perf_counter() - started) * 1e3:.0f} ms)")
+    return 1 if failed else 0
+
+
+def _unused(args):
+    started = time.perf_counter()
+    try:
+        report = unused.unused(args.project, args.dir, target=args.target, roots=args.root, exclude=args.exclude,
+                               jobs=args.jobs, use_cache=not args.no_cache)
+    except MissingAnchorError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+    if args.json:
+        print(json.dumps(report.as_dict(), indent=2))
+    else:
+        for path in report.unreferenced:
+            print(f"❌ [unreferenced] {path} is in Sources but nothing reaches it")
+        for path, names in report.uncompiled.items():
+            print(f"❌ [not-compiled] {path} is not in Sources but declares {', '.join(names)}")
+        for name, paths in report.duplicates.items():
+            built = [path for path in paths if path in report.compiled]
+            print(f"{'❌' if len(built) > 1 else '⚠️ '} [duplicate] {name} is declared in {', '.join(paths)}"
+                  + (" (all compiled)" if len(built) > 1 else ""))
+        for path in report.dead:
+            print(f"🗑️  [dead] {path} is neither compiled nor referenced")
+        print(f"{len(report.compiled)} of {report.files} Swift files compiled, {report.lexed} lexed "
+              f"({(time.perf_counter() - started) * 1e3:.0f} ms)")
+    findings = report.unreferenced or report.uncompiled
+    if args.fix and findings:
+        try:
+            changes = unused.fix(args.project, report, target=args.target, deterministic=args.deterministic)
+        except MissingAnchorError as e:
+            print(f"❌ {e}", file=sys.stderr)
+            return 1
+        for change in changes:
+            print(f"✅ {change}")
+        return 0
+    if not findings and not args.json:
+        print("✅ Sources matches what the code references")
+    return 1 if args.check and findings else 0
+
+
+def _affected(args):
+    try:
+        root = affected.repo_root(args.root or '.')
+        build_map = affected.load_map(root)
+        if args.record:
+            affected.record(root, build_map, args.record)
+            for name in args.record:
+                print(f"✅ Recorded the inputs of {name} as built")
+            return 0
+        paths = list(args.paths)
+        if args.stdin:
+            paths += [line.strip() for line in sys.stdin if line.strip()]
+        if args.since:
+            paths += affected.changed_since(root, args.since)
+        if paths or args.since or args.stdin:
+            hits = affected.affected_by(paths, root, build_map)
+            result = {name: {'affected': name in hits, 'changed': hits.get(name, [])} for name in build_map}
+        else:
+            result = {name: {'affected': changed is None or bool(changed), 'changed': changed}
+                      for name, (_, changed) in affected.status(root, build_map).items()}
+    except (OSError, PBXParseError, affected.BuildMapError) as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 2
+    if args.names:
+        for name, entry in result.items():
+            if entry['affected']:
+                print(name)
+    elif args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        for name, entry in result.items():
+            changed = entry['changed']
+            if not entry['affected']:
+                print(f"⏭️  {name}: unaffected")
+            elif changed is None:
+                print(f"🔨 {name}: never built")
+            else:
+                shown = ', '.join(changed[:3]) + (f" and {len(changed) - 3} more" if len(changed) > 3 else "")
+                print(f"🔨 {name}: {len(changed)} changed inputs ({shown})")
+    return 0
+
+
+def _build(args):
+    started = time.perf_counter()
+    try:
+        root = affected.repo_root(args.root or '.')
+        build_map = affected.load_map(root)
+        steps = orchestrator.build(root, build_map, only=args.only, jobs=args.jobs, force=args.force,
+                                   offline=args.offline)
+    except (OSError, PBXParseError, affected.BuildMapError) as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 2
+    wall = time.perf_counter() - started
+    print()
+    for line in orchestrator.report(steps, wall):
+        print(line)
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump({'wall': wall, 'steps': [{'step': step.id, 'status': step.status, 'key': step.key,
+                                                'start': step.started, 'seconds': step.seconds,
+                                                'detail': step.detail} for step in steps]}, f, indent=2)
+    return 1 if any(step.status == orchestrator.FAILED for step in steps) else 0
+
+
+def _codegen(args):
+    try:
+        result = coredata.generate(args.project, args.model, force=args.force, check=args.check,
+                                   register=not args.no_register, target=args.target,
+                                   deterministic=args.deterministic)
+    except (OSError, PBXParseError, coredata.CodegenError, MissingAnchorError) as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+    for path in result.written:
+        print(f"{'⚠️  Out of date:' if args.check else '✅ Wrote'} {path}")
+    for path in result.orphans:
+        print(f"⚠️  {path} belongs to no entity in the model")
+    for change in result.changes:
+        print(f"✅ {change}")
+    if not args.check:
+        print(f"✅ {result.entities} entities, {result.entities - result.skipped} regenerated "
+              f"({result.seconds * 1000:.0f} ms)")
+    elif not result.written:
+        print(f"✅ {result.entities} entities up to date")
+    return 1 if args.check and result.written else 0
+
+
+def _icons(args):
+    try:
+        result = icons.generate(args.project, args.masters, catalog=args.catalog, icon_set=args.set,
+                                jobs=args.jobs, force=args.force, prune=args.prune, register=not args.no_register,
+                                target=args.target, deterministic=args.deterministic)
+    except (OSError, PBXParseError, icons.IconError, MissingAnchorError) as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+    for path in result.contents:
+        print(f"✅ Wrote {path}")
+    for path in result.stale:
+        print(f"🗑️  Removed {path}" if args.prune else f"⚠️  {path} is not in the icon spec (--prune deletes it)")
+    for change in result.changes:
+        print(f"✅ {change}")
+    print(f"✅ {len(result.rendered)} icons rendered, {result.skipped} up to date "
+          f"({len(args.masters)} masters, {result.seconds:.2f} s)")
+    return 0
+
+
+def _format(args):
+    try:
+        project = load(args.project)
+    except (OSError, PBXParseError) as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+    if is_canonical(project):
+        print("⏭️  Project already in Xcode's canonical formatting")
+        return 0
+    if args.check:
+        print("❌ Project differs from Xcode's canonical formatting (python3 -m pbxtool format rewrites it)")
+        return 1
+    started = time.perf_counter()
+    SnapshotStore(project.path).save(project.buffer, 'format')
+    save(project, full=True)
+    print(f"✅ Rewrote {project.path} in canonical order ({(time.perf_counter() - started) * 1e3:.0f} ms)")
+    return 0
+
+
+def _merge(args):
+    name = args.path or args.ours
+    try:
+        conflicts = merge.merge(args.base, args.ours, args.theirs, args.path, args.marker_size)
+    except (OSError, PBXParseError) as e:
+        # Leave it to git's line-based merge rather than failing the whole merge
+        print(f"⚠️  Cannot merge {name} by object ID ({e}); falling back to git merge-file", file=sys.stderr)
+        return subprocess.call(['git', 'merge-file', f'--marker-size={args.marker_size}',
+                                args.ours, args.base, args.theirs])
+    for conflict in conflicts:
+        print(f"❌ {conflict}")
+    if conflicts:
+        print(f"❌ {len(conflicts)} conflicts left in {name}")
+        return 1
+    print(f"✅ Merged {name} by object ID")
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='pbxtool', description="Inventry.xcodeproj tooling")
+    parser.add_argument('--project', default=_default_project(),
+                        help="path to the .xcodeproj (default: the one in the current directory)")
+    parser.add_argument('--profile', metavar='FILE', default=os.environ.get('PBXTOOL_PROFILE'),
+                        help="write per-phase timings, bytes, objects and peak memory to FILE: Chrome trace JSON, "
+                             "or CSV for a .csv name; {pid} and {command} are filled in (default: $PBXTOOL_PROFILE)")
+    parser.add_argument('--profile-memory', action='store_true',
+                        help="also trace the Python heap's peak per phase (slows the run down)")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    snapshot = commands.add_parser('snapshot', help="list, diff and restore project.pbxproj snapshots")
+    actions = snapshot.add_subparsers(dest='action', required=True)
+    actions.add_parser('list', help="list snapshots, oldest first")
+    save = actions.add_parser('save', help="snapshot the project (or another file) now")
+    save.add_argument('--file', help="snapshot this file instead, e.g. an old project.pbxproj.backupN")
+    save.add_argument('--label', default='')
+    diff = actions.add_parser('diff', help="diff a snapshot against the project or another snapshot")
+    diff.add_argument('ref', help="hash prefix, position (@0, @-1, -1) or 'latest'")
+    diff.add_argument('other', nargs='?')
+    restore = actions.add_parser('restore', help="restore a snapshot over project.pbxproj")
+    restore.add_argument('ref', help="hash prefix, position (@0, @-1, -1) or 'latest'")
+    snapshot.set_defaults(func=_snapshot)
+
+    sync = commands.add_parser('sync', help="add and remove file references to match a folder on disk")
+    sync.add_argument('--dir', default='Inventry', help="folder to sync, relative to the .xcodeproj (default: Inventry)")
+    sync.add_argument('--target', help="target whose build phases new files join (default: the first)")
+    sync.add_argument('--exclude', action='append', default=[], metavar='GLOB',
+                      help="leave matching paths or file names alone, e.g. '*_Old.swift' (repeatable)")
+    sync.add_argument('--keep-missing', action='store_true', help="do not remove references to missing files")
+    sync.add_argument('--dry-run', action='store_true', help="print the changes without writing")
+    sync.add_argument('--no-cache', action='store_true', help="ignore and do not update the folder cache")
+    sync.add_argument('--deterministic', action='store_true', help="derive new object IDs from their paths")
+    sync.set_defaults(func=_sync)
+
+    watch_parser = commands.add_parser('watch', help="sync a folder into the project whenever files come and go")
+    watch_parser.add_argument('--dir', default='Inventry', help="folder to watch, relative to the .xcodeproj (default: Inventry)")
+    watch_parser.add_argument('--target', help="target whose build phases new files join (default: the first)")
+    watch_parser.add_argument('--exclude', action='append', default=[], metavar='GLOB',
+                              help="leave matching paths or file names alone (repeatable)")
+    watch_parser.add_argument('--keep-missing', action='store_true', help="do not remove references to deleted files")
+    watch_parser.add_argument('--deterministic', action='store_true', help="derive new object IDs from their paths")
+    watch_parser.add_argument('--debounce', type=float, default=watch.DEFAULT_DEBOUNCE,
+                              help="quiet seconds that end a burst of events (default: %(default)s)")
+    watch_parser.add_argument('--max-delay', type=float,
+                              help="sync after this many seconds even if events keep coming (default: 10 x debounce)")
+    watch_parser.add_argument('--poll', type=float, metavar='SECONDS',
+                              help="poll folder mtimes at this interval instead of using inotify")
+    watch_parser.set_defaults(func=_watch)
+
+    apply_parser = commands.add_parser('apply', help="bring groups and build phases in line with a manifest")
+    apply_parser.add_argument('manifest', help="manifest file (.json, or .yaml with PyYAML installed)")
+    apply_parser.add_argument('--target', help="target whose build phases are meant (default: the manifest's, else the first)")
+    apply_parser.add_argument('--dry-run', action='store_true', help="print the edits without writing")
+    apply_parser.add_argument('--check', action='store_true', help="like --dry-run, but exit 1 when edits are needed")
+    apply_parser.add_argument('--deterministic', action='store_true', help="derive new object IDs from their paths")
+    apply_parser.add_argument('--label', help="snapshot label (default: apply <manifest name>)")
+    apply_parser.add_argument('--create-groups', action='store_true',
+                              help="create groups the manifest names that the project lacks (default: fail)")
+    apply_parser.add_argument('--server', action='store_true',
+                              help="apply through a running pbxtool server, which writes before answering")
+    apply_parser.set_defaults(func=_apply)
+
+    batch_parser = commands.add_parser('batch', help="apply one manifest to many projects in parallel",
+                                       description=batch.__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    batch_parser.add_argument('manifest', help="manifest file (.json, or .yaml with PyYAML installed)")
+    batch_parser.add_argument('projects', nargs='+',
+                              help="glob patterns of .xcodeproj folders; quote them so ** works")
+    batch_parser.add_argument('--target', help="target whose build phases are meant (default: the manifest's, else the first)")
+    batch_parser.add_argument('--jobs', '-j', type=int, help="worker processes (default: one per core)")
+    batch_parser.add_argument('--dry-run', action='store_true', help="print the edits without writing")
+    batch_parser.add_argument('--deterministic', action='store_true', help="derive new object IDs from their paths")
+    batch_parser.add_argument('--label', help="snapshot label (default: batch <manifest name>)")
+    batch_parser.add_argument('--create-groups', action='store_true',
+                              help="create groups the manifest names that a project lacks (default: fail that project)")
+    batch_parser.add_argument('--no-snapshot', action='store_true',
+                              help="do not record each project in its snapshot store before writing")
+    batch_parser.add_argument('--report', metavar='FILE', help="write per-project results and timings as JSON")
+    batch_parser.set_defaults(func=_batch, project_required=False)
+
+    verify_parser = commands.add_parser('verify', help="check references, build phases, groups and files on disk")
+    verify_parser.add_argument('--json', action='store_true', help="print a machine-readable report")
+    verify_parser.add_argument('--no-disk', action='store_true', help="skip the on-disk existence checks")
+    verify_parser.add_argument('--strict', action='store_true', help="fail on warnings too")
+    verify_parser.add_argument('--no-cache', action='store_true', help="parse project.pbxproj instead of using the parse cache")
+    verify_parser.set_defaults(func=_verify)
+
+    query_parser = commands.add_parser('query', help="answer questions about the project as JSON",
+                                       description=query.__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    query_parser.add_argument('query', nargs='*', help="e.g. in-phase CoreDataStack.swift Sources")
+    query_parser.add_argument('--stdin', action='store_true',
+                              help="read one query per line and print one JSON object per line")
+    query_parser.add_argument('--target', help="target whose build phases are meant (default: the first)")
+    query_parser.add_argument('--no-cache', action='store_true', help="parse project.pbxproj instead of using the parse cache")
+    query_parser.set_defaults(func=_query)
+
+    serve_parser = commands.add_parser('serve', help="keep projects parsed in memory and serve edits over a Unix socket",
+                                       description=server.__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    serve_parser.add_argument('--socket', help="socket path (default: $PBXTOOL_SOCKET or .pbxtool-cache/pbxtool.sock)")
+    serve_parser.add_argument('--debounce', type=float, default=server.DEFAULT_DEBOUNCE,
+                              help="seconds without edits before pending edits are written (default: %(default)s)")
+    serve_parser.set_defaults(func=_serve, project_required=False)
+
+    rpc_parser = commands.add_parser('rpc', help="send one request to a running pbxtool server")
+    rpc_parser.add_argument('method', help="e.g. add_file, remove_file, apply, query, flush, status, shutdown")
+    rpc_parser.add_argument('params', nargs='*', metavar='KEY=VALUE',
+                            help="params; values are parsed as JSON when they can be (project defaults to --project)")
+    rpc_parser.add_argument('--socket', help="socket path (default: $PBXTOOL_SOCKET or .pbxtool-cache/pbxtool.sock)")
+    rpc_parser.set_defaults(func=_rpc, project_required=False)
+
+    unused_parser = commands.add_parser('unused', help="find compiled-but-unreferenced, missing and duplicate Swift sources",
+                                        description=unused.__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    unused_parser.add_argument('--dir', default='Inventry', help="folder of Swift sources to scan (default: %(default)s)")
+    unused_parser.add_argument('--target', help="target whose Sources phase is meant (default: the first)")
+    unused_parser.add_argument('--root', action='append', default=[], metavar='GLOB',
+                               help="treat matching files as entry points (repeatable)")
+    unused_parser.add_argument('--exclude', action='append', default=[], metavar='GLOB', help="skip matching paths")
+    unused_parser.add_argument('--jobs', type=int, help="lexer processes (default: one per CPU)")
+    unused_parser.add_argument('--json', action='store_true', help="print the report as JSON")
+    unused_parser.add_argument('--fix', action='store_true',
+                               help="remove unreferenced files from Sources and add the missing ones, in one transaction")
+    unused_parser.add_argument('--check', action='store_true', help="exit 1 if Sources needs fixing")
+    unused_parser.add_argument('--deterministic', action='store_true', help="derive new object IDs from their paths")
+    unused_parser.add_argument('--no-cache', action='store_true', help="lex every file again")
+    unused_parser.set_defaults(func=_unused)
+
+    affected_parser = commands.add_parser('affected', help="list the subprojects a change affects (see build-map.json)",
+                                          description=affected.__doc__,
+                                          formatter_class=argparse.RawDescriptionHelpFormatter)
+    affected_parser.add_argument('paths', nargs='*', help="changed paths, relative to the repository root")
+    affected_parser.add_argument('--since', metavar='REV', help="use the paths changed since REV (working tree included)")
+    affected_parser.add_argument('--stdin', action='store_true', help="read changed paths, one per line")
+    affected_parser.add_argument('--record', nargs='+', metavar='NAME',
+                                 help="record the current inputs of these subprojects as successfully built")
+    affected_parser.add_argument('--names', action='store_true', help="print only the names of affected subprojects")
+    affected_parser.add_argument('--json', action='store_true', help="print the result as JSON")
+    affected_parser.add_argument('--root', help="repository to look at (default: the one holding the current directory)")
+    affected_parser.set_defaults(func=_affected, project_required=False)
+
+    build_parser_ = commands.add_parser('build', help="run the build steps of build-map.json, reusing cached outputs",
+                                        description=orchestrator.__doc__,
+                                        formatter_class=argparse.RawDescriptionHelpFormatter)
+    build_parser_.add_argument('only', nargs='*', help="subprojects or steps to build, with what they run after "
+                                                       "(default: all)")
+    build_parser_.add_argument('--jobs', '-j', type=int, default=2, help="steps run at a time (default: %(default)s)")
+    build_parser_.add_argument('--force', action='store_true', help="run every step, ignoring cached outputs")
+    build_parser_.add_argument('--offline', action='store_true', help="tell npm to use its local cache only")
+    build_parser_.add_argument('--report', metavar='FILE', help="write per-step timings as JSON")
+    build_parser_.add_argument('--root', help="repository to build (default: the one holding the current directory)")
+    build_parser_.set_defaults(func=_build, project_required=False)
+
+    codegen_parser = commands.add_parser('codegen', help="generate the Core Data entity classes from the model",
+                                         description=coredata.__doc__,
+                                         formatter_class=argparse.RawDescriptionHelpFormatter)
+    codegen_parser.add_argument('--model', default=coredata.MODEL, help="the .xcdatamodeld (default: %(default)s)")
+    codegen_parser.add_argument('--force', action='store_true', help="regenerate every entity")
+    codegen_parser.add_argument('--check', action='store_true', help="write nothing, exit 1 if a file is out of date")
+    codegen_parser.add_argument('--no-register', action='store_true', help="do not add new files to the project")
+    codegen_parser.add_argument('--target', help="target whose Sources get new files (default: the first)")
+    codegen_parser.add_argument('--deterministic', action='store_true', help="derive new object IDs from their paths")
+    codegen_parser.set_defaults(func=_codegen)
+
+    icons_parser = commands.add_parser('icons', help="render app icon sets from 1024 px masters",
+                                       description=icons.__doc__,
+                                       formatter_class=argparse.RawDescriptionHelpFormatter)
+    icons_parser.add_argument('masters', nargs='+', help="square PNG masters, at least 1024 px")
+    icons_parser.add_argument('--catalog', default='Inventry/Assets.xcassets',
+                              help="asset catalog to render into; {name} is the master's folder, {stem} its "
+                                   "file name (default: %(default)s)")
+    icons_parser.add_argument('--set', default='AppIcon', help="icon set name (default: %(default)s)")
+    icons_parser.add_argument('--jobs', '-j', type=int, help="worker processes (default: one per core)")
+    icons_parser.add_argument('--force', action='store_true', help="render every icon again")
+    icons_parser.add_argument('--prune', action='store_true', help="delete PNGs in the set that the spec does not list")
+    icons_parser.add_argument('--no-register', action='store_true', help="do not add new catalogs to the project")
+    icons_parser.add_argument('--target', help="target whose Resources get new catalogs (default: the first)")
+    icons_parser.add_argument('--deterministic', action='store_true', help="derive new object IDs from their paths")
+    icons_parser.set_defaults(func=_icons)
+
+    format_parser = commands.add_parser('format', help="rewrite project.pbxproj in full in Xcode's canonical order")
+    format_parser.add_argument('--check', action='store_true', help="only report, exit 1 if a rewrite would change it")
+    format_parser.set_defaults(func=_format)
+
+    merge_parser = commands.add_parser('merge', help="three-way merge project.pbxproj by object ID (a git merge driver)")
+    merge_parser.add_argument('base', help="common ancestor (git's %%O)")
+    merge_parser.add_argument('ours', help="current version, overwritten with the result (%%A)")
+    merge_parser.add_argument('theirs', help="other branch's version (%%B)")
+    merge_parser.add_argument('--marker-size', type=int, default=merge.MARKER_SIZE,
+                              help="conflict marker length (%%L, default: %(default)s)")
+    merge_parser.add_argument('--path', help="the file's path in the repository (%%P), for names in comments")
+    merge_parser.set_defaults(func=_merge, project_required=False)
+
+    bench_parser = commands.add_parser('bench', help="benchmark against synthetic projects and check for regressions")
+    bench_parser.add_argument('--sizes', default=','.join(map(str, bench.DEFAULT_SIZES)),
+                              help="comma-separated file counts (default: %(default)s)")
+    bench_parser.add_argument('--ops', help=f"comma-separated subset of: {', '.join(bench.OPERATIONS)}")
+    bench_parser.add_argument('--repeat', type=int, default=3, help="runs per operation, best time is kept")
+    bench_parser.add_argument('--baseline', default=bench.BASELINE, help="baseline JSON (default: %(default)s)")
+    bench_parser.add_argument('--save-baseline', action='store_true', help="write the results as the new baseline")
+    bench_parser.add_argument('--tolerance', type=float, default=0.5,
+                              help="allowed slowdown before a run fails (default: 0.5, i.e. 50%%)")
+    bench_parser.add_argument('--json', help="also write the full report here")
+    bench_parser.set_defaults(func=_bench, project_required=False)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.project is None and getattr(args, 'project_required', True):
+        print("❌ No .xcodeproj found; pass --project", file=sys.stderr)
+        return 2
+    if not args.profile:
+        return args.func(args)
+    path = args.profile.format(pid=os.getpid(), command=args.command)
+    with profile.profiling(path, memory=args.profile_memory):
+        with profile.phase(f"command.{args.command}", project=args.project or ''):
+            code = args.func(args)
+    print(f"📊 Profile written to {path}", file=sys.stderr)
+    return code
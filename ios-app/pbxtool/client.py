@@ -0,0 +1,75 @@
+"""
+Thin client for the resident project server (see pbxtool.server).
+
+    with Client() as client:
+        client.call('add_file', project='Inventry.xcodeproj', path='Inventry/Services/SyncService.swift')
+        client.call('flush')
+
+Project and manifest paths are made absolute before they are sent, since
+the server may run in another directory.
+"""
+import itertools
+import json
+import os
+import socket
+
+from .server import default_socket
+
+# Params holding paths the server resolves
+_PATH_PARAMS = ('project', 'manifest')
+
+
+class ServerError(Exception):
+    """The server answered with a JSON-RPC error"""
+
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+
+
+class Client:
+    def __init__(self, socket_path=None, timeout=None):
+        self.socket_path = socket_path or default_socket()
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.settimeout(timeout)
+        self._sock.connect(self.socket_path)
+        self._file = self._sock.makefile('rwb')
+        self._ids = itertools.count(1)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def close(self):
+        self._file.close()
+        self._sock.close()
+
+    def call(self, method, **params):
+        """Send one request and return its result; raises ServerError on an error response"""
+        for key in _PATH_PARAMS:
+            if params.get(key):
+                params[key] = os.path.abspath(params[key])
+        rid = next(self._ids)
+        self._file.write(json.dumps({'jsonrpc': '2.0', 'id': rid, 'method': method, 'params': params}).encode('utf-8') + b'\n')
+        self._file.flush()
+        line = self._file.readline()
+        if not line:
+            raise ConnectionError(f"Server on {self.socket_path} closed the connection")
+        response = json.loads(line)
+        if 'error' in response:
+            raise ServerError(response['error']['code'], response['error']['message'])
+        return response['result']
+
+
+def connect(socket_path=None):
+    """Return a Client if a server is listening, else None"""
+    socket_path = socket_path or default_socket()
+    if not os.path.exists(socket_path):
+        return None
+    try:
+        return Client(socket_path)
+    except OSError:
+        return None
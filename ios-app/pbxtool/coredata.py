@@ -0,0 +1,254 @@
+"""
+Core Data entity classes generated from InventoryModel.xcdatamodeld/Contents.json.
+
+For every entity two files go next to the model, as Xcode's "Manual/None"
+codegen lays them out:
+
+- <Class>+CoreDataProperties.swift: fetchRequest(), one @NSManaged property
+  per attribute and relationship, and the generated accessors of to-many
+  relationships (addToItems, removeFromItems ...). It is regenerated
+  whenever the entity changes, so it should not be edited.
+- <Class>+CoreDataClass.swift: the class itself. It is written once and
+  then left alone, as it is where custom code goes.
+
+Each entity's definition (with the classes of its relationship
+destinations) is hashed. Entities whose hash matches the one recorded by
+the previous run, and whose files are still there, are skipped, so a
+one-attribute change on a large model renders and writes one file. New
+files are added to the model's group and to Sources in one transaction.
+"""
+import json
+import os
+import time
+
+from . import profile
+from .cache import cache_path, digest
+from .project import load
+from .transaction import ProjectTransaction
+from .writer import replace_file
+
+MODEL = 'Inventry/Data/InventoryModel.xcdatamodeld'
+_STATE_VERSION = 1
+
+# Model attribute type -> (Swift type, scalar). Scalars are not optional, as with "Use Scalar Type"
+_TYPES = {
+    'String': ('String', False),
+    'Date': ('Date', False),
+    'Binary': ('Data', False),
+    'UUID': ('UUID', False),
+    'URI': ('URL', False),
+    'Decimal': ('NSDecimalNumber', False),
+    'Transformable': ('NSObject', False),
+    'Boolean': ('Bool', True),
+    'Integer 16': ('Int16', True),
+    'Integer 32': ('Int32', True),
+    'Integer 64': ('Int64', True),
+    'Float': ('Float', True),
+    'Double': ('Double', True),
+}
+
+_HEADER = "import Foundation\nimport CoreData\n\n"
+
+
+class CodegenError(ValueError):
+    """The model cannot be read or describes something that cannot be generated"""
+
+
+def load_entities(model=MODEL):
+    """The entities of the model's first version, in model order"""
+    path = os.path.join(model, 'Contents.json') if os.path.isdir(model) else model
+    try:
+        with open(path, encoding='utf-8') as f:
+            document = json.load(f)
+        return document['models'][0]['entities']
+    except (OSError, ValueError, KeyError, IndexError) as e:
+        raise CodegenError(f"Cannot read entities from {path}: {e}") from None
+
+
+def class_name(entity):
+    return entity.get('representedClassName') or entity['name']
+
+
+def _attribute_type(entity, attribute):
+    if attribute['type'] == 'Transformable' and attribute.get('customClassName'):
+        return attribute['customClassName'] + '?'
+    try:
+        swift, scalar = _TYPES[attribute['type']]
+    except KeyError:
+        raise CodegenError(f"{entity['name']}.{attribute['name']}: unsupported type {attribute['type']}") from None
+    if attribute.get('usesScalarValueType') is False and scalar:
+        return 'NSNumber?'
+    return swift if scalar else swift + '?'
+
+
+def _accessors(name, relationship, destination):
+    """The "Generated accessors" extension of a to-many relationship"""
+    cap = relationship['name'][0].upper() + relationship['name'][1:]
+    collection = 'NSOrderedSet' if relationship.get('ordered') else 'NSSet'
+    methods = []
+    if relationship.get('ordered'):
+        methods += [
+            (f"insertObject:in{cap}AtIndex:", f"insertInto{cap}(_ value: {destination}, at idx: Int)"),
+            (f"removeObjectFrom{cap}AtIndex:", f"removeFrom{cap}(at idx: Int)"),
+            (f"insert{cap}:atIndexes:", f"insertInto{cap}(_ values: [{destination}], at indexes: NSIndexSet)"),
+            (f"remove{cap}AtIndexes:", f"removeFrom{cap}(at indexes: NSIndexSet)"),
+            (f"replaceObjectIn{cap}AtIndex:withObject:", f"replace{cap}(at idx: Int, with value: {destination})"),
+            (f"replace{cap}AtIndexes:with{cap}:",
+             f"replace{cap}(at indexes: NSIndexSet, with values: [{destination}])"),
+        ]
+    methods += [
+        (f"add{cap}Object:", f"addTo{cap}(_ value: {destination})"),
+        (f"remove{cap}Object:", f"removeFrom{cap}(_ value: {destination})"),
+        (f"add{cap}:", f"addTo{cap}(_ values: {collection})"),
+        (f"remove{cap}:", f"removeFrom{cap}(_ values: {collection})"),
+    ]
+    body = "\n    \n".join(f"    @objc({selector})\n    @NSManaged public func {signature}"
+                           for selector, signature in methods)
+    return f"// MARK: Generated accessors for {relationship['name']}\nextension {name} {{\n    \n{body}\n}}"
+
+
+def render(entity, classes):
+    """
+    {file name: text} for one entity; classes maps entity names to class
+    names (relationship destinations)
+    """
+    name = class_name(entity)
+    parent = classes.get(entity.get('parentEntity'), 'NSManagedObject')
+    lines = [f"    @NSManaged public var {a['name']}: {_attribute_type(entity, a)}"
+             for a in entity.get('attributes', [])]
+    to_many = []
+    for relationship in entity.get('relationships', []):
+        try:
+            destination = classes[relationship['destination']]
+        except KeyError:
+            raise CodegenError(f"{entity['name']}.{relationship['name']}: unknown destination "
+                               f"{relationship.get('destination')}") from None
+        if relationship.get('cardinality') == 'To Many':
+            kind = 'NSOrderedSet' if relationship.get('ordered') else 'NSSet'
+            lines.append(f"    @NSManaged public var {relationship['name']}: {kind}?")
+            to_many.append(_accessors(name, relationship, destination))
+        else:
+            lines.append(f"    @NSManaged public var {relationship['name']}: {destination}?")
+
+    properties = (f"{_HEADER}extension {name} {{\n    \n"
+                  f"    @nonobjc public class func fetchRequest() -> NSFetchRequest<{name}> {{\n"
+                  f"        return NSFetchRequest<{name}>(entityName: \"{entity['name']}\")\n"
+                  f"    }}\n    \n" + "\n".join(lines) + "\n}")
+    properties += "".join("\n\n" + block for block in to_many)
+    return {
+        f"{name}+CoreDataClass.swift": f"{_HEADER}@objc({name})\npublic class {name}: {parent} {{\n    \n}}",
+        f"{name}+CoreDataProperties.swift": properties,
+    }
+
+
+def entity_hash(entity, classes):
+    """Digest of everything render() reads for this entity"""
+    destinations = sorted({r.get('destination') for r in entity.get('relationships', [])}
+                          | {entity.get('parentEntity')} - {None})
+    definition = {'entity': entity, 'classes': {d: classes.get(d) for d in destinations}}
+    return digest(json.dumps(definition, sort_keys=True).encode('utf-8')).hex()
+
+
+class Result:
+    def __init__(self):
+        self.entities = 0
+        self.skipped = 0        # entities unchanged since the last run
+        self.written = []       # files created or rewritten
+        self.orphans = []       # generated files of entities no longer in the model
+        self.changes = []       # project edits
+        self.seconds = 0.0
+
+
+def _state_file(project_path, model):
+    name = os.path.splitext(os.path.basename(os.path.normpath(model)))[0]
+    return cache_path(os.path.join(project_path, 'project.pbxproj'), 'coredata-', f"-{name}.json")
+
+
+def _read_state(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return state.get('entities', {}) if state.get('version') == _STATE_VERSION else {}
+
+
+def _read(path):
+    try:
+        with open(path, 'rb') as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _write_if_changed(path, text):
+    data = text.encode('utf-8')
+    if _read(path) == data:
+        return False
+    replace_file(path, [data], durable=False)
+    return True
+
+
+def generate(project_path, model=MODEL, force=False, check=False, register=True, target=None,
+             deterministic=False):
+    """
+    Bring the generated files of every entity in line with the model.
+    model is relative to the current directory, which must be the folder
+    holding the .xcodeproj. With check=True nothing is written; the result
+    lists what would be. Returns a Result.
+    """
+    started = time.perf_counter()
+    result = Result()
+    entities = load_entities(model)
+    classes = {entity['name']: class_name(entity) for entity in entities}
+    directory = os.path.dirname(os.path.normpath(model))
+    state_file = _state_file(project_path, model)
+    state = {} if force or check else _read_state(state_file)
+    hashes = {}
+    result.entities = len(entities)
+
+    with profile.phase('codegen.render', objects=len(entities)) as p:
+        for entity in entities:
+            key = entity_hash(entity, classes)
+            hashes[entity['name']] = key
+            files = [os.path.join(directory, f"{class_name(entity)}+CoreData{kind}.swift")
+                     for kind in ('Class', 'Properties')]
+            if state.get(entity['name']) == key and all(os.path.exists(path) for path in files):
+                result.skipped += 1
+                continue
+            for file_name, text in render(entity, classes).items():
+                path = os.path.join(directory, file_name)
+                if file_name.endswith('+CoreDataClass.swift') and os.path.exists(path):
+                    continue  # custom code lives here
+                if check:
+                    if _read(path) != text.encode('utf-8'):
+                        result.written.append(path)
+                elif _write_if_changed(path, text):
+                    result.written.append(path)
+        p.add(files=len(result.written))
+
+    generated = {f"{name}+CoreData{kind}.swift" for name in classes.values() for kind in ('Class', 'Properties')}
+    for file_name in sorted(os.listdir(directory or '.')):
+        if file_name.endswith(('+CoreDataClass.swift', '+CoreDataProperties.swift')) and file_name not in generated:
+            result.orphans.append(os.path.join(directory, file_name))
+    if check:
+        result.seconds = time.perf_counter() - started
+        return result
+
+    if register:
+        base = os.path.dirname(os.path.abspath(project_path))
+        known = set(load(project_path, cache=True).locations().values())
+        group = os.path.relpath(os.path.abspath(directory), base).replace(os.sep, '/')
+        missing = sorted(name for name in generated if f"{group}/{name}" not in known)
+        if missing:
+            with ProjectTransaction(project_path, target=target, deterministic=deterministic,
+                                    label='coredata', cache=True) as tx:
+                for name in missing:
+                    tx.add_file(f"{group}/{name}")
+            result.changes = tx.changes
+    if hashes != state:
+        os.makedirs(os.path.dirname(state_file), exist_ok=True)
+        replace_file(state_file, [json.dumps({'version': _STATE_VERSION, 'entities': hashes}).encode('utf-8')],
+                     durable=False)
+    result.seconds = time.perf_counter() - started
+    return result
@@ -0,0 +1,46 @@
+"""
+Object-ID allocation with collision checks and an optional deterministic mode
+"""
+import hashlib
+import secrets
+
+# Namespace for derived IDs, so the same edit yields the same IDs in every copy of the project
+_NAMESPACE = 'pbxtool'
+
+
+class IdAllocator:
+    """
+    Hands out 24-character uppercase hex IDs that never collide with IDs
+    already in the project.
+
+    The set of existing IDs is built once, so every check is O(1). In
+    deterministic mode an ID is derived from a key describing the object
+    (its isa plus e.g. target, group path and file path), so re-running the
+    same import produces byte-identical output.
+    """
+
+    def __init__(self, existing=(), deterministic=False):
+        self.used = set(existing)
+        self.deterministic = deterministic
+
+    def __contains__(self, oid):
+        return oid in self.used
+
+    def allocate(self, *key):
+        if self.deterministic and key:
+            oid = self._derive(key, 0)
+            attempt = 0
+            while oid in self.used:
+                attempt += 1
+                oid = self._derive(key, attempt)
+        else:
+            oid = secrets.token_hex(12).upper()
+            while oid in self.used:
+                oid = secrets.token_hex(12).upper()
+        self.used.add(oid)
+        return oid
+
+    @staticmethod
+    def _derive(key, attempt):
+        text = '\0'.join([_NAMESPACE, *map(str, key), str(attempt)])
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()[:24].upper()
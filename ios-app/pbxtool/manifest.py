@@ -0,0 +1,188 @@
+"""
+Declarative edits: a manifest lists the files that must be in each group and
+build phase, and the files that must not be in the project at all.
+
+    {
+      "target": "Inventry",
+      "include": ["services.json"],
+      "groups": {
+        "Inventry/Data": [
+          {"name": "InventoryModel.xcdatamodeld", "type": "wrapper.xcdatamodel"},
+          "PropertyEntity+CoreDataClass.swift"
+        ]
+      },
+      "phases": {"Resources": ["Inventry/Info.plist"]},
+      "absent": ["Inventry/Views/RoomDetailView_Old.swift"]
+    }
+
+A file joins the build phase its extension implies unless its entry gives
+"phase" (null for none). Manifests are JSON, or YAML when PyYAML is
+installed. Applying diffs the manifest against the parsed project first and
+queues only the missing edits, so an up-to-date project costs one load from
+the parse cache and is never written.
+"""
+import json
+import os
+import posixpath
+
+from . import profile
+from .project import FILE_TYPES, PHASE_ISAS
+from .transaction import MissingAnchorError, ProjectTransaction
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+_SECTIONS = ('target', 'include', 'groups', 'phases', 'absent')
+
+
+class ManifestError(ValueError):
+    """A manifest could not be read or does not describe a consistent state"""
+
+
+def _read(path):
+    with open(path, encoding='utf-8') as f:
+        if path.endswith(('.yaml', '.yml')):
+            if yaml is None:
+                raise ManifestError(f"{path}: PyYAML is not installed, use a JSON manifest")
+            return yaml.safe_load(f) or {}
+        try:
+            return json.load(f)
+        except ValueError as e:
+            raise ManifestError(f"{path}: {e}") from None
+
+
+def _phase(path, phase, source):
+    if phase is not None and phase not in PHASE_ISAS:
+        raise ManifestError(f"{source}: unknown build phase {phase!r} for {path}")
+    return phase
+
+
+def load_manifest(path, _including=None):
+    """
+    Read a manifest and the manifests it includes (relative to its own
+    folder) into {'target', 'files': {path: (type, phase)}, 'phases':
+    {phase: [paths]}, 'absent': [paths]}. A None phase means no build phase.
+    """
+    path = os.path.abspath(path)
+    including = _including if _including is not None else []
+    if path in including:
+        raise ManifestError(f"{path}: includes itself")
+    including.append(path)
+    data = _read(path)
+    if not isinstance(data, dict) or set(data) - set(_SECTIONS):
+        raise ManifestError(f"{path}: expected an object with only {', '.join(_SECTIONS)}")
+
+    manifest = {'target': None, 'files': {}, 'phases': {}, 'absent': []}
+    for include in data.get('include', []):
+        included = load_manifest(os.path.join(os.path.dirname(path), include), including)
+        _merge(manifest, included, path)
+    own = {'target': data.get('target'), 'files': {}, 'phases': {}, 'absent': list(data.get('absent', []))}
+    for group, entries in data.get('groups', {}).items():
+        for entry in entries:
+            if isinstance(entry, str):
+                entry = {'name': entry}
+            if 'name' not in entry:
+                raise ManifestError(f"{path}: file entry in {group} has no name")
+            file_path = posixpath.join(group, entry['name'])
+            file_type, phase = FILE_TYPES.get(posixpath.splitext(entry['name'])[1], ('file', None))
+            own['files'][file_path] = (entry.get('type') or file_type,
+                                       _phase(file_path, entry.get('phase', phase), path))
+    for phase, paths in data.get('phases', {}).items():
+        _phase(phase, phase, path)
+        own['phases'][phase] = list(paths)
+    _merge(manifest, own, path)
+    including.pop()
+    return manifest
+
+
+def _merge(manifest, other, source):
+    manifest['target'] = other['target'] or manifest['target']
+    for file_path, spec in other['files'].items():
+        if manifest['files'].get(file_path, spec) != spec:
+            raise ManifestError(f"{source}: {file_path} is declared twice with different settings")
+        manifest['files'][file_path] = spec
+    for phase, paths in other['phases'].items():
+        manifest['phases'].setdefault(phase, []).extend(p for p in paths if p not in manifest['phases'][phase])
+    manifest['absent'].extend(p for p in other['absent'] if p not in manifest['absent'])
+    conflicts = sorted(set(manifest['absent']) & (manifest['files'].keys() | {
+        p for paths in manifest['phases'].values() for p in paths}))
+    if conflicts:
+        raise ManifestError(f"{source}: {', '.join(conflicts)} declared both present and absent")
+
+
+def plan(project, manifest, target=None, create_groups=False):
+    """
+    Return the edits needed to bring project in line with manifest, as
+    (ProjectTransaction method, args, description) tuples. Empty when the
+    project already matches. A group the manifest adds files to must exist
+    unless create_groups is set.
+    """
+    target = target or manifest['target']
+    phase_ids = {}
+
+    def phase_id(phase):
+        if phase not in phase_ids:
+            target_id = project.target(target)
+            if target_id is None:
+                raise MissingAnchorError(f"Target {target or '(first)'} not found")
+            phase_ids[phase] = project.build_phase(target_id, PHASE_ISAS[phase])
+            if phase_ids[phase] is None:
+                raise MissingAnchorError(f"{phase} build phase not found")
+        return phase_ids[phase]
+
+    def find(path):
+        group_path, name = posixpath.split(path)
+        group_id = project.group(group_path)
+        return project.find_child(group_id, name) if group_id else None
+
+    edits = []
+    wanted = {}
+    for path, (file_type, phase) in manifest['files'].items():
+        ref_id = find(path)
+        if ref_id is None and not create_groups and project.group(posixpath.dirname(path)) is None:
+            raise MissingAnchorError(f"Group {posixpath.dirname(path)} not found")
+        if ref_id is None:
+            edits.append(('add_file', (path, file_type, phase or ''),
+                          f"add {path}" + (f" to {phase}" if phase else "")))
+        elif phase:
+            wanted.setdefault(path, []).append(phase)
+    for phase, paths in manifest['phases'].items():
+        for path in paths:
+            if path not in manifest['files'] and find(path) is None:
+                raise MissingAnchorError(f"File {path} not found")
+            wanted.setdefault(path, []).append(phase)
+    for path, phases in wanted.items():
+        ref_id = find(path)
+        for phase in dict.fromkeys(phases):
+            if ref_id is None or not project.build_files_for(ref_id, phase_id(phase)):
+                edits.append(('add_to_phase', (path, phase), f"add {path} to {phase}"))
+    for path in manifest['absent']:
+        if find(path) is not None:
+            edits.append(('remove_file', (path,), f"remove {path}"))
+    return edits
+
+
+def apply(project_path, manifest, target=None, dry_run=False, deterministic=False, label='pbxtool apply',
+          cache=True, snapshot=None, create_groups=False):
+    """
+    Apply the delta between manifest and the project in one transaction.
+    Returns the list of changes (the planned edits when dry_run is set);
+    empty means the project already matched and was not written. With
+    cache=False the project is loaded lazily instead of through the parse
+    cache, for projects that are edited once. A missing group raises
+    MissingAnchorError unless create_groups is set.
+    """
+    tx = ProjectTransaction(project_path, target=target or manifest['target'],
+                            deterministic=deterministic, snapshot=snapshot, label=label, cache=cache,
+                            create_groups=create_groups)
+    project = tx.open()
+    with profile.phase('manifest.plan') as p:
+        edits = plan(project, manifest, tx.target_name, create_groups)
+        p.add(edits=len(edits))
+    if dry_run or not edits:
+        return [description for _, _, description in edits]
+    for method, args, _ in edits:
+        getattr(tx, method)(*args)
+    return tx.commit()
@@ -0,0 +1,322 @@
+"""
+Three-way merge of project.pbxproj by object ID, usable as a git merge driver:
+
+    # .gitattributes
+    *.pbxproj merge=pbxproj
+
+    git config merge.pbxproj.name "Xcode project merge by object ID"
+    git config merge.pbxproj.driver "PYTHONPATH=ios-app python3 -m pbxtool merge %O %A %B --marker-size %L --path %P"
+
+Objects are matched by ID. Wherever two of base, ours and theirs have the
+same text for an object, the third version wins and is copied verbatim, so
+most of a merge is byte comparisons and everything ours keeps is left
+exactly as it was. Only objects changed on both sides are parsed and merged
+key by key:
+
+- reference lists (group children, phase files, targets ...) are merged as
+  memberships: what either side added is kept, in that side's order, and
+  what either side removed is dropped;
+- dictionaries such as buildSettings are merged key by key;
+- any other value changed differently on both sides is a conflict, written
+  with git's markers around just the lines that differ.
+
+An object deleted on one side and changed on the other is a conflict too.
+Files not in Xcode's own formatting are normalized through the serializer
+first.
+"""
+import bisect
+import re
+from operator import itemgetter
+
+from . import profile
+from .parser import Layout, parse, parse_layout, scan_layout
+from .project import LIST_REFERENCE_KEYS, Project
+from .serializer import dumps, fragment_writer
+from .writer import replace_file
+
+MARKER_SIZE = 7
+LABELS = ('ours', 'theirs')
+
+_MISSING = object()
+_COMMENT = re.compile(rb'\t\t\w+ /\* (.*?) \*/ = ')
+
+
+class _Side:
+    """One version of the file: its text and where each object sits in it"""
+
+    def __init__(self, path, name=None):
+        with open(path, 'rb') as f:
+            self.buf = f.read()
+        if not self.buf.strip():
+            # No common ancestor: git passes an empty base
+            self.layout = Layout()
+            self.layout.objects_start = self.layout.objects_end = 0
+        else:
+            self.layout = scan_layout(self.buf)
+            if self.layout is None:
+                root, _ = parse_layout(self.buf)
+                self.buf = dumps(Project(root, name or path)).encode('utf-8')
+                self.layout = scan_layout(self.buf)
+        self.spans = self.layout.spans
+        self._isa = None
+
+    def text(self, oid):
+        start, end = self.spans[oid]
+        return self.buf[start:end]
+
+    def object(self, oid):
+        return parse(b'{' + self.text(oid) + b'}')[oid]
+
+    def comment(self, oid):
+        m = _COMMENT.match(self.buf, self.spans[oid][0])
+        return m.group(1).decode('utf-8') if m else None
+
+    def isa(self, oid):
+        if self._isa is None:
+            self._isa = {oid: isa for isa, oids in self.layout.order.items() for oid in oids}
+        return self._isa[oid]
+
+    @property
+    def header(self):
+        return self.buf[:self.layout.objects_start]
+
+    @property
+    def trailer(self):
+        return self.buf[self.layout.objects_end:]
+
+
+class _Annotations:
+    """{ID: comment} for rendering merged objects, read from whichever side's version of the object won"""
+
+    def __init__(self, merge):
+        self.merge = merge
+
+    def __contains__(self, oid):
+        m = self.merge
+        return oid in m.ours.spans or oid in m.theirs.spans or oid in m.base.spans
+
+    def get(self, oid, default=None):
+        m = self.merge
+        sides = (m.theirs, m.ours, m.base) if oid in m.taken else (m.ours, m.theirs, m.base)
+        for side in sides:
+            if oid in side.spans:
+                return side.comment(oid)
+        return default
+
+
+class _Merge:
+    def __init__(self, base, ours, theirs, marker_size=MARKER_SIZE, labels=LABELS):
+        self.base, self.ours, self.theirs = base, ours, theirs
+        self.marker_size = marker_size
+        self.labels = labels
+        self.edits = []         # (start, end, text) on ours
+        self.inserts = {}       # isa -> [(ID, text)] of objects ours does not have
+        self.removed = {}       # isa -> number of ours' objects deleted
+        self.combined = []      # (ID, merged, alternative or None) of objects changed on both sides
+        self.taken = set()      # IDs whose text comes from theirs
+        self.conflicts = []
+
+    def run(self):
+        base, ours, theirs = self.base, self.ours, self.theirs
+        bspans, ospans = base.spans, ours.spans
+        bbuf, obuf, tbuf = base.buf, ours.buf, theirs.buf
+        for oid, (start, end) in theirs.spans.items():
+            t = tbuf[start:end]
+            span = ospans.get(oid)
+            o = obuf[span[0]:span[1]] if span else None
+            if t == o:
+                continue
+            span = bspans.get(oid)
+            b = bbuf[span[0]:span[1]] if span else None
+            if t == b:
+                continue
+            if o is None and b is None:
+                self.taken.add(oid)
+                self.inserts.setdefault(theirs.isa(oid), []).append((oid, t))
+            elif o is None:
+                self.conflicts.append(f"{oid}: deleted in {self.labels[0]}, changed in {self.labels[1]}")
+                self.inserts.setdefault(theirs.isa(oid), []).append((oid, self.markers(b'', t)))
+            elif o == b:
+                self.taken.add(oid)
+                self.edits.append(ospans[oid] + (t,))
+            else:
+                self.combine(oid)
+        for oid, (start, end) in bspans.items():
+            if oid in theirs.spans or oid not in ospans:
+                continue
+            o = ours.text(oid)
+            if o == bbuf[start:end]:
+                self.edits.append(ospans[oid] + (b'',))
+                isa = ours.isa(oid)
+                self.removed[isa] = self.removed.get(isa, 0) + 1
+            else:
+                self.conflicts.append(f"{oid}: changed in {self.labels[0]}, deleted in {self.labels[1]}")
+                self.edits.append(ospans[oid] + (self.markers(o, b''),))
+        self.render()
+        self.surroundings()
+        return self.output()
+
+    def combine(self, oid):
+        base = self.base.object(oid) if oid in self.base.spans else {}
+        conflicts = []
+        merged = _merge_dict(base, self.ours.object(oid), self.theirs.object(oid), (), conflicts)
+        alternative = None
+        for path, _, theirs in conflicts:
+            alternative = _replaced(alternative or merged, path, theirs)
+            self.conflicts.append(f"{oid} {'.'.join(path)}: changed on both sides")
+        self.combined.append((oid, merged, alternative))
+
+    def render(self):
+        """Serialize the objects merged key by key, now that every comment source is known"""
+        write = fragment_writer(_Annotations(self))
+        for oid, merged, alternative in self.combined:
+            text = write(oid, merged).encode('utf-8')
+            if alternative is not None:
+                text = self.markers(text, write(oid, alternative).encode('utf-8'))
+            self.edits.append(self.ours.spans[oid] + (text,))
+
+    def surroundings(self):
+        """Merge the text before and after the objects dictionary (archiveVersion, rootObject ...)"""
+        ours = self.ours
+        for name, region in (('header', (0, ours.layout.objects_start)),
+                             ('trailer', (ours.layout.objects_end, len(ours.buf)))):
+            b, o, t = (getattr(side, name) for side in (self.base, ours, self.theirs))
+            if o == t or t == b:
+                continue
+            if o == b:
+                self.edits.append(region + (t,))
+            else:
+                self.conflicts.append(f"file {name}: changed on both sides")
+                self.edits.append(region + (self.markers(o, t),))
+
+    def output(self):
+        ours = self.ours
+        layout, buf = ours.layout, ours.buf
+        sections, order = layout.sections, layout.order
+        edits = self.edits
+        emptied = {isa for isa in sections
+                   if isa not in self.inserts and self.removed.get(isa, 0) == len(order.get(isa, ()))}
+        for isa, items in self.inserts.items():
+            items.sort(key=itemgetter(0))
+            if isa in sections:
+                ids = order.get(isa, [])
+                for oid, text in items:
+                    i = bisect.bisect_left(ids, oid)
+                    pos = ours.spans[ids[i]][0] if i < len(ids) else sections[isa][1][0]
+                    edits.append((pos, pos, text))
+                continue
+            # A section ours does not have goes before the next one alphabetically, as the writer does it
+            text = (f"/* Begin {isa} section */\n".encode('ascii') + b''.join(text for _, text in items)
+                    + f"/* End {isa} section */\n".encode('ascii'))
+            later = [name for name in sections if name > isa and name not in emptied]
+            if later:
+                edits.append((sections[min(later)][0][0],) * 2 + (text + b'\n',))
+            else:
+                edits.append((layout.objects_end,) * 2 + (b'\n' + text,))
+        for isa in emptied:
+            begin, end = sections[isa]
+            start = begin[0] - 1 if buf[begin[0] - 2:begin[0]] == b'\n\n' else begin[0]
+            edits = [e for e in edits if not (start <= e[0] and e[1] <= end[1])]
+            edits.append((start, end[1], b''))
+        edits.sort(key=itemgetter(0, 1))
+        chunks, prev = [], 0
+        for start, end, text in edits:
+            chunks.append(buf[prev:start])
+            chunks.append(text)
+            prev = end
+        chunks.append(buf[prev:])
+        return chunks
+
+    def markers(self, ours, theirs):
+        """ours and theirs with git's conflict markers around the lines where they differ"""
+        a, b = ours.splitlines(True), theirs.splitlines(True)
+        head = 0
+        while head < min(len(a), len(b)) and a[head] == b[head]:
+            head += 1
+        tail = 0
+        while tail < min(len(a), len(b)) - head and a[-1 - tail] == b[-1 - tail]:
+            tail += 1
+        size = self.marker_size
+        return b''.join(a[:head] + [f"{'<' * size} {self.labels[0]}\n".encode('utf-8')] + a[head:len(a) - tail]
+                        + [b'=' * size + b'\n'] + b[head:len(b) - tail]
+                        + [f"{'>' * size} {self.labels[1]}\n".encode('utf-8')] + a[len(a) - tail:])
+
+
+def _merge_dict(base, ours, theirs, path, conflicts):
+    merged = {}
+    for key in list(ours) + [key for key in theirs if key not in ours]:
+        value = _merge_value(base.get(key, _MISSING), ours.get(key, _MISSING), theirs.get(key, _MISSING),
+                             path + (key,), conflicts)
+        if value is not _MISSING:
+            merged[key] = value
+    return merged
+
+
+def _merge_value(base, ours, theirs, path, conflicts):
+    if ours == theirs or theirs == base:
+        return ours
+    if ours == base:
+        return theirs
+    if len(path) == 1 and path[0] in LIST_REFERENCE_KEYS and isinstance(ours, list) and isinstance(theirs, list):
+        return _merge_list(base if isinstance(base, list) else [], ours, theirs)
+    if isinstance(ours, dict) and isinstance(theirs, dict):
+        return _merge_dict(base if isinstance(base, dict) else {}, ours, theirs, path, conflicts)
+    conflicts.append((path, ours, theirs))
+    return ours
+
+
+def _merge_list(base, ours, theirs):
+    """
+    ours' order, minus what theirs removed, plus what theirs added, each
+    placed before the element it comes before in theirs (or at the end), so
+    additions at the end of both lists come out as ours' then theirs'
+    """
+    in_base, in_theirs = set(base), set(theirs)
+    merged = [item for item in ours if item in in_theirs or item not in in_base]
+    present = set(merged)
+    before, anchor = {}, None
+    for item in reversed(theirs):
+        if item in present:
+            anchor = item
+        elif item not in in_base:
+            before.setdefault(anchor, []).append(item)
+    if not before:
+        return merged
+    result = []
+    for item in merged:
+        result.extend(reversed(before.get(item, ())))
+        result.append(item)
+    result.extend(reversed(before.get(None, ())))
+    return result
+
+
+def _replaced(obj, path, value):
+    """A copy of obj with the value at path (a tuple of keys) replaced, or removed for _MISSING"""
+    obj = dict(obj)
+    key = path[0]
+    if len(path) > 1:
+        obj[key] = _replaced(obj[key], path[1:], value)
+    elif value is _MISSING:
+        obj.pop(key, None)
+    else:
+        obj[key] = value
+    return obj
+
+
+def merge(base_path, ours_path, theirs_path, path=None, marker_size=MARKER_SIZE, labels=LABELS):
+    """
+    Merge theirs into ours against base, rewriting ours_path the way a git
+    merge driver does. path is the file's path in the repository, used
+    for names in comments. Returns the conflicts, one description each;
+    the written file has markers for every one of them.
+    """
+    with profile.phase('merge.read') as p:
+        sides = [_Side(side, path) for side in (base_path, ours_path, theirs_path)]
+        p.add(bytes=sum(len(side.buf) for side in sides), objects=sum(len(side.spans) for side in sides))
+    job = _Merge(*sides, marker_size=marker_size, labels=labels)
+    with profile.phase('merge.run') as p:
+        chunks = job.run()
+        p.add(objects=len(job.edits) + sum(map(len, job.inserts.values())), conflicts=len(job.conflicts))
+    with profile.phase('merge.write', bytes=sum(map(len, chunks))):
+        replace_file(ours_path, chunks)
+    return job.conflicts
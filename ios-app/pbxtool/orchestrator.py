@@ -0,0 +1,397 @@
+"""
+Build orchestrator: run the steps listed in build-map.json as a DAG.
+
+Each subproject's "steps" give a shell command, the folder to run it in,
+the steps it runs after and the files it reads and writes:
+
+    "steps": {
+      "lint": {"run": "npm run lint", "cwd": "client-dashboard",
+               "inputs": ["client-dashboard/app/*", "client-dashboard/lib/*"]},
+      "build": {"run": "npm run build", "cwd": "client-dashboard", "after": ["lint", "workspace:install"],
+                "outputs": ["client-dashboard/out"], "env": ["CUSTOM_KEY"]}
+    }
+
+A step without "inputs" reads the subproject's inputs (see
+pbxtool.affected). "after" names steps of the same subproject or
+"other-subproject:step". "requires" names a program that must be on PATH;
+without it the step is skipped (xcodebuild off macOS). "ignore" patterns
+are left out of both the inputs and the stored outputs. Outputs should be
+git-ignored, so a step's outputs never count as inputs.
+
+A step's key is a hash of its command, its env values, the keys of the
+steps it runs after and the git blob IDs of its inputs, working-tree edits
+included. For each step, in dependency order:
+
+- if the key is the one of the step's last run and its outputs look
+  untouched (same file count, sizes and mtimes), nothing is done;
+- if the local store has outputs for the key, they are restored from it;
+- otherwise the command runs and its outputs are stored.
+
+The store (.build-cache/ at the repository root) is content-addressed, so
+files shared between runs or subprojects (most of two node_modules trees)
+are kept once. Nothing here touches the network, so a run where every key
+hits works offline.
+"""
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from . import profile
+from .affected import BuildMapError, _matches, _Scope, record, tree_blobs
+from .writer import replace_file
+
+STORE_DIR = '.build-cache'
+
+# Results: what happened to a step
+FRESH = 'fresh'         # key unchanged, outputs still in place
+RESTORED = 'restored'   # outputs copied back from the store
+RAN = 'ran'
+FAILED = 'failed'
+SKIPPED = 'skipped'     # a step it runs after failed, or its program is missing
+
+_OK = (FRESH, RESTORED, RAN)
+
+
+class Step:
+    def __init__(self, subproject, name, entry, scope):
+        self.id = f"{subproject}:{name}"
+        self.subproject = subproject
+        try:
+            self.run = entry['run']
+        except (KeyError, TypeError):
+            raise BuildMapError(f"Step {self.id} needs a \"run\" command") from None
+        self.cwd = entry.get('cwd', subproject)
+        self.after = [dep if ':' in dep else f"{subproject}:{dep}" for dep in entry.get('after', [])]
+        self.inputs = entry.get('inputs')
+        self.outputs = entry.get('outputs', [])
+        self.ignore = entry.get('ignore', [])
+        self.env = entry.get('env', [])
+        self.requires = entry.get('requires')
+        self.scope = scope
+        self.key = None
+        self.status = None
+        self.seconds = 0.0
+        self.started = None
+        self.detail = ''
+
+    def reads(self, path):
+        if _matches(path, self.ignore):
+            return False
+        if self.inputs is None:
+            return path in self.scope
+        return _matches(path, self.inputs)
+
+    def compute_key(self, blobs, steps):
+        h = hashlib.sha256()
+        h.update(f"{self.run}\0{self.cwd}\0".encode('utf-8'))
+        for name in self.env:
+            h.update(f"{name}={os.environ.get(name, '')}\0".encode('utf-8'))
+        for dep in sorted(self.after):
+            h.update(f"{dep}={steps[dep].key}\0".encode('utf-8'))
+        for path in sorted(path for path in blobs if self.reads(path)):
+            h.update(f"{path}\0{blobs[path]}\n".encode('utf-8'))
+        self.key = h.hexdigest()
+        return self.key
+
+
+def load_steps(root, build_map, only=None):
+    """
+    {step ID: Step} for every step in build_map, in an order where each
+    step comes after the ones it runs after. only (subproject names or step
+    IDs) limits that to those steps and what they depend on.
+    """
+    steps = {}
+    for subproject, entry in build_map.items():
+        scope = _Scope(root, subproject, entry)
+        for name, step_entry in entry.get('steps', {}).items():
+            step = Step(subproject, name, step_entry, scope)
+            steps[step.id] = step
+    for step in steps.values():
+        for dep in step.after:
+            if dep not in steps:
+                raise BuildMapError(f"Step {step.id} runs after unknown step {dep}")
+
+    if only:
+        wanted = []
+        for name in only:
+            matched = [oid for oid in steps if oid == name or steps[oid].subproject == name]
+            if not matched:
+                raise BuildMapError(f"No step or subproject named {name}")
+            wanted += matched
+    else:
+        wanted = list(steps)
+
+    ordered, state = {}, {}
+
+    def visit(oid, chain):
+        if state.get(oid) == 'done':
+            return
+        if state.get(oid) == 'visiting':
+            raise BuildMapError(f"Steps run after each other in a cycle: {' -> '.join(chain + [oid])}")
+        state[oid] = 'visiting'
+        for dep in steps[oid].after:
+            visit(dep, chain + [oid])
+        state[oid] = 'done'
+        ordered[oid] = steps[oid]
+
+    for oid in wanted:
+        visit(oid, [])
+    return ordered
+
+
+class Store:
+    """Content-addressed output store: objects/ by content digest, one manifest per step key"""
+
+    def __init__(self, root):
+        self.path = os.path.join(root, STORE_DIR)
+        self.root = root
+
+    def _manifest_path(self, step, key):
+        return os.path.join(self.path, 'manifests', step.id.replace(':', '/'), key + '.json')
+
+    def _object_path(self, digest):
+        return os.path.join(self.path, 'objects', digest[:2], digest[2:])
+
+    def has(self, step, key):
+        return os.path.exists(self._manifest_path(step, key))
+
+    def log_path(self, step):
+        return os.path.join(self.path, 'logs', step.id.replace(':', '/') + '.log')
+
+    def _put_file(self, path):
+        h = hashlib.blake2b(digest_size=20)
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                h.update(block)
+        digest = h.hexdigest()
+        target = self._object_path(digest)
+        if not os.path.exists(target):
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            tmp = f"{target}.{os.getpid()}.{threading.get_ident()}"
+            shutil.copyfile(path, tmp)
+            os.replace(tmp, target)
+        return digest
+
+    def save(self, step, key):
+        """Store the step's outputs as they are now under key"""
+        entries = []
+        for rel, kind, full in _walk(self.root, step.outputs, step.ignore):
+            if kind == 'link':
+                entries.append([rel, 'link', os.readlink(full)])
+            elif kind == 'dir':
+                entries.append([rel, 'dir'])
+            else:
+                entries.append([rel, self._put_file(full), os.stat(full).st_mode & 0o777])
+        manifest = self._manifest_path(step, key)
+        os.makedirs(os.path.dirname(manifest), exist_ok=True)
+        replace_file(manifest, [json.dumps({'outputs': step.outputs, 'entries': entries}).encode('utf-8')],
+                     durable=False)
+
+    def restore(self, step, key):
+        """Replace the step's outputs with the ones stored under key"""
+        with open(self._manifest_path(step, key), encoding='utf-8') as f:
+            manifest = json.load(f)
+        _clear(self.root, step.outputs, step.ignore)
+        for entry in manifest['entries']:
+            full = os.path.join(self.root, entry[0])
+            if entry[1] == 'dir':
+                os.makedirs(full, exist_ok=True)
+                continue
+            os.makedirs(os.path.dirname(full), exist_ok=True)
+            if entry[1] == 'link':
+                os.symlink(entry[2], full)
+            else:
+                shutil.copyfile(self._object_path(entry[1]), full)
+                os.chmod(full, entry[2])
+
+    # -- last run of each step -------------------------------------------
+
+    def _state_path(self):
+        return os.path.join(self.path, 'state.json')
+
+    def read_state(self):
+        try:
+            with open(self._state_path(), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def write_state(self, state):
+        os.makedirs(self.path, exist_ok=True)
+        replace_file(self._state_path(), [json.dumps(state, indent=1, sort_keys=True).encode('utf-8')],
+                     durable=False)
+
+
+def _walk(root, outputs, ignore):
+    """Yield (repository path, 'file' / 'link' / 'dir', full path) for everything under outputs"""
+    for output in outputs:
+        full = os.path.join(root, output)
+        if os.path.islink(full):
+            yield output, 'link', full
+        elif os.path.isfile(full):
+            yield output, 'file', full
+        elif os.path.isdir(full):
+            for directory, dirs, files in os.walk(full):
+                rel_dir = os.path.relpath(directory, root).replace(os.sep, '/')
+                if _matches(rel_dir, ignore):
+                    dirs[:] = []
+                    continue
+                if not dirs and not files:
+                    yield rel_dir, 'dir', directory
+                for name in dirs[:]:
+                    if os.path.islink(os.path.join(directory, name)):
+                        dirs.remove(name)
+                        files.append(name)
+                for name in files:
+                    path = os.path.join(directory, name)
+                    rel = rel_dir + '/' + name
+                    if _matches(rel, ignore):
+                        continue
+                    yield rel, 'link' if os.path.islink(path) else 'file', path
+
+
+def _clear(root, outputs, ignore):
+    """Delete the outputs, leaving ignored paths inside them (a build's own cache) in place"""
+    listed = list(_walk(root, outputs, ignore))
+    for _, kind, full in listed:
+        if kind != 'dir':
+            os.unlink(full)
+    for output in outputs:
+        full = os.path.join(root, output)
+        if os.path.isdir(full) and not os.path.islink(full):
+            for directory, _, _ in sorted(os.walk(full), reverse=True):
+                try:
+                    os.rmdir(directory)
+                except OSError:
+                    pass  # holds something ignored
+
+
+def fingerprint(root, step):
+    """(count, total size, latest mtime) of the step's outputs: cheap enough to check on every run"""
+    count = size = latest = 0
+    for _, kind, full in _walk(root, step.outputs, step.ignore):
+        st = os.lstat(full)
+        count += 1
+        size += st.st_size if kind == 'file' else 0
+        latest = max(latest, st.st_mtime_ns)
+    return [count, size, latest]
+
+
+def _execute(root, store, step, offline):
+    """Run the step's command, its output going to its log file; returns (ok, detail)"""
+    env = dict(os.environ)
+    if offline:
+        env['npm_config_offline'] = 'true'  # npm installs from its own cache only
+    log = store.log_path(step)
+    os.makedirs(os.path.dirname(log), exist_ok=True)
+    with open(log, 'wb') as f:
+        code = subprocess.call(step.run, shell=True, cwd=os.path.join(root, step.cwd), env=env,
+                               stdout=f, stderr=subprocess.STDOUT)
+    if code != 0:
+        return False, f"exit status {code}, see {os.path.relpath(log, root)}"
+    return True, ''
+
+
+def build(root, build_map, only=None, jobs=2, force=False, offline=False, log=print):
+    """
+    Run the steps (see the module docstring) with at most jobs commands at
+    a time. Returns the steps in dependency order, each with its status,
+    seconds and detail.
+    """
+    steps = load_steps(root, build_map, only)
+    store = Store(root)
+    state = store.read_state()
+    blobs = tree_blobs(root)
+    stale = False   # a step ran or restored since blobs was taken
+    started = time.perf_counter()
+    pending = dict(steps)
+    running = {}
+
+    def work(step, action):
+        step.started = time.perf_counter() - started
+        clock = time.perf_counter()
+        try:
+            with profile.phase(f"build.{action}", step=step.id):
+                if action == RESTORED:
+                    store.restore(step, step.key)
+                    ok, detail = True, ''
+                else:
+                    ok, detail = _execute(root, store, step, offline)
+                    if ok and step.outputs:
+                        store.save(step, step.key)
+        except OSError as e:
+            ok, detail = False, str(e)
+        step.seconds = time.perf_counter() - clock
+        step.status, step.detail = (action if ok else FAILED), detail
+        return step
+
+    def finish(step):
+        if step.status in (RAN, RESTORED):
+            state[step.id] = {'key': step.key, 'outputs': fingerprint(root, step)}
+        icon = {RAN: '✅', RESTORED: '♻️ ', FRESH: '⏭️ ', FAILED: '❌', SKIPPED: '⏭️ '}[step.status]
+        log(f"{icon} {step.id}: {step.status}" + (f" ({step.detail})" if step.detail else "")
+            + (f" in {step.seconds:.1f} s" if step.status in (RAN, RESTORED, FAILED) else ""))
+
+    with ThreadPoolExecutor(max(1, jobs)) as pool:
+        while pending or running:
+            for oid, step in list(pending.items()):
+                deps = [steps[dep] for dep in step.after]
+                if any(dep.status is None for dep in deps):
+                    continue
+                del pending[oid]
+                if any(dep.status not in _OK for dep in deps):
+                    step.status, step.detail = SKIPPED, "a step it runs after did not succeed"
+                    finish(step)
+                    continue
+                if step.requires and shutil.which(step.requires) is None:
+                    step.status, step.detail = SKIPPED, f"{step.requires} not found"
+                    finish(step)
+                    continue
+                if stale:
+                    blobs, stale = tree_blobs(root), False
+                step.compute_key(blobs, steps)
+                last = state.get(step.id, {})
+                if not force and last.get('key') == step.key and last.get('outputs') == fingerprint(root, step):
+                    step.status = FRESH
+                    finish(step)
+                    continue
+                action = RESTORED if not force and step.outputs and store.has(step, step.key) else RAN
+                running[pool.submit(work, step, action)] = step
+                log(f"{'♻️ ' if action == RESTORED else '🔨'} {step.id}: "
+                    f"{'restoring' if action == RESTORED else step.run}")
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                step = running.pop(future)
+                if future.exception() is not None:
+                    step.status, step.detail = FAILED, str(future.exception())
+                finish(step)
+                stale = stale or step.status in (RAN, RESTORED)
+    store.write_state(state)
+
+    # A subproject whose steps all succeeded counts as built for pbxtool affected
+    built = [name for name in build_map
+             if any(step.subproject == name for step in steps.values())
+             and all(step.status in _OK for step in steps.values() if step.subproject == name)]
+    if built:
+        record(root, build_map, built)
+    return list(steps.values())
+
+
+def report(steps, wall):
+    """The timing table printed after a build"""
+    width = max([len(step.id) for step in steps] + [4])
+    lines = [f"{'step':<{width}}  {'status':<8}  {'start':>7}  {'time':>7}"]
+    for step in steps:
+        start = f"{step.started:6.1f}s" if step.started is not None else ''
+        lines.append(f"{step.id:<{width}}  {step.status:<8}  {start:>7}  {step.seconds:6.1f}s")
+    busy = sum(step.seconds for step in steps)
+    lines.append(f"{len(steps)} steps in {wall:.1f} s wall, {busy:.1f} s of step time"
+                 + (f" ({busy / wall:.1f}x in parallel)" if wall > 0 and busy > wall * 1.05 else ""))
+    return lines
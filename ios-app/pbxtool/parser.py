@@ -0,0 +1,294 @@
+"""
+Single-pass tokenizer and parser for the OpenStep plist format used by project.pbxproj
+"""
+import re
+
+from . import profile
+from .records import MAPPINGS, compact, intern_id, paused_gc
+
+# Whitespace and comments are skipped as part of matching the next token, so
+# every token costs one match call. Every branch is linear in the length of
+# the text it matches and the skip loop is possessive, so a scan never
+# backtracks across the file.
+_SKIP = rb'''(?:[ \t\r\n]++|/\*.*?\*/|//[^\n]*+)*+'''
+_QUOTED_STRING = rb'''"[^"\\]*(?:\\.[^"\\]*)*"'''
+_WORD_STRING = rb'''[A-Za-z0-9_$+/:.\-]+'''
+_TOKEN = re.compile(_SKIP + rb'(?:(?P<quoted>%s)|(?P<word>%s)|(?P<punct>[{}()=;,]))'
+                    % (_QUOTED_STRING, _WORD_STRING), re.DOTALL)
+_TRAILER = re.compile(_SKIP, re.DOTALL)
+
+# Fast paths for the two most common shapes, `key = scalar;` and `scalar,`,
+# each consumed with a single match instead of four or two tokens.
+_ENTRY = re.compile(_SKIP + rb'(?:(%s)|(%s))' % (_QUOTED_STRING, _WORD_STRING) + _SKIP + b'=' + _SKIP
+                    + rb'(?:(%s)|(%s))' % (_QUOTED_STRING, _WORD_STRING) + _SKIP + b';', re.DOTALL)
+_ELEMENT = re.compile(_SKIP + rb'(?:(%s)|(%s))' % (_QUOTED_STRING, _WORD_STRING) + _SKIP + b',', re.DOTALL)
+
+# Section markers sit on their own line inside the objects dictionary
+_SECTION = re.compile(rb'^[ \t]*/\* (Begin|End) (\w+) section \*/', re.MULTILINE)
+
+# In Xcode's own formatting the objects dictionary opens and closes on lines
+# of their own, and every object starts a line indented by exactly two tabs
+_OBJECTS_OPEN = b'\n\tobjects = {\n'
+_OBJECTS_CLOSE = b'\n\t};\n'
+_MARKER = re.compile(rb'\n/\* (Begin|End) (\w+) section \*/\n')
+# Inside the objects dictionary the only other two-tab lines close multi-line objects
+_OBJECT_START = re.compile(rb'\n\t\t([A-Za-z0-9_]+) ')
+
+_ESCAPE = re.compile(r'\\(.)', re.DOTALL)
+_UNESCAPE = {'n': '\n', 't': '\t', 'r': '\r', '"': '"', '\\': '\\', "'": "'"}
+
+_QUOTED = _TOKEN.groupindex['quoted']
+_WORD = _TOKEN.groupindex['word']
+
+# What the parser expects next
+_VALUE, _ITEM, _KEY, _EQUALS, _SEMICOLON, _SEPARATOR, _DONE = range(7)
+
+
+class PBXParseError(ValueError):
+    """Raised when project.pbxproj is not valid OpenStep plist text"""
+
+    def __init__(self, message, offset):
+        super().__init__(f"{message} at byte {offset}")
+        self.offset = offset
+
+
+def _unescape(text):
+    return _ESCAPE.sub(lambda m: _UNESCAPE.get(m.group(1), m.group(1)), text)
+
+
+def _string(m, quoted):
+    """Decode the string matched by group quoted (a quoted string) or quoted + 1 (a bare word)"""
+    text = m.group(quoted)
+    if text is None:
+        return m.group(quoted + 1).decode('utf-8')
+    text = text[1:-1].decode('utf-8')
+    return _unescape(text) if '\\' in text else text
+
+
+class Layout:
+    """
+    Byte offsets of the objects in the original file.
+
+    spans maps each object ID to the (start, end) of its full line(s),
+    order lists the object IDs of each isa in file order, sections maps
+    each isa to the spans of its Begin and End marker lines, objects_start
+    is the end of the line opening the objects dictionary and objects_end
+    the start of the line closing it.
+    """
+
+    def __init__(self):
+        self.spans = {}
+        self.order = {}
+        self.sections = {}
+        self.objects_start = None
+        self.objects_end = None
+
+
+def _line_start(buf, pos):
+    return buf.rfind(b'\n', 0, pos) + 1
+
+
+def _line_end(buf, pos):
+    return pos + 1 if buf[pos:pos + 1] == b'\n' else pos
+
+
+def parse_layout(buf):
+    """
+    Parse project.pbxproj bytes (or an mmap of them), returning (root, Layout).
+    Each object is compacted (see pbxtool.records) as soon as it is complete.
+
+    Tokens are matched one at a time at the current offset and fed through a
+    small state machine with an explicit stack, which keeps the per-token
+    cost to one regex match and a few comparisons. The result is a tree, so
+    the cyclic garbage collector is paused for the duration.
+    """
+    with profile.phase('parse', bytes=len(buf)) as p, paused_gc():
+        root, layout = _parse_layout(buf)
+        if layout.objects_start is not None:
+            p.add(objects=len(layout.spans))
+        elif isinstance(root, dict):
+            p.add(objects=len(root))  # a bare dictionary of objects: a lazily parsed section or object
+    return root, layout
+
+
+def _parse_layout(buf):
+    layout = Layout()
+    spans, order, sections = layout.spans, layout.order, layout.sections
+    stack = []          # (container, key) of every enclosing dict or array
+    container = key = root = objects = None
+    markers, next_marker, last_end, entry_start = [], 0, 0, 0
+    expect = _VALUE
+    pos = 0
+
+    while True:
+        if expect == _KEY and container is not objects:
+            m = _ENTRY.match(buf, pos)
+            if m is not None:
+                container[_string(m, 1)] = _string(m, 3)
+                pos = m.end()
+                continue
+        elif expect == _ITEM:
+            m = _ELEMENT.match(buf, pos)
+            if m is not None:
+                container.append(_string(m, 1))
+                pos = m.end()
+                continue
+        m = _TOKEN.match(buf, pos)
+        if m is None:
+            break
+        pos = m.end()
+        kind = m.lastindex
+        start = m.start(kind)
+        if kind == _WORD:
+            token, value = 's', m.group(kind).decode('utf-8')
+        elif kind == _QUOTED:
+            value = buf[start + 1:pos - 1].decode('utf-8')
+            token, value = 's', _unescape(value) if '\\' in value else value
+        else:
+            token = m.group(kind)
+
+        if expect == _KEY:
+            if token == 's':
+                key, expect = value, _EQUALS
+                if container is objects:
+                    key = intern_id(key)
+                    # Section markers before this object; last_end keeps a span off the marker line
+                    while next_marker < len(markers) and markers[next_marker].start() < start:
+                        marker = markers[next_marker]
+                        next_marker += 1
+                        bounds = (marker.start(), _line_end(buf, marker.end()))
+                        sections.setdefault(marker.group(2).decode('ascii'), [None, None])[marker.group(1) == b'End'] = bounds
+                        last_end = bounds[1]
+                    entry_start = start
+                continue
+            if token != b'}':
+                raise PBXParseError(f"Expected dictionary key, found {token!r}", start)
+            if container is objects:
+                while next_marker < len(markers) and markers[next_marker].start() < start:
+                    marker = markers[next_marker]
+                    next_marker += 1
+                    sections.setdefault(marker.group(2).decode('ascii'), [None, None])[marker.group(1) == b'End'] = \
+                        (marker.start(), _line_end(buf, marker.end()))
+                layout.objects_end = _line_start(buf, start)
+            value = container
+            container, key = stack.pop()
+        elif expect == _EQUALS:
+            if token != b'=':
+                raise PBXParseError(f"Expected b'=', found {token!r}", start)
+            expect = _VALUE
+            continue
+        elif expect == _SEMICOLON:
+            if token != b';':
+                raise PBXParseError(f"Expected b';', found {token!r}", start)
+            if container is objects:
+                span_start = max(_line_start(buf, entry_start), last_end)
+                last_end = _line_end(buf, pos)
+                spans[key] = (span_start, last_end)
+                obj = objects[key]
+                if isinstance(obj, MAPPINGS):
+                    order.setdefault(obj.get('isa'), []).append(key)
+                # A marker-like line inside a multi-line string is not a marker
+                while next_marker < len(markers) and markers[next_marker].start() < pos:
+                    next_marker += 1
+            expect = _KEY
+            continue
+        elif expect == _SEPARATOR:
+            if token == b',':
+                expect = _ITEM
+                continue
+            if token != b')':
+                raise PBXParseError(f"Expected ',' or ')', found {token!r}", start)
+            value = container
+            container, key = stack.pop()
+        elif expect == _DONE:
+            raise PBXParseError("Trailing content after root dictionary", start)
+        elif token == b'{':
+            in_root = len(stack) == 1
+            stack.append((container, key))
+            container, expect = {}, _KEY
+            if in_root and key == 'objects':
+                objects = container
+                layout.objects_start = _line_end(buf, pos)
+                markers = list(_SECTION.finditer(buf, pos))
+            continue
+        elif token == b'(':
+            stack.append((container, key))
+            container, expect = [], _ITEM
+            continue
+        elif token == b')' and expect == _ITEM:
+            value = container
+            container, key = stack.pop()
+        elif token != 's':
+            raise PBXParseError(f"Unexpected token {token!r}", start)
+
+        # value is complete: store it in the enclosing container
+        if container is None:
+            root, expect = value, _DONE
+        elif type(container) is dict:
+            if container is objects and type(value) is dict:
+                value = compact(value)
+            container[key] = value
+            expect = _SEMICOLON
+        else:
+            container.append(value)
+            expect = _SEPARATOR
+
+    end = _TRAILER.match(buf, pos).end()
+    if end < len(buf):
+        raise PBXParseError(f"Unexpected character {buf[end:end + 1]!r}", end)
+    if expect != _DONE:
+        raise PBXParseError("Unexpected end of file", end)
+    return root, layout
+
+
+def scan_layout(buf):
+    """
+    Find the Layout of a file in Xcode's own formatting without parsing any
+    values: sections are found by their marker lines and objects by the
+    two-tab lines that start them, each running up to the next. Returns None
+    when the text is not laid out that way (anything but blank lines between
+    sections, an object not ending in ';' on its last line, a repeated ID),
+    so the caller can fall back to parse_layout().
+    """
+    with profile.phase('parse.scan', bytes=len(buf)) as p:
+        layout = _scan_layout(buf)
+        p.add(objects=len(layout.spans) if layout else 0)
+    return layout
+
+
+def _scan_layout(buf):
+    opened = buf.find(_OBJECTS_OPEN)
+    closed = buf.find(_OBJECTS_CLOSE, opened)
+    if opened < 0 or closed < 0:
+        return None
+    layout = Layout()
+    spans, order, sections = layout.spans, layout.order, layout.sections
+    pos = layout.objects_start = opened + len(_OBJECTS_OPEN)
+    closed = layout.objects_end = closed + 1
+    markers = _MARKER.finditer(buf, pos - 1, closed)
+    for begin in markers:
+        end = next(markers, None)
+        if end is None or begin.group(1) != b'Begin' or end.group(1) != b'End' \
+                or begin.group(2) != end.group(2) or buf[pos:begin.start()].strip():
+            return None
+        isa = begin.group(2).decode('ascii')
+        sections[isa] = [(begin.start() + 1, begin.end()), (end.start() + 1, end.end())]
+        found = list(_OBJECT_START.finditer(buf, begin.end() - 1, end.start() + 1))
+        starts = [m.start() + 1 for m in found]
+        if (starts[0] if starts else end.start() + 1) != begin.end():
+            return None
+        ids = [m.group(1).decode('ascii') for m in found]
+        ends = starts[1:] + [end.start() + 1]
+        if any(buf[e - 2:e] != b';\n' for e in ends):
+            return None
+        spans.update(zip(ids, zip(starts, ends)))
+        order[isa] = ids
+        pos = end.end()
+    if buf[pos:closed].strip() or len(spans) != sum(map(len, order.values())):
+        return None
+    return layout
+
+
+def parse(buf):
+    """Parse project.pbxproj bytes into nested dicts, lists and strings (records and IdLists for objects)"""
+    return parse_layout(buf)[0]
@@ -0,0 +1,231 @@
+"""
+Profiling hooks: where a slow command spends its time.
+
+The tooling marks its phases (reading, parsing, planning, splicing,
+writing ...) with
+
+    with profile.phase('parse', bytes=len(buf)) as p:
+        ...
+        p.add(objects=len(spans))
+
+With no hook installed phase() returns a shared do-nothing object, so an
+unprofiled run pays one global lookup per phase. Installing a hook, as
+`python3 -m pbxtool --profile FILE ...` does, turns every phase into an
+Event: name, start, duration, nesting depth, process and thread, the
+counters given to it (bytes scanned, objects touched ...) and peak memory:
+the process's peak RSS when the phase ended and, with --profile-memory,
+the peak of the Python heap during the phase (tracemalloc, which slows
+everything down noticeably, so it is off by default).
+
+Work done in a process pool is profiled by running it through recorded()
+in the worker and handing the events it returns to merge() in the parent.
+
+Recorder collects events and writes them as Chrome trace-event JSON (open
+it in chrome://tracing or https://ui.perfetto.dev) or, for a path ending
+in .csv, as one flat row per phase.
+"""
+import csv
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+_hooks = []
+_local = threading.local()
+
+
+class Event:
+    __slots__ = ('name', 'start', 'duration', 'depth', 'pid', 'tid', 'args')
+
+    def __init__(self, name, start, duration, depth, pid, tid, args):
+        self.name = name
+        self.start = start          # perf_counter_ns
+        self.duration = duration    # ns
+        self.depth = depth
+        self.pid = pid
+        self.tid = tid
+        self.args = args
+
+
+class _Null:
+    """What phase() returns when nobody is listening"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def add(self, **counters):
+        pass
+
+
+_NULL = _Null()
+
+
+def _stack():
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+class _Phase:
+    __slots__ = ('name', 'args', 'start', 'heap_peak')
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+
+    def add(self, **counters):
+        """Add to the phase's counters (summed when given more than once)"""
+        args = self.args
+        for key, value in counters.items():
+            args[key] = args.get(key, 0) + value
+
+    def __enter__(self):
+        stack = _stack()
+        if tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            if stack:
+                stack[-1].heap_peak = max(stack[-1].heap_peak, peak)
+            tracemalloc.reset_peak()
+            self.heap_peak = current
+        stack.append(self)
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter_ns()
+        stack = _stack()
+        stack.pop()
+        args = self.args
+        if tracemalloc.is_tracing():
+            self.heap_peak = max(self.heap_peak, tracemalloc.get_traced_memory()[1])
+            if stack:
+                stack[-1].heap_peak = max(stack[-1].heap_peak, self.heap_peak)
+            args['heap_peak_kb'] = self.heap_peak // 1024
+        if resource is not None:
+            rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            args['rss_peak_kb'] = rss // 1024 if sys.platform == 'darwin' else rss  # bytes on macOS
+        if exc_type is not None:
+            args['error'] = exc_type.__name__
+        event = Event(self.name, self.start, end - self.start, len(stack), os.getpid(), threading.get_ident(), args)
+        for hook in list(_hooks):
+            hook(event)
+        return False
+
+
+def phase(name, **counters):
+    """A context manager timing one phase; counters are recorded with it"""
+    if not _hooks:
+        return _NULL
+    return _Phase(name, counters)
+
+
+def enabled():
+    return bool(_hooks)
+
+
+def add_hook(hook):
+    """Call hook(event) for every phase that ends from now on"""
+    _hooks.append(hook)
+
+
+def remove_hook(hook):
+    _hooks.remove(hook)
+
+
+def recorded(function, *args):
+    """
+    Call function(*args) with a fresh Recorder as the only hook; returns its
+    result and the events recorded. For process-pool workers: a forked one
+    inherits copies of the parent's hooks, which the parent never sees, and
+    a spawned one has none.
+    """
+    recorder = Recorder()
+    saved = _hooks[:]
+    _hooks[:] = [recorder]
+    try:
+        return function(*args), recorder.events
+    finally:
+        _hooks[:] = saved
+
+
+def merge(events):
+    """Pass events recorded by another process to this one's hooks, nested under the current phase"""
+    depth = len(_stack())
+    for event in events:
+        event.depth += depth
+        for hook in list(_hooks):
+            hook(event)
+
+
+class Recorder:
+    """A hook that keeps every event, for writing out afterwards"""
+
+    def __init__(self):
+        self.events = []
+        self._lock = threading.Lock()
+
+    def __call__(self, event):
+        with self._lock:
+            self.events.append(event)
+
+    def write(self, path):
+        """Write the events as Chrome trace JSON, or as CSV if path ends in .csv"""
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            if path.endswith('.csv'):
+                self.write_csv(f)
+            else:
+                json.dump(self.trace(), f)
+
+    def trace(self):
+        """Chrome trace-event format: one complete ('X') event per phase, times in microseconds"""
+        events = sorted(self.events, key=lambda e: e.start)
+        origin = events[0].start if events else 0
+        return {'traceEvents': [{'name': e.name, 'cat': e.name.split('.')[0], 'ph': 'X',
+                                 'ts': (e.start - origin) / 1000, 'dur': e.duration / 1000,
+                                 'pid': e.pid, 'tid': e.tid, 'args': e.args} for e in events],
+                'displayTimeUnit': 'ms'}
+
+    def write_csv(self, f):
+        events = sorted(self.events, key=lambda e: e.start)
+        origin = events[0].start if events else 0
+        keys = sorted({key for e in events for key in e.args})
+        writer = csv.writer(f)
+        writer.writerow(['phase', 'depth', 'start_ms', 'duration_ms', 'pid', 'tid'] + keys)
+        for e in events:
+            writer.writerow([e.name, e.depth, f"{(e.start - origin) / 1e6:.3f}", f"{e.duration / 1e6:.3f}",
+                             e.pid, e.tid] + [e.args.get(key, '') for key in keys])
+
+
+@contextmanager
+def profiling(path=None, memory=False):
+    """
+    Record every phase inside the block; the Recorder is yielded and, with
+    path, written there at the end
+    """
+    recorder = Recorder()
+    started = memory and not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    add_hook(recorder)
+    try:
+        yield recorder
+    finally:
+        remove_hook(recorder)
+        if started:
+            tracemalloc.stop()
+        if path:
+            recorder.write(path)
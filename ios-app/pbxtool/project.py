@@ -0,0 +1,600 @@
+"""
+In-memory object graph for an Xcode project, indexed by object ID and isa
+"""
+import bisect
+import mmap
+import os
+import posixpath
+import re
+from collections import deque
+
+from . import profile
+from .ids import IdAllocator
+from .parser import PBXParseError, parse, parse_layout, scan_layout
+from .records import compact, intern_id, paused_gc
+
+PROJECT_FILE = 'project.pbxproj'
+
+BUILD_PHASE_NAMES = {
+    'PBXSourcesBuildPhase': 'Sources',
+    'PBXFrameworksBuildPhase': 'Frameworks',
+    'PBXResourcesBuildPhase': 'Resources',
+    'PBXHeadersBuildPhase': 'Headers',
+    'PBXCopyFilesBuildPhase': 'CopyFiles',
+    'PBXShellScriptBuildPhase': 'ShellScript',
+}
+PHASE_ISAS = {name: isa for isa, name in BUILD_PHASE_NAMES.items()}
+
+# Keys whose values are object IDs (one, or a list of them); these feed the reverse-reference index
+LIST_REFERENCE_KEYS = frozenset([
+    'buildConfigurations', 'buildPhases', 'buildRules', 'children', 'dependencies', 'files',
+    'packageProductDependencies', 'packageReferences', 'targets',
+])
+SCALAR_REFERENCE_KEYS = frozenset([
+    'baseConfigurationReference', 'buildConfigurationList', 'fileRef', 'mainGroup', 'package',
+    'productRef', 'productRefGroup', 'productReference', 'target', 'targetProxy',
+])
+# The ID and comment opening an object's line(s) in Xcode's formatting
+_COMMENT = re.compile(rb'\t\t\w+ /\* (.*?) \*/ = ')
+
+# An object pointing at another through one of these keys exists only for it and is removed with it
+_OWNING_KEYS = frozenset(['fileRef', 'productRef'])
+
+# lastKnownFileType and default build phase by file extension
+FILE_TYPES = {
+    '.swift': ('sourcecode.swift', 'Sources'),
+    '.m': ('sourcecode.c.objc', 'Sources'),
+    '.c': ('sourcecode.c.c', 'Sources'),
+    '.h': ('sourcecode.c.h', None),
+    '.xcdatamodeld': ('wrapper.xcdatamodel', None),
+    '.xcassets': ('folder.assetcatalog', 'Resources'),
+    '.storyboard': ('file.storyboard', 'Resources'),
+    '.xib': ('file.xib', 'Resources'),
+    '.strings': ('text.plist.strings', 'Resources'),
+    '.json': ('text.json', 'Resources'),
+    '.png': ('image.png', 'Resources'),
+    '.plist': ('text.plist.xml', None),
+}
+
+
+def resolve_path(path):
+    """Accept either an .xcodeproj bundle or the project.pbxproj inside it"""
+    if os.path.isdir(path):
+        return os.path.join(path, PROJECT_FILE)
+    return path
+
+
+def map_file(path):
+    """Memory-map a file read-only; the mapping stays valid after the file is replaced"""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            raise PBXParseError("Empty project file", 0)
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def load(path, cache=False, lazy=False):
+    """
+    Map and parse a project in one pass. With cache=True the parse comes
+    from the on-disk parse cache when project.pbxproj is unchanged (see
+    pbxtool.cache). Otherwise, with lazy=True, only the section markers are
+    scanned and each isa section is parsed the first time it is needed.
+    """
+    pbxproj = resolve_path(path)
+    with profile.phase('load', path=pbxproj) as p:
+        layout = None
+        if cache:
+            from .cache import parse_cached  # imported here: the cache writes through pbxtool.writer, which needs this module
+            buffer, root, layout, _ = parse_cached(pbxproj)
+        else:
+            buffer = map_file(pbxproj)
+            if lazy:
+                layout = scan_layout(buffer)
+            if layout is not None:
+                # Everything around the objects dictionary, with the dictionary left empty
+                root = parse(buffer[:layout.objects_start] + buffer[layout.objects_end:])
+            else:
+                lazy = False
+                root, layout = parse_layout(buffer)
+        project = Project(root, pbxproj, buffer, layout, lazy=lazy)
+        p.add(bytes=len(buffer), objects=len(project.objects))
+    return project
+
+
+class _LazyObjects(dict):
+    """
+    The objects dictionary of a project loaded with lazy=True. Holds the
+    objects parsed so far. Looking up the ID of an object that has not been
+    parsed parses that one object from its span; objects_of() parses the
+    rest of a section, and anything that walks the whole dictionary
+    (iteration, items(), values()) parses every section.
+    """
+
+    def __init__(self, project):
+        super().__init__()
+        self._project = project
+        self._pending = set(project.layout.sections)
+        self._section_of = {oid: isa for isa, oids in project.layout.order.items() for oid in oids}
+        self._taken = set()      # IDs parsed one at a time, including those removed since
+        self._untaken = sum(len(oids) for oids in project.layout.order.values())
+        self._scanned = set()    # IDs whose mentions in the file have all been parsed
+        self._starts = None
+
+    def pending(self, isa):
+        return isa in self._pending
+
+    def unparsed(self, oid):
+        """Whether oid is an object of the file that has not been parsed (or removed) yet"""
+        return self._section_of.get(oid) in self._pending and oid not in self._taken \
+            and not dict.__contains__(self, oid)
+
+    def untaken(self, isa):
+        """Whether the section still holds objects that were never parsed"""
+        taken = self._taken
+        return isa in self._pending and any(oid not in taken for oid in self._project.layout.order.get(isa, ()))
+
+    def _load(self, isa):
+        taken = self._taken
+        self._untaken -= sum(1 for oid in self._project.layout.order.get(isa, ()) if oid not in taken)
+        self._pending.discard(isa)
+        self._project._parse_section(isa, taken)
+
+    def _take(self, oid):
+        self._taken.add(oid)
+        self._untaken -= 1
+        self._project._parse_object(oid, self._section_of[oid])
+
+    def _ensure(self, oid):
+        if self.unparsed(oid):
+            self._take(oid)
+
+    def load_all(self):
+        for isa in sorted(self._pending):
+            self._load(isa)
+
+    def all_ids(self):
+        """Every ID in the project, without parsing anything"""
+        ids, taken, order = list(dict.keys(self)), self._taken, self._project.layout.order
+        for isa in self._pending:
+            ids.extend(oid for oid in order.get(isa, ()) if oid not in taken)
+        return ids
+
+    def _holder(self, pos):
+        """ID of the object whose span holds byte pos of the file, if any"""
+        layout = self._project.layout
+        if self._starts is None or self._starts[0] is not layout:
+            spans = sorted((span[0], oid) for oid, span in layout.spans.items())
+            self._starts = (layout, [start for start, _ in spans], [oid for _, oid in spans])
+        _, starts, oids = self._starts
+        i = bisect.bisect_right(starts, pos) - 1
+        if i >= 0 and pos < layout.spans[oids[i]][1]:
+            return oids[i]
+        return None
+
+    def load_mentioning(self, oid):
+        """Parse every unparsed object whose text mentions oid, so its references to oid are indexed"""
+        if oid in self._scanned or not self._untaken:
+            return
+        self._scanned.add(oid)
+        project, needle = self._project, oid.encode('ascii')
+        buffer, end = project.buffer, project.layout.objects_end
+        pos = buffer.find(needle, project.layout.objects_start, end)
+        while pos != -1:
+            holder = self._holder(pos)
+            if holder is not None and self.unparsed(holder):
+                self._take(holder)
+            pos = buffer.find(needle, pos + len(needle), end)
+
+    def __missing__(self, oid):
+        if not self.unparsed(oid):
+            raise KeyError(oid)
+        self._take(oid)
+        return dict.__getitem__(self, oid)
+
+    def __contains__(self, oid):
+        return dict.__contains__(self, oid) or self.unparsed(oid)
+
+    def get(self, oid, default=None):
+        if dict.__contains__(self, oid):
+            return dict.__getitem__(self, oid)
+        return self[oid] if self.unparsed(oid) else default
+
+    def __setitem__(self, oid, obj):
+        self._ensure(oid)
+        dict.__setitem__(self, oid, obj)
+
+    def __delitem__(self, oid):
+        self._ensure(oid)
+        dict.__delitem__(self, oid)
+
+    def pop(self, oid, *default):
+        self._ensure(oid)
+        return dict.pop(self, oid, *default)
+
+    def setdefault(self, oid, default=None):
+        self._ensure(oid)
+        return dict.setdefault(self, oid, default)
+
+    def __len__(self):
+        return dict.__len__(self) + self._untaken
+
+    def __iter__(self):
+        self.load_all()
+        return dict.__iter__(self)
+
+    def keys(self):
+        self.load_all()
+        return dict.keys(self)
+
+    def values(self):
+        self.load_all()
+        return dict.values(self)
+
+    def items(self):
+        self.load_all()
+        return dict.items(self)
+
+
+class Project:
+    """
+    Parsed project.pbxproj with O(1) lookups by object ID and by isa, and a
+    reverse index from every object to the objects that reference it. The
+    reverse index is built on first use, so read-only lookups by ID or isa
+    never pay for it.
+
+    When loaded from disk the project keeps the memory-mapped original
+    text and the byte span of every object, and records which objects were
+    added, changed or removed so a save only rewrites those spans.
+    """
+
+    def __init__(self, root, path=None, buffer=None, layout=None, lazy=False):
+        self.root = root
+        self.path = path
+        self.buffer = buffer
+        self.layout = layout
+        self.dirty = set()
+        self.removed = set()
+        self._ids = None
+        self._by_isa = {}
+        self._reverse = None
+        if lazy:
+            self.objects = root['objects'] = _LazyObjects(self)
+            return
+        self.objects = root['objects']
+        for oid, obj in self.objects.items():
+            self._by_isa.setdefault(obj['isa'], {})[oid] = obj
+
+    def _parse_section(self, isa, taken=()):
+        """
+        Parse the rest of one isa section of a lazily loaded project from the
+        mapped file; objects in taken were parsed on their own (and may have
+        been changed or removed since) and are left as they are
+        """
+        known = self._by_isa.get(isa, {})
+        if all(oid in taken for oid in self.layout.order.get(isa, ())):
+            # Every object was parsed on its own already; only the file order is left to restore
+            section = {oid: known[oid] for oid in self.layout.order.get(isa, ()) if oid in known}
+            section.update((oid, obj) for oid, obj in known.items() if oid not in section)
+            self._by_isa[isa] = section
+            return
+        begin, end = self.layout.sections[isa]
+        text = self.buffer[begin[1]:end[0]]
+        with profile.phase('parse.section', isa=isa, bytes=len(text)) as p, paused_gc():
+            # Parsed as a bare dictionary, so compacted here as parse_layout() does for the objects dictionary
+            parsed = parse(b'{' + text + b'}')
+            section, objects = {}, {}
+            for oid, obj in parsed.items():
+                if oid in known:
+                    section[oid] = known[oid]
+                elif oid not in taken:
+                    oid = intern_id(oid)
+                    section[oid] = objects[oid] = compact(obj) if type(obj) is dict else obj
+            section.update((oid, obj) for oid, obj in known.items() if oid not in section)  # added since
+            p.add(objects=len(objects))
+        dict.update(self.objects, objects)
+        self._by_isa[isa] = section  # in file order, as a full parse has it
+        for oid, obj in objects.items():
+            self._index(oid, obj)
+
+    def _parse_object(self, oid, isa):
+        """Parse one object of a lazily loaded project from its span in the mapped file"""
+        start, end = self.layout.spans[oid]
+        obj = parse(b'{' + self.buffer[start:end] + b'}')[oid]
+        oid, obj = intern_id(oid), compact(obj) if type(obj) is dict else obj
+        dict.__setitem__(self.objects, oid, obj)
+        self._by_isa.setdefault(isa, {})[oid] = obj
+        self._index(oid, obj)
+
+    def file_comment(self, oid):
+        """The /* comment */ after an object's ID in the mapped file, or None"""
+        m = _COMMENT.match(self.buffer, self.layout.spans[oid][0])
+        return m.group(1).decode('utf-8') if m else None
+
+    def __contains__(self, oid):
+        return oid in self.objects
+
+    def get(self, oid):
+        return self.objects.get(oid)
+
+    def objects_of(self, isa):
+        """Return the {id: object} mapping for every object of the given isa"""
+        if isinstance(self.objects, _LazyObjects) and self.objects.pending(isa):
+            self.objects._load(isa)
+        return self._by_isa.get(isa, {})
+
+    def has_objects(self, isa):
+        """Whether any object has the given isa, without parsing a section to find out"""
+        if isinstance(self.objects, _LazyObjects) and self.objects.untaken(isa):
+            return True
+        return bool(self._by_isa.get(isa))
+
+    def isas(self):
+        if not isinstance(self.objects, _LazyObjects):
+            return [isa for isa, objects in self._by_isa.items() if objects]
+        return [isa for isa in dict.fromkeys([*self._by_isa, *self.layout.sections]) if self.has_objects(isa)]
+
+    @property
+    def root_object(self):
+        return self.objects[self.root['rootObject']]
+
+    @property
+    def main_group(self):
+        return self.root_object['mainGroup']
+
+    # -- lookups ---------------------------------------------------------
+
+    def targets(self):
+        return [(oid, self.objects[oid]) for oid in self.root_object.get('targets', [])]
+
+    def target(self, name=None):
+        """Return the ID of the named target, or the first target when name is None"""
+        for oid, obj in self.targets():
+            if name is None or obj.get('name') == name:
+                return oid
+        return None
+
+    def build_phase(self, target_id, isa='PBXSourcesBuildPhase'):
+        for oid in self.objects[target_id].get('buildPhases', []):
+            if self.objects[oid]['isa'] == isa:
+                return oid
+        return None
+
+    def display_name(self, oid):
+        """Name Xcode shows for a file or group: its name, else the last path component"""
+        obj = self.objects[oid]
+        if 'name' in obj:
+            return obj['name']
+        if 'path' in obj:
+            return posixpath.basename(obj['path'])
+        return None
+
+    def find_child(self, group_id, name):
+        for child in self.objects[group_id].get('children', []):
+            if self.display_name(child) == name:
+                return child
+        return None
+
+    def group(self, path):
+        """Resolve a slash-separated group path such as 'Inventry/Services' from the main group"""
+        group_id = self.main_group
+        for part in path.split('/') if path else []:
+            group_id = self.find_child(group_id, part)
+            if group_id is None or self.objects[group_id]['isa'] != 'PBXGroup':
+                return None
+        return group_id
+
+    def locations(self):
+        """
+        Map every group and file reachable from the main group to its path on
+        disk, relative to the folder holding the .xcodeproj, in breadth-first
+        order. Only <group>- and SOURCE_ROOT-relative items resolve; SDK and
+        build-product references (and anything below them) are left out.
+        """
+        locations = {}
+        queue = deque([(self.main_group, self.root_object.get('projectDirPath', ''))])
+        while queue:
+            oid, parent_dir = queue.popleft()
+            obj = self.objects.get(oid)
+            if obj is None or oid in locations:
+                continue
+            tree, path = obj.get('sourceTree', '<group>'), obj.get('path', '')
+            if tree == '<group>':
+                location = posixpath.normpath(posixpath.join(parent_dir, path)) if path else parent_dir
+            elif tree == 'SOURCE_ROOT':
+                location = posixpath.normpath(path) if path else ''
+            else:
+                continue
+            locations[oid] = '' if location == '.' else location
+            queue.extend((child, locations[oid]) for child in obj.get('children', []))
+        return locations
+
+    def referrers(self, oid):
+        """Return (referrer ID, key) for every object whose key holds oid"""
+        return sorted(self._referrers_of(oid))
+
+    def unresolved(self):
+        """Return (referrer ID, key, ID) for every reference to an ID that is not in the project"""
+        if isinstance(self.objects, _LazyObjects):
+            self.objects.load_all()
+        return sorted((holder, key, oid) for oid, holders in self._referrers.items()
+                      if oid not in self.objects for holder, key in holders)
+
+    def build_files_for(self, ref_id, phase_id):
+        if self._reverse is None:
+            files = self.objects[phase_id].get('files', [])
+            if isinstance(self.objects, _LazyObjects):
+                # Every build file mentioning ref_id is parsed by then, so only parsed ones need checking
+                self.objects.load_mentioning(ref_id)
+                return sorted(oid for oid, obj in self._by_isa.get('PBXBuildFile', {}).items()
+                              if obj.get('fileRef') == ref_id and oid in files)
+            # The phase's own list is cheaper than indexing every reference in the project
+            return sorted({build_id for build_id in files
+                           if self.objects.get(build_id, {}).get('fileRef') == ref_id})
+        return sorted(holder for holder, key in self._referrers_of(ref_id)
+                      if key == 'fileRef' and (phase_id, 'files') in self._referrers_of(holder))
+
+    @property
+    def _referrers(self):
+        """{ID: {(referrer ID, key)}}, built on first use and kept current by every mutation after that"""
+        if self._reverse is None:
+            self._reverse = {}
+            # Of a lazily loaded project, only the sections parsed so far; _parse_section indexes the rest
+            for oid, obj in dict.items(self.objects):
+                self._index(oid, obj)
+        return self._reverse
+
+    def _referrers_of(self, oid):
+        if isinstance(self.objects, _LazyObjects):
+            self.objects.load_mentioning(oid)
+            if self._reverse is None:
+                # Everything mentioning oid is parsed now; checking those few objects beats indexing them all
+                return {(holder, key) for holder, obj in dict.items(self.objects) for key, value in obj.items()
+                        if key in LIST_REFERENCE_KEYS and oid in value or key in SCALAR_REFERENCE_KEYS and value == oid}
+        return self._referrers.get(oid, ())
+
+    def _index(self, oid, obj):
+        referrers = self._reverse
+        if referrers is None:
+            return
+        for key, value in obj.items():
+            if key in LIST_REFERENCE_KEYS:
+                for target in value:
+                    referrers.setdefault(target, set()).add((oid, key))
+            elif key in SCALAR_REFERENCE_KEYS:
+                referrers.setdefault(value, set()).add((oid, key))
+
+    def _unindex(self, oid, obj):
+        if self._reverse is None:
+            return
+        for key, value in obj.items():
+            if key in LIST_REFERENCE_KEYS or key in SCALAR_REFERENCE_KEYS:
+                for target in value if key in LIST_REFERENCE_KEYS else (value,):
+                    self._reverse.get(target, set()).discard((oid, key))
+
+    # -- mutation --------------------------------------------------------
+
+    @property
+    def ids(self):
+        """IdAllocator seeded with every ID in the file, built on first use"""
+        if self._ids is None:
+            lazy = isinstance(self.objects, _LazyObjects)
+            self._ids = IdAllocator(self.objects.all_ids() if lazy else self.objects)
+        return self._ids
+
+    def new_id(self, *key):
+        """Allocate an unused 24-character hex ID; key feeds deterministic allocation"""
+        return self.ids.allocate(*key)
+
+    def touch(self, oid):
+        """Mark an object as changed so the next save rewrites it"""
+        self.dirty.add(oid)
+
+    def add_object(self, oid, obj):
+        self.objects[oid] = obj
+        self._by_isa.setdefault(obj['isa'], {})[oid] = obj
+        self._index(oid, obj)
+        self.removed.discard(oid)
+        self.dirty.add(oid)
+        return oid
+
+    def remove_object(self, oid):
+        obj = self.objects.pop(oid)
+        del self._by_isa[obj['isa']][oid]
+        self._unindex(oid, obj)
+        self.dirty.discard(oid)
+        self.removed.add(oid)
+        return obj
+
+    def append(self, oid, key, value):
+        self.objects[oid].setdefault(key, []).append(value)
+        if key in LIST_REFERENCE_KEYS and self._reverse is not None:
+            self._reverse.setdefault(value, set()).add((oid, key))
+        self.dirty.add(oid)
+
+    def remove_value(self, oid, key, value):
+        values = self.objects[oid][key]
+        values.remove(value)
+        if key in LIST_REFERENCE_KEYS and value not in values and self._reverse is not None:
+            self._reverse.get(value, set()).discard((oid, key))
+        self.dirty.add(oid)
+
+    def mark_saved(self, buffer=None, layout=None):
+        self.buffer, self.layout = buffer, layout
+        self.dirty.clear()
+        self.removed.clear()
+
+    def add_file_reference(self, group_id, path, file_type, key=None):
+        ref_id = self.add_object(self.new_id('PBXFileReference', *(key or (group_id, path))), {
+            'isa': 'PBXFileReference',
+            'lastKnownFileType': file_type,
+            'path': path,
+            'sourceTree': '<group>',
+        })
+        self.append(group_id, 'children', ref_id)
+        return ref_id
+
+    def add_group(self, parent_id, path, key=None):
+        group_id = self.add_object(self.new_id('PBXGroup', *(key or (parent_id, path))), {
+            'isa': 'PBXGroup',
+            'children': [],
+            'path': path,
+            'sourceTree': '<group>',
+        })
+        self.append(parent_id, 'children', group_id)
+        return group_id
+
+    def add_build_file(self, phase_id, ref_id, key=None):
+        build_id = self.add_object(self.new_id('PBXBuildFile', *(key or (phase_id, ref_id))), {
+            'isa': 'PBXBuildFile',
+            'fileRef': ref_id,
+        })
+        self.append(phase_id, 'files', build_id)
+        return build_id
+
+    def remove_file_reference(self, ref_id):
+        """Remove a file reference together with its build files and group memberships"""
+        return self.remove_cascade([ref_id])
+
+    def remove_cascade(self, oids):
+        """
+        Remove objects together with every object that exists only to point
+        at them (PBXBuildFiles by fileRef or productRef), and unlink all of
+        them from the lists holding them (group children, phase files ...).
+
+        Uses the reverse index, so the cost is proportional to the number of
+        references, not the size of the project. Returns (removed, unlinked):
+        [(ID, object)] and [(holder ID, key, ID)].
+        """
+        doomed, pending = {}, list(oids)
+        while pending:
+            oid = pending.pop()
+            if oid not in doomed:
+                doomed[oid] = None
+                pending.extend(holder for holder, key in self._referrers_of(oid) if key in _OWNING_KEYS)
+        for oid in doomed:
+            for holder, key in self._referrers_of(oid):
+                if holder not in doomed and key in SCALAR_REFERENCE_KEYS:
+                    raise ValueError(f"{oid} is still referenced by {holder} ({key})")
+        unlinked = []
+        for oid in doomed:
+            for holder, key in self.referrers(oid):
+                if holder not in doomed:
+                    while oid in self.objects[holder][key]:
+                        self.remove_value(holder, key, oid)
+                    unlinked.append((holder, key, oid))
+        removed = [(oid, self.remove_object(oid)) for oid in doomed]
+        for oid in doomed:
+            if self._reverse is not None and not self._reverse.get(oid):
+                self._reverse.pop(oid, None)
+        return removed, unlinked
+
+    def describe_removal(self, removed, unlinked):
+        """One-line summary of a remove_cascade() result, e.g. 'PBXBuildFile 738E… from Sources'"""
+        holders = {oid: holder for holder, key, oid in unlinked}
+        parts = []
+        for oid, obj in removed:
+            part = f"{obj['isa']} {oid}"
+            if oid in holders:
+                holder = self.objects[holders[oid]]
+                part += f" from {holder.get('name') or BUILD_PHASE_NAMES.get(holder['isa']) or holder.get('path') or holder['isa']}"
+            parts.append(part)
+        return ', '.join(parts)
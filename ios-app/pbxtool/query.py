@@ -0,0 +1,184 @@
+"""
+Read-only questions about a project, answered as JSON-ready values.
+
+    in-phase FILE [PHASE]   is FILE built in PHASE (default Sources)?
+    owner FILE              group paths that list FILE
+    phase PHASE             files and products built in PHASE
+    find GLOB               file references whose name matches GLOB
+    object ID               the object itself
+    referrers ID            objects that point at ID
+    targets                 targets and their build phases
+
+FILE is a group path such as Inventry/Services/SyncService.swift, a path
+on disk relative to the folder holding the .xcodeproj, or a bare file name
+matched anywhere in the project. Lookups shared between queries (group
+paths, names) are computed once per Session, so a batch costs one load.
+"""
+import fnmatch
+import posixpath
+import shlex
+from collections import deque
+
+from .project import BUILD_PHASE_NAMES, PHASE_ISAS
+from .records import IdList
+
+_FILE_ISAS = ('PBXFileReference', 'PBXVariantGroup', 'XCVersionGroup')
+
+
+class QueryError(ValueError):
+    """A query is malformed or names something that does not exist"""
+
+
+class Session:
+    """Answers queries against one loaded project"""
+
+    def __init__(self, project, target=None):
+        self.project = project
+        self.target = target
+        self._group_paths = None
+        self._parents = None
+        self._names = None
+        self._locations = None
+        self._phase_refs = {}
+
+    def run(self, text):
+        """Run one query line and return its result"""
+        words = shlex.split(text)
+        if not words or words[0] not in QUERIES:
+            raise QueryError(f"Unknown query {text!r}; expected one of: {', '.join(QUERIES)}")
+        method, low, high = QUERIES[words[0]]
+        if not low <= len(words) - 1 <= high:
+            raise QueryError(f"{words[0]} takes {low}" + (f"-{high}" if high > low else "") + " argument(s)")
+        return method(self, *words[1:])
+
+    # -- shared lookups --------------------------------------------------
+
+    def group_paths(self):
+        """{group ID: path from the main group} for every reachable group"""
+        if self._group_paths is None:
+            project = self.project
+            self._group_paths, self._parents = {}, {}
+            queue = deque([(project.main_group, '')])
+            while queue:
+                oid, path = queue.popleft()
+                if oid in self._group_paths:
+                    continue
+                self._group_paths[oid] = path
+                for child in project.objects[oid].get('children', []):
+                    self._parents.setdefault(child, []).append(oid)
+                    obj = project.get(child)
+                    if obj is not None and obj['isa'] == 'PBXGroup':
+                        name = project.display_name(child) or child
+                        queue.append((child, posixpath.join(path, name) if path else name))
+        return self._group_paths
+
+    def parents(self, oid):
+        self.group_paths()
+        return self._parents.get(oid, [])
+
+    def refs(self, file):
+        """IDs of the file references FILE names (see the module docstring)"""
+        project = self.project
+        if '/' in file:
+            group_id = project.group(posixpath.dirname(file))
+            ref_id = project.find_child(group_id, posixpath.basename(file)) if group_id else None
+            if ref_id is not None:
+                return [ref_id]
+            if self._locations is None:
+                self._locations = {location: oid for oid, location in project.locations().items()}
+            ref_id = self._locations.get(posixpath.normpath(file))
+            return [ref_id] if ref_id is not None else []
+        if self._names is None:
+            self._names = {}
+            for isa in _FILE_ISAS:
+                for oid, obj in project.objects_of(isa).items():
+                    name = obj.get('name') or posixpath.basename(obj.get('path', ''))
+                    self._names.setdefault(name, []).append(oid)
+        return self._names.get(file, [])
+
+    def phase_id(self, phase):
+        project = self.project
+        target_id = project.target(self.target)
+        if target_id is None:
+            raise QueryError(f"Target {self.target or '(first)'} not found")
+        phase_id = project.build_phase(target_id, PHASE_ISAS.get(phase, phase))
+        if phase_id is None:
+            raise QueryError(f"{phase} build phase not found")
+        return phase_id
+
+    def phase_refs(self, phase_id):
+        """IDs of the file references built in a phase, without building the reverse index"""
+        if phase_id not in self._phase_refs:
+            objects = self.project.objects
+            self._phase_refs[phase_id] = {objects[build_id].get('fileRef') for build_id in objects[phase_id].get('files', [])
+                                          if build_id in objects}
+        return self._phase_refs[phase_id]
+
+    def _file_path(self, oid):
+        parents = self.parents(oid)
+        name = self.project.display_name(oid) or oid
+        if not parents:
+            return name
+        group = self.group_paths().get(parents[0], '')
+        return posixpath.join(group, name) if group else name
+
+    # -- queries ---------------------------------------------------------
+
+    def in_phase(self, file, phase='Sources'):
+        built = self.phase_refs(self.phase_id(phase))
+        return any(ref_id in built for ref_id in self.refs(file))
+
+    def owner(self, file):
+        paths = self.group_paths()
+        return sorted(paths[group_id] for ref_id in self.refs(file) for group_id in self.parents(ref_id)
+                      if group_id in paths)
+
+    def phase(self, phase):
+        project = self.project
+        result = []
+        for build_id in project.objects[self.phase_id(phase)].get('files', []):
+            build = project.get(build_id) or {}
+            ref_id = build.get('fileRef') or build.get('productRef')
+            ref = project.get(ref_id) or {}
+            if 'fileRef' in build and ref:
+                name, path = project.display_name(ref_id), self._file_path(ref_id)
+            else:
+                name, path = ref.get('productName'), None
+            result.append({'id': build_id, 'ref': ref_id, 'name': name, 'path': path})
+        return result
+
+    def find(self, pattern):
+        project = self.project
+        return [{'id': oid, 'isa': project.objects[oid]['isa'], 'path': self._file_path(oid)}
+                for isa in _FILE_ISAS for oid in sorted(project.objects_of(isa))
+                if fnmatch.fnmatchcase(project.display_name(oid) or '', pattern)]
+
+    def object(self, oid):
+        obj = self.project.get(oid)
+        if obj is None:
+            return None
+        return {key: list(value) if isinstance(value, IdList) else value for key, value in obj.items()}
+
+    def referrers(self, oid):
+        project = self.project
+        return [{'id': holder, 'isa': project.objects[holder]['isa'], 'key': key}
+                for holder, key in project.referrers(oid)]
+
+    def targets(self):
+        project = self.project
+        return [{'id': oid, 'name': obj.get('name'),
+                 'phases': [project.objects[p].get('name') or BUILD_PHASE_NAMES.get(project.objects[p]['isa'])
+                            for p in obj.get('buildPhases', []) if p in project]}
+                for oid, obj in project.targets()]
+
+
+# name -> (method, minimum and maximum number of arguments)
+QUERIES = {
+    'in-phase': (Session.in_phase, 1, 2),
+    'owner': (Session.owner, 1, 1),
+    'phase': (Session.phase, 1, 1),
+    'find': (Session.find, 1, 1),
+    'object': (Session.object, 1, 1),
+    'referrers': (Session.referrers, 1, 1),
+    'targets': (Session.targets, 0, 0),
+}
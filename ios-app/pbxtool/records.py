@@ -0,0 +1,359 @@
+"""
+Compact in-memory objects for large projects.
+
+Almost every object in a big project is a PBXBuildFile, a PBXFileReference
+or a PBXGroup. As plain dicts each one carries a hash table, its own copy
+of every key and often its own copy of values such as "sourcecode.swift".
+Here those kinds are records with __slots__ (keys live on the class), the
+enum-like values are interned, and object IDs are interned through one
+table so a reference shares the string of the object it points at.
+children and files lists are IdLists: arrays of 4-byte ID numbers that
+read like lists of ID strings.
+
+Records and IdLists are mutable mappings and sequences, so code written
+against dicts and lists works unchanged. Objects of other kinds stay
+dicts, with their ID lists converted.
+"""
+import gc
+import sys
+from array import array
+from collections.abc import MutableMapping, MutableSequence
+from contextlib import contextmanager
+
+# Lists of object IDs stored as IdLists
+ID_LIST_KEYS = ('children', 'files')
+# Scalar object IDs, interned through the ID table
+_ID_KEYS = frozenset(['fileRef', 'productRef'])
+# Values drawn from a small vocabulary, interned with sys.intern
+_INTERNED_KEYS = frozenset(['explicitFileType', 'fileEncoding', 'includeInIndex', 'lastKnownFileType',
+                            'sourceTree'])
+
+_UNSET = object()
+
+# The ID table: number -> ID string and back. It only ever grows, like sys.intern.
+_ID_STRINGS = []
+_ID_NUMBERS = {}
+
+
+def _number(oid):
+    number = _ID_NUMBERS.get(oid)
+    if number is None:
+        number = _ID_NUMBERS[oid] = len(_ID_STRINGS)
+        _ID_STRINGS.append(oid)
+    return number
+
+
+def intern_id(oid):
+    """Return the one shared string for an object ID"""
+    return _ID_STRINGS[_number(oid)]
+
+
+class IdList(MutableSequence):
+    """A list of object IDs stored as an array of ID-table numbers"""
+
+    __slots__ = ('_numbers',)
+
+    def __init__(self, ids=()):
+        self._numbers = array('I', map(_number, ids))
+
+    def __len__(self):
+        return len(self._numbers)
+
+    def __iter__(self):
+        return map(_ID_STRINGS.__getitem__, self._numbers)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [_ID_STRINGS[number] for number in self._numbers[index]]
+        return _ID_STRINGS[self._numbers[index]]
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            self._numbers[index] = array('I', map(_number, value))
+        else:
+            self._numbers[index] = _number(value)
+
+    def __delitem__(self, index):
+        del self._numbers[index]
+
+    def __contains__(self, oid):
+        number = _ID_NUMBERS.get(oid)
+        return number is not None and number in self._numbers
+
+    def __eq__(self, other):
+        if isinstance(other, (list, IdList)):
+            return len(self) == len(other) and list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self):
+        return f"IdList({list(self)!r})"
+
+    def insert(self, index, oid):
+        self._numbers.insert(index, _number(oid))
+
+    def append(self, oid):
+        self._numbers.append(_number(oid))
+
+    def index(self, oid, *args):
+        number = _ID_NUMBERS.get(oid)
+        if number is None:
+            raise ValueError(f"{oid!r} is not in list")
+        return self._numbers.index(number, *args)
+
+    def remove(self, oid):
+        del self[self.index(oid)]
+
+
+# key -> (type of raw value, conversion) for the keys stored in compact form
+_CONVERSIONS = dict([(key, (list, IdList)) for key in ID_LIST_KEYS]
+                    + [(key, (str, intern_id)) for key in _ID_KEYS]
+                    + [(key, (str, sys.intern)) for key in _INTERNED_KEYS])
+
+
+def _coerce(key, value):
+    conversion = _CONVERSIONS.get(key)
+    if conversion is not None and type(value) is conversion[0]:
+        return conversion[1](value)
+    return value
+
+
+@contextmanager
+def paused_gc():
+    """
+    Suspend the cyclic garbage collector while a large acyclic graph is
+    built: nothing in it can be garbage yet, and the collections its
+    allocations trigger would only rescan it.
+    """
+    collecting = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if collecting:
+            gc.enable()
+
+
+class Record(MutableMapping):
+    """
+    An object of one isa with its common keys in slots. isa is a class
+    attribute; keys outside fields go to a small dict, allocated only when
+    one appears. An unset slot is an absent key.
+    """
+
+    __slots__ = ('_extra',)
+    isa = None
+    fields = ()
+    _fieldset = frozenset()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._fieldset = frozenset(cls.fields)
+
+    def __init__(self, obj=()):
+        self._extra = None
+        for key, value in (obj.items() if isinstance(obj, (dict, Record)) else obj):
+            self[key] = value
+
+    @classmethod
+    def from_dict(cls, obj):
+        """Build a record from a parsed dict; the same as cls(obj), minus the per-key method calls"""
+        record = cls.__new__(cls)
+        extra = None
+        fieldset = cls._fieldset
+        for key, value in obj.items():
+            if key in fieldset:
+                conversion = _CONVERSIONS.get(key)
+                setattr(record, key, conversion[1](value) if conversion is not None and type(value) is conversion[0]
+                        else value)
+            elif key != 'isa':
+                if extra is None:
+                    extra = {}
+                extra[key] = value
+        record._extra = extra
+        return record
+
+    def __getitem__(self, key):
+        if key in self._fieldset:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        if key == 'isa':
+            return self.isa
+        if self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        if key in self._fieldset:
+            return getattr(self, key, default)
+        if key == 'isa':
+            return self.isa
+        return self._extra.get(key, default) if self._extra is not None else default
+
+    def __contains__(self, key):
+        if key in self._fieldset:
+            return hasattr(self, key)
+        return key == 'isa' or (self._extra is not None and key in self._extra)
+
+    def setdefault(self, key, default=None):
+        """Like dict.setdefault, returning the stored value: default may have been converted to an IdList"""
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def __setitem__(self, key, value):
+        if key in self._fieldset:
+            setattr(self, key, _coerce(key, value))
+        elif key == 'isa':
+            if value != self.isa:
+                raise ValueError(f"Cannot change the isa of a {self.isa} record to {value}")
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = _coerce(key, value)
+
+    def __delitem__(self, key):
+        if key in self._fieldset:
+            try:
+                delattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        elif key == 'isa':
+            raise KeyError("A record's isa cannot be removed")
+        elif self._extra is not None and key in self._extra:
+            del self._extra[key]
+        else:
+            raise KeyError(key)
+
+    def __iter__(self):
+        yield 'isa'
+        for key in self.fields:
+            if hasattr(self, key):
+                yield key
+        if self._extra:
+            yield from self._extra
+
+    def __len__(self):
+        return len(self.items())
+
+    def items(self):
+        """A list of (key, value) pairs, built in one pass over the slots"""
+        items = [('isa', self.isa)]
+        for key in self.fields:
+            value = getattr(self, key, _UNSET)
+            if value is not _UNSET:
+                items.append((key, value))
+        if self._extra:
+            items.extend(self._extra.items())
+        return items
+
+    def __repr__(self):
+        return f"{type(self).__name__}({dict(self)!r})"
+
+    def pack(self, id_bytes):
+        """(isa, (key, value) of each set slot, extra keys) for marshal"""
+        return self.isa, tuple((key, id_bytes(value) if type(value) is IdList else value)
+                               for key, value in zip(self.fields, map(self.get, self.fields))
+                               if value is not None), self._extra
+
+    @classmethod
+    def unpack(cls, items, extra, id_list):
+        record = cls.__new__(cls)
+        record._extra = extra
+        for key, value in items:
+            setattr(record, key, id_list(value) if type(value) is bytes else value)
+        return record
+
+
+class PBXBuildFile(Record):
+    __slots__ = fields = ('fileRef', 'productRef', 'settings')
+    isa = 'PBXBuildFile'
+
+
+class PBXFileReference(Record):
+    __slots__ = fields = ('explicitFileType', 'fileEncoding', 'includeInIndex', 'lastKnownFileType', 'name',
+                          'path', 'sourceTree')
+    isa = 'PBXFileReference'
+
+
+class PBXGroup(Record):
+    __slots__ = fields = ('children', 'name', 'path', 'sourceTree')
+    isa = 'PBXGroup'
+
+
+class PBXVariantGroup(Record):
+    __slots__ = fields = ('children', 'name', 'path', 'sourceTree')
+    isa = 'PBXVariantGroup'
+
+
+RECORDS = {cls.isa: cls for cls in (PBXBuildFile, PBXFileReference, PBXGroup, PBXVariantGroup)}
+
+# What the serializer and JSON output treat as a dictionary or a list
+MAPPINGS = (dict, Record)
+SEQUENCES = (list, IdList)
+
+
+def compact(obj):
+    """Return obj as a record if its isa has one, else obj itself with its ID lists as IdLists"""
+    cls = RECORDS.get(obj.get('isa'))
+    if cls is not None:
+        return cls.from_dict(obj)
+    for key in ID_LIST_KEYS:
+        if type(obj.get(key)) is list:
+            obj[key] = IdList(obj[key])
+    return obj
+
+
+def pack_objects(objects):
+    """
+    objects in a form marshal can store: (IDs, packed objects in the same
+    order). Records become tuples and ID lists the bytes of an array of
+    indexes into IDs, so loading them back needs no per-element work.
+    """
+    ids = list(objects)
+    local = {oid: index for index, oid in enumerate(ids)}
+
+    def id_bytes(id_list):
+        numbers = array('I')
+        for oid in id_list:
+            index = local.get(oid)
+            if index is None:  # a dangling reference
+                index = local[oid] = len(ids)
+                ids.append(oid)
+            numbers.append(index)
+        return numbers.tobytes()
+
+    packed = [obj.pack(id_bytes) if isinstance(obj, Record) else
+              {key: id_bytes(value) if type(value) is IdList else value for key, value in obj.items()}
+              for obj in objects.values()]
+    return ids, packed
+
+
+def unpack_objects(ids, packed):
+    """Rebuild the objects dict from pack_objects() output"""
+    if _ID_STRINGS:
+        remap = array('I', map(_number, ids))
+        ids = [_ID_STRINGS[number] for number in remap]
+    else:
+        # A fresh process: the cached IDs become the table as they are
+        remap = None
+        _ID_NUMBERS.update(zip(ids, range(len(ids))))
+        _ID_STRINGS.extend(ids)
+
+    def id_list(data):
+        numbers = array('I')
+        numbers.frombytes(data)
+        id_list = IdList.__new__(IdList)
+        id_list._numbers = numbers if remap is None else array('I', map(remap.__getitem__, numbers))
+        return id_list
+
+    objects = {}
+    with paused_gc():
+        for oid, obj in zip(ids, packed):
+            if type(obj) is tuple:
+                isa, items, extra = obj
+                objects[oid] = RECORDS[isa].unpack(items, extra, id_list)
+            else:
+                objects[oid] = {key: id_list(value) if type(value) is bytes else value for key, value in obj.items()}
+    return objects
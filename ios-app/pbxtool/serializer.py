@@ -0,0 +1,262 @@
+"""
+Write a Project back out in Xcode's own project.pbxproj formatting
+"""
+import posixpath
+import re
+from operator import itemgetter
+
+from .project import BUILD_PHASE_NAMES
+from .records import MAPPINGS, SEQUENCES
+
+# Strings made only of these characters are written unquoted, as Xcode does
+_SAFE = re.compile(r'[A-Za-z0-9_$./]+\Z')
+_ESCAPES = str.maketrans({'\\': '\\\\', '"': '\\"', '\n': '\\n', '\t': '\\t'})
+
+# Objects Xcode writes on a single line
+_INLINE_ISAS = frozenset(['PBXBuildFile', 'PBXFileReference'])
+
+# Text accumulated before each write of a streamed serialization
+CHUNK_SIZE = 1 << 20
+
+# A list entry holding an object ID and its comment, as Xcode writes one per line
+_ANNOTATED_ENTRY = re.compile(r'^\t+(([0-9A-Za-z_]+) /\* .*? \*/),$', re.MULTILINE)
+
+_FIXED_COMMENTS = {
+    'PBXProject': 'Project object',
+    'PBXContainerItemProxy': 'PBXContainerItemProxy',
+    'PBXTargetDependency': 'PBXTargetDependency',
+}
+
+
+def quote(text):
+    if _SAFE.match(text) and '___' not in text:
+        return text
+    return '"' + text.translate(_ESCAPES) + '"'
+
+
+def _ordered_items(obj):
+    """(key, value) pairs, isa first, then the remaining keys alphabetically"""
+    items = sorted(obj.items(), key=itemgetter(0))
+    if 'isa' in obj:
+        items.remove(('isa', obj['isa']))
+        items.insert(0, ('isa', obj['isa']))
+    return items
+
+
+class _Comments:
+    """Computes the /* name */ annotations Xcode writes after object IDs"""
+
+    def __init__(self, project):
+        self.project = project
+        self.objects = project.objects
+        self._phase_of = None
+        self._owner_of = None
+        self._cache = {}
+
+    @property
+    def phase_of(self):
+        """Build file ID -> name of the phase it belongs to, built from the phases alone"""
+        if self._phase_of is None:
+            self._phase_of = {}
+            for isa in self.project.isas():
+                if not isa.endswith('BuildPhase'):
+                    continue
+                for obj in self.project.objects_of(isa).values():
+                    name = obj.get('name') or BUILD_PHASE_NAMES.get(isa)
+                    for build_id in obj.get('files', []):
+                        self._phase_of[build_id] = name
+        return self._phase_of
+
+    @property
+    def owner_of(self):
+        """Configuration list ID -> ID of the project or target that owns it"""
+        if self._owner_of is None:
+            self._owner_of = {}
+            for isa in self.project.isas():
+                if isa == 'PBXProject' or isa.endswith('Target'):
+                    for oid, obj in self.project.objects_of(isa).items():
+                        if 'buildConfigurationList' in obj:
+                            self._owner_of[obj['buildConfigurationList']] = oid
+        return self._owner_of
+
+    def __call__(self, oid):
+        if oid not in self._cache:
+            self._cache[oid] = self._compute(oid)
+        return self._cache[oid]
+
+    def _compute(self, oid):
+        unparsed = getattr(self.objects, 'unparsed', None)
+        if unparsed is not None and unparsed(oid):
+            # Not parsed, so not changed since the file was read: its comment there still holds
+            return self.project.file_comment(oid)
+        obj = self.objects.get(oid)
+        if not isinstance(obj, MAPPINGS) or 'isa' not in obj:
+            return None
+        isa = obj['isa']
+        if isa in _FIXED_COMMENTS:
+            return _FIXED_COMMENTS[isa]
+        if isa == 'PBXBuildFile':
+            ref = obj.get('fileRef') or obj.get('productRef')
+            name = self(ref) if ref else None
+            phase = self.phase_of.get(oid)
+            if phase is None:
+                return name
+            return f"{name} in {phase}"
+        if isa.endswith('BuildPhase'):
+            return obj.get('name') or BUILD_PHASE_NAMES.get(isa)
+        if isa == 'XCConfigurationList':
+            owner = self.owner_of.get(oid)
+            if owner is None:
+                return None
+            owner_obj = self.objects[owner]
+            name = owner_obj.get('name')
+            if name is None and owner_obj['isa'] == 'PBXProject':
+                name = posixpath.splitext(posixpath.basename(posixpath.dirname(self.project.path or '')))[0]
+            return f'Build configuration list for {owner_obj["isa"]} "{name}"'
+        if isa == 'XCRemoteSwiftPackageReference':
+            url = obj.get('repositoryURL', '')
+            name = posixpath.basename(url.rstrip('/'))
+            if name.endswith('.git'):
+                name = name[:-4]
+            return f'{isa} "{name}"'
+        if isa == 'XCSwiftPackageProductDependency':
+            return obj.get('productName')
+        if 'name' in obj:
+            return obj['name']
+        if 'path' in obj:
+            return posixpath.basename(obj['path'])
+        return None
+
+
+class _Writer:
+    def __init__(self, project, comments=None):
+        """comments, an {ID: comment} mapping, replaces the ones computed from the project"""
+        self.project = project
+        self.entries = {}  # ID -> its annotated text, reused as is for list entries
+        if comments is None:
+            self.objects = project.objects
+            self.comment = _Comments(project)
+        else:
+            self.objects = comments
+            self.comment = comments.get
+
+    def scalar(self, text):
+        quoted = quote(text)
+        if text in self.objects:
+            comment = self.comment(text)
+            if comment:
+                return f"{quoted} /* {comment} */"
+        return quoted
+
+    # Strings are by far the most common value, so they are tested for first
+    def value(self, value, indent):
+        if type(value) is str:
+            return self.scalar(value)
+        if isinstance(value, MAPPINGS):
+            return self.dictionary(value, indent)
+        if isinstance(value, SEQUENCES):
+            tabs = '\t' * (indent + 1)
+            entries = self.entries
+            items = ''.join(f"{tabs}{entries.get(v) or self.value(v, indent + 1)},\n" if type(v) is str
+                            else f"{tabs}{self.value(v, indent + 1)},\n" for v in value)
+            return "(\n" + items + '\t' * indent + ")"
+        return self.scalar(value)
+
+    def dictionary(self, obj, indent):
+        tabs = '\t' * (indent + 1)
+        body = ''.join(f"{tabs}{quote(k)} = {self.value(v, indent + 1)};\n" for k, v in _ordered_items(obj))
+        return "{\n" + body + '\t' * indent + "}"
+
+    def inline(self, value):
+        if type(value) is str:
+            return self.scalar(value)
+        if isinstance(value, MAPPINGS):
+            return "{" + ''.join(f"{quote(k)} = {self.inline(v)}; " for k, v in _ordered_items(value)) + "}"
+        if isinstance(value, SEQUENCES):
+            return "(" + ''.join(f"{self.inline(v)}, " for v in value) + ")"
+        return self.scalar(value)
+
+    def object(self, oid, obj):
+        comment = self.comment(oid)
+        key = f"{oid} /* {comment} */" if comment else oid
+        if obj['isa'] in _INLINE_ISAS:
+            return f"\t\t{key} = {self.inline(obj)};\n"
+        return f"\t\t{key} = {self.dictionary(obj, 2)};\n"
+
+    def sections(self):
+        """Yield the objects dictionary's lines: isa sections in order, objects sorted by ID within each"""
+        sections = {}
+        for oid, obj in self.objects.items():
+            sections.setdefault(obj['isa'], []).append(oid)
+        for isa in sorted(sections):
+            yield f"\n/* Begin {isa} section */\n"
+            for oid in sorted(sections[isa]):
+                yield self.object(oid, self.objects[oid])
+            yield f"/* End {isa} section */\n"
+
+    def document(self):
+        """Yield the whole file piece by piece, at most one object's text at a time"""
+        root = self.project.root
+        yield "// !$*UTF8*$!\n{\n"
+        for key in sorted(root):
+            if key == 'objects':
+                yield f"\t{quote(key)} = {{\n"
+                yield from self.sections()
+                yield "\t};\n"
+            else:
+                yield f"\t{quote(key)} = {self.value(root[key], 1)};\n"
+        yield "}\n"
+
+
+def dumps(project):
+    """Serialize the whole project to text"""
+    return ''.join(_Writer(project).document())
+
+
+def dump_chunks(project, size=CHUNK_SIZE):
+    """
+    Serialize the whole project as UTF-8 chunks of about size bytes, so
+    writing it out never holds more than one chunk of text in memory
+    """
+    batch, length = [], 0
+    for piece in _Writer(project).document():
+        batch.append(piece)
+        length += len(piece)
+        if length >= size:
+            yield ''.join(batch).encode('utf-8')
+            batch, length = [], 0
+    yield ''.join(batch).encode('utf-8')
+
+
+def dump(project, fp):
+    """Serialize the whole project to a binary file object, a chunk at a time"""
+    fp.writelines(dump_chunks(project))
+
+
+def object_writer(project):
+    """Return a function serializing one object ID as the line(s) it occupies in its section"""
+    writer = _Writer(project)
+    if not hasattr(project.objects, 'unparsed'):
+        return lambda oid: writer.object(oid, project.objects[oid])
+
+    def render(oid):
+        # An object of a lazily loaded file rewritten in place: the entries of its lists that
+        # name objects not changed since are copied from its old text instead of recomputed
+        span = project.layout.spans.get(oid)
+        if span is not None:
+            dirty = project.dirty
+            text = project.buffer[span[0]:span[1]].decode('utf-8')
+            writer.entries = {ref: entry for entry, ref in _ANNOTATED_ENTRY.findall(text) if ref not in dirty}
+        try:
+            return writer.object(oid, project.objects[oid])
+        finally:
+            writer.entries = {}
+    return render
+
+
+def fragment_writer(comments):
+    """
+    Return a function serializing (ID, object) outside any Project, each ID
+    annotated with comments[ID] (e.g. read back from an existing file)
+    """
+    return _Writer(None, comments).object
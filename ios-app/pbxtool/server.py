@@ -0,0 +1,333 @@
+"""
+Resident project server: keeps parsed projects in memory and serves JSON-RPC
+2.0 requests over a Unix socket, one JSON object per line.
+
+Edits are applied to the in-memory project at once and written on a
+debounce timer (or by an explicit flush), so hundreds of small edits cost
+one parse and a handful of writes. Before every request the file's stat is
+compared with the last one seen; if it changed and the content digest
+differs too, the project was modified behind the server's back. It is then
+reloaded and the edits not yet written are replayed on top, so nothing is
+lost and nothing external is overwritten.
+
+Methods (params by name; project is a path to the .xcodeproj):
+
+    open(project, target=None)         load and keep a project resident
+    add_file(project, path, file_type=None, phase=None, target=None)
+    remove_file(project, path)
+    add_to_group(project, path, group)
+    add_to_phase(project, path, phase='Sources', target=None)
+    apply(project, manifest, target=None, create_groups=False, label=None, flush=False)
+                                       apply a manifest file (see pbxtool.manifest); with
+                                       flush, write before answering, snapshot labelled label
+    query(project, queries)            run pbxtool.query lines, one answer each
+    flush(project=None)                write pending edits now (all projects by default)
+    status()                           resident projects and their pending edits
+    close(project)                     flush and forget a project
+    shutdown()                         flush everything and stop
+"""
+import inspect
+import json
+import os
+import socket
+import socketserver
+import threading
+
+from . import query
+from .cache import CACHE_DIR, digest
+from .manifest import ManifestError, load_manifest, plan
+from .parser import PBXParseError
+from .project import resolve_path
+from .transaction import MissingAnchorError, ProjectTransaction
+
+SOCKET_ENV = 'PBXTOOL_SOCKET'
+DEFAULT_DEBOUNCE = 0.5
+
+# JSON-RPC error codes
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+APPLICATION_ERROR = -32000
+
+def default_socket():
+    """$PBXTOOL_SOCKET, else .pbxtool-cache/pbxtool.sock in the current directory"""
+    return os.environ.get(SOCKET_ENV) or os.path.join(CACHE_DIR, 'pbxtool.sock')
+
+
+def _stamp(path):
+    st = os.stat(path)
+    return st.st_size, st.st_mtime_ns, st.st_ino
+
+
+class _Resident:
+    """One loaded project, the edits applied to it since the last write and what the disk held then"""
+
+    def __init__(self, path, target=None):
+        self.path = path
+        self.target = target
+        self.pending = []
+        self.changes = []
+        self.dropped = []
+        self.reloads = 0
+        self.writes = 0
+        self._load()
+
+    def _load(self):
+        self.tx = ProjectTransaction(self.path, target=self.target, label='pbxtool server', cache=True)
+        project = self.tx.open()
+        self.stamp = _stamp(self.path)
+        self.digest = digest(project.buffer)
+
+    def refresh(self):
+        """Reload if the file changed on disk, replaying unwritten edits; returns True if it did"""
+        stamp = _stamp(self.path)
+        if stamp == self.stamp:
+            return False
+        with open(self.path, 'rb') as f:
+            if digest(f.read()) == self.digest:
+                self.stamp = stamp
+                return False
+        self._replay(self.pending)
+        self.reloads += 1
+        return True
+
+    def _replay(self, pending):
+        """Reload from disk and apply pending on top; edits the file no longer allows are dropped"""
+        self.pending, self.changes = [], []
+        self._load()
+        for method, args, target in pending:
+            try:
+                self.edit(method, args, target)
+            except MissingAnchorError as e:
+                self.dropped.append(f"{method} {' '.join(str(arg) for arg in args if arg)}: {e}")
+
+    def rollback(self, mark):
+        """Forget everything applied after the first mark pending edits, including a half-applied one"""
+        self._replay(self.pending[:mark])
+
+    def edit(self, method, args, target=None):
+        """
+        Apply one ProjectTransaction edit now; target overrides the project's
+        default target. An edit that fails is rolled back, so the project
+        never holds a change that is not pending.
+        """
+        mark = len(self.pending)
+        self.tx.target_name = target or self.target
+        try:
+            getattr(self.tx, method)(*args)
+            changes = self.tx.apply()
+        except Exception:
+            self.rollback(mark)
+            raise
+        if changes:
+            self.pending.append((method, args, target))
+            self.changes.extend(changes)
+        return changes
+
+    def flush(self, label=None):
+        """Write the pending edits, if any; returns the changes written"""
+        self.refresh()
+        if not self.changes:
+            return []
+        self.tx.label = label or 'pbxtool server'
+        self.tx.commit()  # on failure everything stays pending, to be written by the next flush
+        written, self.changes, self.pending, self.dropped = self.changes, [], [], []
+        self.tx.changes = []
+        self.stamp = _stamp(self.path)
+        self.digest = digest(self.tx.project.buffer)
+        self.writes += 1
+        return written
+
+
+class ProjectServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    Serve JSON-RPC on socket_path. All requests run under one lock, so the
+    resident projects are only ever touched by one request at a time.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, socket_path=None, debounce=DEFAULT_DEBOUNCE, log=None):
+        self.socket_path = socket_path or default_socket()
+        self.debounce = debounce
+        self.log = log or (lambda message: None)
+        self.residents = {}
+        self.lock = threading.RLock()
+        self._timer = None
+        _claim(self.socket_path)
+        super().__init__(self.socket_path, _Handler)
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+    # -- dispatch --------------------------------------------------------
+
+    def handle_message(self, line):
+        """Answer one request line; returns the response object, or None for a notification"""
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            return _error(None, PARSE_ERROR, f"Invalid JSON: {e}")
+        if not isinstance(request, dict) or not isinstance(request.get('method'), str):
+            return _error(None, INVALID_REQUEST, "Expected an object with a method")
+        rid, method, params = request.get('id'), request['method'], request.get('params') or {}
+        handler = getattr(self, 'rpc_' + method, None)
+        if handler is None:
+            return _error(rid, METHOD_NOT_FOUND, f"Unknown method {method}")
+        if not isinstance(params, dict):
+            return _error(rid, INVALID_PARAMS, "params must be an object")
+        try:
+            inspect.signature(handler).bind(**params)
+        except TypeError as e:
+            return _error(rid, INVALID_PARAMS, str(e))
+        try:
+            with self.lock:
+                result = handler(**params)
+        except (OSError, PBXParseError, MissingAnchorError, ManifestError, query.QueryError) as e:
+            return _error(rid, APPLICATION_ERROR, str(e))
+        except Exception as e:  # a bad param or a refused edit must not drop the connection
+            self.log(f"❌ {method} failed: {type(e).__name__}: {e}")
+            return _error(rid, APPLICATION_ERROR, f"{type(e).__name__}: {e}")
+        if 'id' not in request:
+            return None
+        return {'jsonrpc': '2.0', 'id': rid, 'result': result}
+
+    def _resident(self, project, target=None):
+        path = os.path.abspath(resolve_path(project))
+        resident = self.residents.get(path)
+        if resident is None:
+            resident = self.residents[path] = _Resident(path, target)
+            self.log(f"Loaded {path}")
+        elif resident.refresh():
+            self.log(f"Reloaded {path} after an external change, replayed {len(resident.pending)} edits"
+                     + (f", dropped {len(resident.dropped)}" if resident.dropped else ""))
+        return resident
+
+    def _schedule(self):
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = threading.Timer(self.debounce, self._flush_all)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _flush_all(self):
+        with self.lock:
+            self._timer = None
+            for path, resident in self.residents.items():
+                try:
+                    written = resident.flush()
+                except (OSError, PBXParseError) as e:
+                    self.log(f"❌ Could not write {path}, edits kept for the next flush: {e}")
+                    continue
+                if written:
+                    self.log(f"Wrote {len(written)} changes to {path}")
+
+    def _edit(self, project, method, args, target=None):
+        resident = self._resident(project)
+        changes = resident.edit(method, args, target)
+        if changes:
+            self._schedule()
+        return {'changes': changes, 'pending': len(resident.changes)}
+
+    # -- methods ---------------------------------------------------------
+
+    def rpc_open(self, project, target=None):
+        resident = self._resident(project, target)
+        return {'project': resident.path, 'objects': len(resident.tx.project.objects)}
+
+    def rpc_add_file(self, project, path, file_type=None, phase=None, target=None):
+        return self._edit(project, 'add_file', (path, file_type, phase), target)
+
+    def rpc_remove_file(self, project, path):
+        return self._edit(project, 'remove_file', (path,))
+
+    def rpc_add_to_group(self, project, path, group):
+        return self._edit(project, 'add_to_group', (path, group))
+
+    def rpc_add_to_phase(self, project, path, phase='Sources', target=None):
+        return self._edit(project, 'add_to_phase', (path, phase), target)
+
+    def rpc_apply(self, project, manifest, target=None, create_groups=False, label=None, flush=False):
+        resident = self._resident(project)
+        manifest = load_manifest(manifest)
+        target = target or manifest['target']
+        changes, mark = [], len(resident.pending)
+        try:
+            for method, args, _ in plan(resident.tx.project, manifest, target or resident.target, create_groups):
+                changes.extend(resident.edit(method, args, target))
+        except Exception:
+            if len(resident.pending) > mark:
+                resident.rollback(mark)  # all of the manifest or none of it
+            raise
+        if flush:
+            resident.flush(label)
+        elif changes:
+            self._schedule()
+        return {'changes': changes, 'pending': len(resident.changes)}
+
+    def rpc_query(self, project, queries, target=None):
+        session = query.Session(self._resident(project).tx.project, target)
+        answers = []
+        for text in queries:
+            try:
+                answers.append({'query': text, 'result': session.run(text)})
+            except (query.QueryError, ValueError) as e:
+                answers.append({'query': text, 'error': str(e)})
+        return answers
+
+    def rpc_flush(self, project=None):
+        if self._timer is not None and project is None:
+            self._timer.cancel()
+            self._timer = None
+        residents = [self._resident(project)] if project else list(self.residents.values())
+        return {resident.path: resident.flush() for resident in residents}
+
+    def rpc_status(self):
+        return {path: {'objects': len(resident.tx.project.objects), 'pending': resident.changes,
+                       'dropped': resident.dropped, 'writes': resident.writes, 'reloads': resident.reloads}
+                for path, resident in self.residents.items()}
+
+    def rpc_close(self, project):
+        resident = self._resident(project)
+        written = resident.flush()
+        del self.residents[resident.path]
+        return written
+
+    def rpc_shutdown(self):
+        written = self.rpc_flush()
+        threading.Thread(target=self.shutdown, daemon=True).start()
+        return written
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            response = self.server.handle_message(line)
+            if response is not None:
+                self.wfile.write(json.dumps(response).encode('utf-8') + b'\n')
+                self.wfile.flush()
+
+
+def _error(rid, code, message):
+    return {'jsonrpc': '2.0', 'id': rid, 'error': {'code': code, 'message': message}}
+
+
+def _claim(socket_path):
+    """Remove a stale socket left by a server that died; refuse if one is still listening"""
+    if not os.path.exists(socket_path):
+        os.makedirs(os.path.dirname(os.path.abspath(socket_path)), exist_ok=True)
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(socket_path)
+    except OSError:
+        os.unlink(socket_path)
+    else:
+        raise OSError(f"A server is already listening on {socket_path}")
+    finally:
+        probe.close()
@@ -0,0 +1,213 @@
+"""
+Content-addressed, compressed snapshot store for project.pbxproj.
+
+Replaces the project.pbxproj.backup ... backup5 copies. Snapshots live in
+.pbxproj-snapshots/<Name>.xcodeproj/ next to the project:
+
+    index.jsonl     one JSON line per snapshot, oldest first
+    <sha256>.z      zlib-compressed blob, named by the hash of the full text
+
+A blob is either the full text (a keyframe) or a line delta against the
+latest keyframe's text; every KEYFRAME_INTERVAL-th blob is a keyframe.
+A restore decompresses at most one keyframe and applies one delta, and a
+save reads the keyframe instead of replaying a chain. The delta is found
+in one pass over both texts, so saving a snapshot of a 40 MB project
+costs about as much as writing it. Identical content is stored once.
+"""
+import difflib
+import hashlib
+import json
+import os
+import time
+import zlib
+
+from .project import resolve_path
+from .writer import replace_file
+
+STORE_DIR = '.pbxproj-snapshots'
+KEYFRAME_INTERVAL = 16
+# Transactions snapshot larger projects only when asked to (ProjectTransaction(snapshot=True))
+SIZE_LIMIT = 32 * 1024 * 1024
+# Keyframes of large projects are tens of MB; level 1 is 8x faster than 9 and 13% larger
+_LEVEL = 1
+
+
+class SnapshotError(LookupError):
+    """Unknown or ambiguous snapshot ID"""
+
+
+def _delta(parent, text):
+    """
+    Encode text as copy ranges of parent's lines plus inserted text. Runs
+    are anchored on lines that occur once in parent (in a pbxproj, nearly
+    every line naming an object ID) and extended in both directions, so the
+    cost is linear rather than that of a longest-match diff.
+    """
+    a = parent.splitlines(keepends=True)
+    b = text.splitlines(keepends=True)
+    unique = {}
+    for i, line in enumerate(a):
+        unique[line] = -1 if line in unique else i
+    ops, inserted, j = [], [], 0
+    while j < len(b):
+        start = unique.get(b[j], -1)
+        if start < 0:
+            inserted.append(b[j])
+            j += 1
+            continue
+        end = start + 1
+        while inserted and start > 0 and inserted[-1] == a[start - 1]:
+            inserted.pop()
+            start -= 1
+        if inserted:
+            ops.append(''.join(inserted))
+            inserted = []
+        j += 1
+        while j < len(b) and end < len(a) and a[end] == b[j]:
+            end += 1
+            j += 1
+        if ops and isinstance(ops[-1], list) and ops[-1][1] == start:
+            ops[-1][1] = end
+        else:
+            ops.append([start, end])
+    if inserted:
+        ops.append(''.join(inserted))
+    return ops
+
+
+def _apply(parent, ops):
+    a = parent.splitlines(keepends=True)
+    return ''.join(''.join(a[op[0]:op[1]]) if isinstance(op, list) else op for op in ops)
+
+
+class SnapshotStore:
+    def __init__(self, project_path):
+        pbxproj = resolve_path(project_path)
+        xcodeproj = os.path.dirname(os.path.abspath(pbxproj))
+        self.pbxproj = pbxproj
+        self.root = os.path.join(os.path.dirname(xcodeproj), STORE_DIR, os.path.basename(xcodeproj))
+        self.index_path = os.path.join(self.root, 'index.jsonl')
+        self._texts = {}
+
+    # -- index -----------------------------------------------------------
+
+    def entries(self):
+        if not os.path.exists(self.index_path):
+            return []
+        with open(self.index_path, encoding='utf-8') as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def resolve(self, ref):
+        """
+        Find a snapshot by hash prefix, or by position: '@0' is the oldest,
+        '@-1', '-1' or 'latest' the newest. A bare number is a hash prefix.
+        """
+        entries = self.entries()
+        if ref == 'latest':
+            ref = '@-1'
+        # A leading '-' cannot start a hash, so negative positions need no '@'
+        position = ref[1:] if ref.startswith('@') else ref if ref.startswith('-') else None
+        if position is not None:
+            try:
+                return entries[int(position)]
+            except ValueError:
+                raise SnapshotError(f"Bad snapshot position {ref}") from None
+            except IndexError:
+                raise SnapshotError(f"No snapshot at position {ref}") from None
+        matches = {e['hash']: e for e in entries if e['hash'].startswith(ref.lower())}
+        if len(matches) != 1:
+            raise SnapshotError(f"{'Ambiguous' if matches else 'Unknown'} snapshot {ref}")
+        return matches.popitem()[1]
+
+    # -- blobs -----------------------------------------------------------
+
+    def _blob_path(self, digest):
+        return os.path.join(self.root, digest + '.z')
+
+    def text(self, digest):
+        """Reconstruct the full text of a snapshot"""
+        if digest not in self._texts:
+            with open(self._blob_path(digest), 'rb') as f:
+                blob = json.loads(zlib.decompress(f.read()))
+            if blob['parent'] is None:
+                text = blob['text']
+            else:
+                text = _apply(self.text(blob['parent']), blob['delta'])
+            self._texts[digest] = text
+        return self._texts[digest]
+
+    def _placement(self, digest, entries):
+        """(depth, base) of a blob the index has lost track of, read from the blob itself"""
+        with open(self._blob_path(digest), 'rb') as f:
+            parent = json.loads(zlib.decompress(f.read()))['parent']
+        if parent is None:
+            return 0, digest
+        depths = [e['depth'] for e in entries if e.get('base') == parent]
+        return max(depths, default=0) + 1, parent
+
+    def save(self, data=None, label=''):
+        """
+        Snapshot the given bytes (default: the current project file).
+        Returns the snapshot entry, or None if it matches the latest one.
+        """
+        if data is None:
+            with open(self.pbxproj, 'rb') as f:
+                data = f.read()
+        data = bytes(data)
+        digest = hashlib.sha256(data).hexdigest()
+        entries = self.entries()
+        if entries and entries[-1]['hash'] == digest:
+            return None
+        os.makedirs(self.root, exist_ok=True)
+        if not os.path.exists(self._blob_path(digest)):
+            text = data.decode('utf-8', 'surrogateescape')
+            latest = entries[-1] if entries else None
+            # Entries written before keyframes were recorded have no 'base'; start a new keyframe after them
+            if latest is None or not latest.get('base') or latest['depth'] + 1 >= KEYFRAME_INTERVAL:
+                blob, depth, base = {'parent': None, 'text': text}, 0, digest
+            else:
+                base = latest['base']
+                blob, depth = {'parent': base, 'delta': _delta(self.text(base), text)}, latest['depth'] + 1
+            tmp = self._blob_path(digest) + '.tmp'
+            with open(tmp, 'wb') as f:
+                f.write(zlib.compress(json.dumps(blob, separators=(',', ':')).encode('utf-8'), _LEVEL))
+            os.replace(tmp, self._blob_path(digest))
+        else:
+            known = next((e for e in entries if e['hash'] == digest), None)
+            if known is not None:
+                depth, base = known['depth'], known.get('base')
+            else:
+                depth, base = self._placement(digest, entries)
+        entry = {
+            'hash': digest,
+            'depth': depth,
+            'base': base,
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'size': len(data),
+            'label': label,
+        }
+        with open(self.index_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry) + '\n')
+        return entry
+
+    # -- commands --------------------------------------------------------
+
+    def diff(self, ref, other=None):
+        """Unified diff from snapshot ref to snapshot other (default: the current file)"""
+        old = self.resolve(ref)
+        if other is None:
+            with open(self.pbxproj, encoding='utf-8', errors='surrogateescape') as f:
+                new_text, new_name = f.read(), 'project.pbxproj'
+        else:
+            new = self.resolve(other)
+            new_text, new_name = self.text(new['hash']), new['hash'][:10]
+        return difflib.unified_diff(self.text(old['hash']).splitlines(keepends=True),
+                                    new_text.splitlines(keepends=True),
+                                    old['hash'][:10], new_name)
+
+    def restore(self, ref):
+        """Replace project.pbxproj with a snapshot, snapshotting the current file first"""
+        entry = self.resolve(ref)
+        self.save(label=f"before restore {entry['hash'][:10]}")
+        replace_file(self.pbxproj, [self.text(entry['hash']).encode('utf-8', 'surrogateescape')])
+        return entry
@@ -0,0 +1,224 @@
+"""
+Filesystem-to-project sync: make the group tree under a folder match the disk.
+
+The folder is walked with os.scandir. Each directory's mtime and inode are
+kept in .pbxtool-cache/ next to the .xcodeproj, so a repeated run only lists
+directories whose entries changed, and skips parsing the project entirely
+when neither the tree nor project.pbxproj changed since the last sync.
+"""
+import fnmatch
+import json
+import os
+import posixpath
+
+from . import profile
+from .cache import cache_path
+from .project import FILE_TYPES, PHASE_ISAS, resolve_path
+from .transaction import MissingAnchorError, ProjectTransaction
+from .writer import replace_file
+
+_CACHE_VERSION = 1
+
+
+class Tree:
+    """
+    Result of a scan: files (bundles such as .xcassets count as files) and
+    directories as POSIX paths relative to the folder holding the .xcodeproj.
+    state is what the next scan needs to skip unchanged directories.
+    """
+
+    def __init__(self):
+        self.files = set()
+        self.dirs = set()
+        self.state = {}
+        self.listed = 0
+        self.cached = 0
+
+
+def is_tracked(name):
+    return posixpath.splitext(name)[1] in FILE_TYPES
+
+
+def is_excluded(path, exclude):
+    name = posixpath.basename(path)
+    return any(fnmatch.fnmatchcase(path, pattern) or fnmatch.fnmatchcase(name, pattern)
+               for pattern in exclude)
+
+
+def scan(base, directory, previous=None, exclude=()):
+    """
+    Walk base/directory. Directories whose (mtime, inode) match the state
+    recorded by a previous scan are not listed again.
+    """
+    previous = previous or {}
+    tree = Tree()
+    stack = [directory]
+    while stack:
+        rel = stack.pop()
+        try:
+            st = os.stat(os.path.join(base, rel))
+        except FileNotFoundError:
+            continue
+        old = previous.get(rel)
+        if old and old[0] == st.st_mtime_ns and old[1] == st.st_ino:
+            files, subdirs = old[2], old[3]
+            tree.cached += 1
+        else:
+            files, subdirs = [], []
+            with os.scandir(os.path.join(base, rel)) as entries:
+                for entry in entries:
+                    if entry.name.startswith('.'):
+                        continue
+                    if is_tracked(entry.name):
+                        files.append(entry.name)
+                    elif entry.is_dir():
+                        subdirs.append(entry.name)
+            files.sort()
+            subdirs.sort()
+            tree.listed += 1
+        tree.state[rel] = [st.st_mtime_ns, st.st_ino, files, subdirs]
+        tree.dirs.add(rel)
+        for name in files:
+            path = posixpath.join(rel, name)
+            if not is_excluded(path, exclude):
+                tree.files.add(path)
+        for name in subdirs:
+            path = posixpath.join(rel, name)
+            if not is_excluded(path, exclude):
+                stack.append(path)
+    return tree
+
+
+def _resolve(project):
+    """
+    Return ({disk path: ref ID}, {disk dir: group ID}, [(group ID, disk dir)])
+    from one walk of the group tree.
+    """
+    refs, dirs, groups = {}, {}, []
+    for oid, location in project.locations().items():
+        if project.objects[oid]['isa'] != 'PBXGroup':
+            refs.setdefault(location, oid)
+            continue
+        dirs.setdefault(location, oid)
+        if oid != project.main_group:
+            groups.append((oid, location))
+    return refs, dirs, groups
+
+
+def _within(path, directory):
+    return path.startswith(directory + '/')
+
+
+def reconcile(project, base, directory, tree, target_id, remove=True, exclude=()):
+    """
+    Apply the difference between tree and the project's group tree under
+    directory to project. Returns the list of changes made.
+    """
+    refs, dirs, groups = _resolve(project)
+    if directory not in dirs:
+        raise MissingAnchorError(f"No group maps to {directory}/")
+    target_name = project.objects[target_id].get('name')
+    changes = []
+
+    def group_for(rel):
+        if rel not in dirs:
+            parent = group_for(posixpath.dirname(rel))
+            dirs[rel] = project.add_group(parent, posixpath.basename(rel), key=(rel,))
+            changes.append(f"Created group {rel}")
+        return dirs[rel]
+
+    phases = {}
+
+    def phase(name):
+        if name not in phases:
+            phases[name] = project.build_phase(target_id, PHASE_ISAS[name])
+            if phases[name] is None:
+                raise MissingAnchorError(f"{name} build phase not found")
+        return phases[name]
+
+    for path in sorted(tree.files - refs.keys()):
+        name = posixpath.basename(path)
+        refs[path] = project.add_file_reference(group_for(posixpath.dirname(path)), name,
+                                                FILE_TYPES[posixpath.splitext(name)[1]][0], key=(path,))
+        changes.append(f"Added {path}")
+
+    for path in sorted(tree.files):
+        phase_name = FILE_TYPES[posixpath.splitext(path)[1]][1]
+        if phase_name and not project.build_files_for(refs[path], phase(phase_name)):
+            project.add_build_file(phase(phase_name), refs[path], key=(target_name, phase_name, path))
+            changes.append(f"Added {path} to {phase_name}")
+
+    if not remove:
+        return changes
+
+    def missing(path):
+        if path in tree.files or is_excluded(path, exclude):
+            return False
+        if is_tracked(path) and posixpath.dirname(path) in tree.dirs:
+            return True
+        return not os.path.lexists(os.path.join(base, path))
+
+    for path in sorted(path for path in refs if _within(path, directory) and missing(path)):
+        removed = project.remove_file_reference(refs.pop(path))
+        changes.append(f"Removed {path}: {project.describe_removal(*removed)}")
+
+    # Groups for directories that no longer exist, deepest first, once they are empty
+    for group_id, rel in sorted(groups, key=lambda g: -g[1].count('/')):
+        if (_within(rel, directory) and rel not in tree.dirs and not is_excluded(rel, exclude)
+                and not project.objects[group_id].get('children')
+                and not os.path.isdir(os.path.join(base, rel))):
+            project.remove_cascade([group_id])
+            changes.append(f"Removed group {rel}")
+    return changes
+
+
+def _stamp(path):
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns, st.st_ino]
+
+
+def sync(project_path, directory='Inventry', target=None, exclude=(), remove=True,
+         dry_run=False, use_cache=True, deterministic=False):
+    """
+    Sync directory (relative to the folder holding the .xcodeproj) into the
+    project. Returns (changes, tree); changes is empty when already in sync.
+    """
+    pbxproj = resolve_path(project_path)
+    base = os.path.dirname(os.path.dirname(os.path.abspath(pbxproj)))
+    directory = posixpath.normpath(directory).strip('/')
+    options = {'version': _CACHE_VERSION, 'directory': directory, 'target': target,
+               'exclude': sorted(exclude), 'remove': remove}
+    state_path = cache_path(pbxproj, 'sync-', '.json')
+    cache = {}
+    if use_cache and os.path.exists(state_path):
+        with open(state_path, encoding='utf-8') as f:
+            cache = json.load(f)
+        if cache.get('options') != options:
+            cache = {'dirs': cache.get('dirs', {})}
+
+    if not os.path.isdir(os.path.join(base, directory)):
+        raise MissingAnchorError(f"Folder {directory}/ not found")
+    with profile.phase('sync.scan') as p:
+        tree = scan(base, directory, cache.get('dirs'), exclude)
+        p.add(files=len(tree.files), listed=tree.listed)
+    unchanged = tree.listed == 0 and tree.state.keys() == cache.get('dirs', {}).keys()
+    if unchanged and cache.get('project') == _stamp(pbxproj):
+        return [], tree
+
+    tx = ProjectTransaction(pbxproj, target=target, deterministic=deterministic, label='pbxtool sync')
+    project = tx.open()
+    target_id = project.target(target)
+    if target_id is None:
+        raise MissingAnchorError(f"Target {target or '(first)'} not found")
+    with profile.phase('sync.reconcile') as p:
+        tx.changes.extend(reconcile(project, base, directory, tree, target_id, remove, exclude))
+        p.add(objects=len(project.dirty) + len(project.removed))
+    if dry_run:
+        return tx.changes, tree
+    tx.commit()
+
+    if use_cache:
+        os.makedirs(os.path.dirname(state_path), exist_ok=True)
+        state = {'options': options, 'project': _stamp(pbxproj), 'dirs': tree.state}
+        replace_file(state_path, [json.dumps(state, separators=(',', ':')).encode('utf-8')], durable=False)
+    return tx.changes, tree
@@ -0,0 +1,25 @@
+"""
+pbxtool's tests, run from ios-app:
+
+    python3 -m unittest discover -s pbxtool/tests -t .
+    python3 -m pytest -q pbxtool/tests
+
+They only ever edit copies of Inventry.xcodeproj in temporary directories.
+"""
+import os
+import shutil
+
+PROJECT = os.path.join(os.path.dirname(__file__), '..', '..', 'Inventry.xcodeproj')
+PBXPROJ = os.path.join(PROJECT, 'project.pbxproj')
+
+
+def copy_project(directory):
+    """Copy Inventry.xcodeproj into directory; returns the copy's path"""
+    path = os.path.join(directory, 'Inventry.xcodeproj')
+    shutil.copytree(PROJECT, path)
+    return path
+
+
+def read(project):
+    with open(os.path.join(project, 'project.pbxproj'), 'rb') as f:
+        return f.read()
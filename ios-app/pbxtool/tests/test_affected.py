@@ -0,0 +1,87 @@
+import os
+import subprocess
+import tempfile
+import unittest
+
+from pbxtool.affected import BuildMapError, affected_by, changed_since, load_map, record, repo_root, status
+
+
+class BuildMapTest(unittest.TestCase):
+    """The repository's own build-map.json"""
+
+    def setUp(self):
+        self.root = repo_root(os.path.dirname(__file__))
+        self.map = load_map(self.root)
+
+    def test_only_files_the_project_builds_affect_the_app(self):
+        paths = ['ios-app/Inventry/ContentView.swift', 'ios-app/Inventry/Info.plist',
+                 'ios-app/Inventry/Assets.xcassets/AppIcon.appiconset/Contents.json',
+                 'ios-app/Inventry/Views/RoomDetailView_Old.swift', 'ios-app/Inventry/NOTES.md']
+        self.assertEqual(affected_by(paths, self.root, self.map), {'ios-app': paths[:3]})
+
+    def test_shared_code_affects_both_dashboards(self):
+        affected = affected_by(['shared/format.ts', 'client-dashboard/README.md'], self.root, self.map)
+        self.assertEqual(affected, {'client-dashboard': ['shared/format.ts'],
+                                    'company-dashboard': ['shared/format.ts']})
+
+
+class StatusTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.git('init', '-q')
+        self.git('config', 'user.email', 'tests@example.com')
+        self.git('config', 'user.name', 'tests')
+        with open(os.path.join(self.root, '.gitignore'), 'w') as f:
+            f.write('.pbxtool-cache/\n')
+        self.write('web/index.ts', 'one\n')
+        self.write('web/README.md', 'docs\n')
+        self.write('api/main.py', 'print(1)\n')
+        self.git('add', '-A')
+        self.git('commit', '-q', '-m', 'initial')
+        self.map = {'web': {'inputs': ['web/*'], 'ignore': ['*.md']}, 'api': {'inputs': ['api/*']}}
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def git(self, *args):
+        subprocess.run(['git', '-C', self.root, *args], check=True)
+
+    def write(self, path, text):
+        full = os.path.join(self.root, path)
+        os.makedirs(os.path.dirname(full), exist_ok=True)
+        with open(full, 'w') as f:
+            f.write(text)
+
+    def changed(self):
+        return {name: changed for name, (_, changed) in status(self.root, self.map).items()}
+
+    def test_recorded_trees(self):
+        self.assertEqual(self.changed(), {'web': None, 'api': None})
+        record(self.root, self.map, ['web', 'api'])
+        self.assertEqual(self.changed(), {'web': [], 'api': []})
+
+        self.write('web/README.md', 'more docs\n')
+        self.assertEqual(self.changed(), {'web': [], 'api': []})
+        self.write('web/index.ts', 'two\n')
+        self.write('web/new.ts', 'new\n')
+        os.unlink(os.path.join(self.root, 'api', 'main.py'))
+        self.assertEqual(self.changed(), {'web': ['web/index.ts', 'web/new.ts'], 'api': ['api/main.py']})
+
+        self.write('web/index.ts', 'one\n')
+        os.unlink(os.path.join(self.root, 'web', 'new.ts'))
+        self.assertEqual(self.changed()['web'], [])
+
+    def test_changed_since_includes_untracked_files(self):
+        self.write('web/index.ts', 'two\n')
+        self.write('api/extra.py', '\n')
+        self.assertEqual(changed_since(self.root, 'HEAD'), ['api/extra.py', 'web/index.ts'])
+        self.assertEqual(affected_by(changed_since(self.root, 'HEAD'), self.root, self.map),
+                         {'web': ['web/index.ts'], 'api': ['api/extra.py']})
+
+    def test_malformed_map(self):
+        with self.assertRaises(BuildMapError):
+            load_map(self.root)
+        self.write('build-map.json', '{"web": {"ignore": []}}')
+        with self.assertRaises(BuildMapError):
+            load_map(self.root)
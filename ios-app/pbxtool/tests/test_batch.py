@@ -0,0 +1,57 @@
+import os
+import tempfile
+import unittest
+
+from pbxtool import batch
+from pbxtool.manifest import load_manifest
+from pbxtool.project import PROJECT_FILE
+
+from . import copy_project, read
+
+MANIFEST = os.path.join(os.path.dirname(__file__), '..', '..', 'manifests', 'services.json')
+
+
+def _rewrite(project, old, new):
+    path = os.path.join(project, PROJECT_FILE)
+    with open(path, 'rb') as f:
+        text = f.read()
+    with open(path, 'wb') as f:
+        f.write(text.replace(old, new))
+
+
+class BatchTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.manifest = load_manifest(MANIFEST)
+        self.good, self.broken, self.headless = [copy_project(os.path.join(self.tmp.name, name))
+                                                 for name in ('good', 'broken', 'headless')]
+        _rewrite(self.broken, b'objects = {', b'objects = {{')
+        _rewrite(self.headless, b'path = Services;', b'path = Elsewhere;')
+        self.before = {path: read(path) for path in (self.broken, self.headless)}
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def check(self, jobs):
+        results = batch.run([self.broken, self.good, self.headless], self.manifest, jobs=jobs, deterministic=True)
+        self.assertEqual([result.project for result in results], [self.broken, self.good, self.headless])
+        self.assertEqual([result.status for result in results], [batch.FAILED, batch.CHANGED, batch.FAILED])
+        self.assertIn('PBXParseError', results[0].error)
+        self.assertIn('Inventry/Services', results[2].error)
+        self.assertTrue(results[1].changes)
+        for path, text in self.before.items():
+            self.assertEqual(read(path), text, path)
+
+        again = batch.run([self.good], self.manifest, jobs=jobs)
+        self.assertEqual([result.status for result in again], [batch.UNCHANGED])
+
+    def test_a_failing_project_leaves_the_others_alone(self):
+        self.check(jobs=1)
+
+    def test_failures_stay_isolated_in_the_pool(self):
+        self.check(jobs=2)
+
+    def test_expand_lists_each_project_once(self):
+        pattern = os.path.join(self.tmp.name, '*', '*.xcodeproj')
+        projects = batch.expand([pattern, os.path.join(self.good, PROJECT_FILE)])
+        self.assertEqual(projects, [os.path.normpath(p) for p in (self.broken, self.good, self.headless)])
@@ -0,0 +1,109 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from pbxtool import coredata
+from pbxtool.project import load
+
+from . import PROJECT, copy_project
+
+DATA = os.path.join(os.path.dirname(PROJECT), 'Inventry', 'Data')
+
+
+class RenderTest(unittest.TestCase):
+    def test_checked_in_files_match_the_model(self):
+        result = coredata.generate(PROJECT, model=os.path.join(DATA, 'InventoryModel.xcdatamodeld'), check=True)
+        self.assertEqual((result.entities, result.written, result.orphans), (4, [], []))
+
+    def test_types_and_relationships(self):
+        entities = [
+            {'name': 'Shelf', 'attributes': [
+                {'name': 'label', 'type': 'String'},
+                {'name': 'count', 'type': 'Integer 32'},
+                {'name': 'weight', 'type': 'Double', 'usesScalarValueType': False},
+                {'name': 'colour', 'type': 'Transformable', 'customClassName': 'UIColor'},
+            ], 'relationships': [
+                {'name': 'items', 'destination': 'Item', 'cardinality': 'To Many', 'ordered': True},
+                {'name': 'room', 'destination': 'Room'},
+            ]},
+            {'name': 'Item', 'representedClassName': 'ItemEntity'},
+            {'name': 'Room'},
+        ]
+        classes = {entity['name']: coredata.class_name(entity) for entity in entities}
+        files = coredata.render(entities[0], classes)
+        self.assertEqual(sorted(files), ['Shelf+CoreDataClass.swift', 'Shelf+CoreDataProperties.swift'])
+        properties = files['Shelf+CoreDataProperties.swift']
+        for line in ('@NSManaged public var label: String?', '@NSManaged public var count: Int32',
+                     '@NSManaged public var weight: NSNumber?', '@NSManaged public var colour: UIColor?',
+                     '@NSManaged public var items: NSOrderedSet?', '@NSManaged public var room: Room?',
+                     '@NSManaged public func insertIntoItems(_ value: ItemEntity, at idx: Int)',
+                     '@NSManaged public func addToItems(_ values: NSOrderedSet)'):
+            self.assertIn(line, properties)
+
+        with self.assertRaises(coredata.CodegenError):
+            coredata.render({'name': 'Bad', 'attributes': [{'name': 'x', 'type': 'Integer 128'}]}, classes)
+        with self.assertRaises(coredata.CodegenError):
+            coredata.render({'name': 'Bad', 'relationships': [{'name': 'x', 'destination': 'Nope'}]}, classes)
+
+    def test_hash_covers_destination_classes(self):
+        entity = {'name': 'Shelf', 'relationships': [{'name': 'room', 'destination': 'Room'}]}
+        before = coredata.entity_hash(entity, {'Shelf': 'Shelf', 'Room': 'Room', 'Other': 'Other'})
+        self.assertEqual(coredata.entity_hash(entity, {'Shelf': 'Shelf', 'Room': 'Room', 'Other': 'X'}), before)
+        self.assertNotEqual(coredata.entity_hash(entity, {'Shelf': 'Shelf', 'Room': 'RoomEntity'}), before)
+
+
+class GenerateTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.project = copy_project(self.tmp.name)
+        self.data = os.path.join(self.tmp.name, 'Inventry', 'Data')
+        os.makedirs(self.data)
+        self.model = os.path.join(self.data, 'InventoryModel.xcdatamodeld')
+        shutil.copytree(os.path.join(DATA, 'InventoryModel.xcdatamodeld'), self.model)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def generate(self, **options):
+        return coredata.generate(self.project, model=self.model, deterministic=True, **options)
+
+    def edit_model(self, edit):
+        path = os.path.join(self.model, 'Contents.json')
+        with open(path, encoding='utf-8') as f:
+            document = json.load(f)
+        edit(document['models'][0]['entities'])
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(document, f)
+
+    def test_generate_register_and_skip(self):
+        result = self.generate()
+        self.assertEqual(len(result.written), 8)
+        self.assertIn('Created group Inventry/Data', result.changes)
+        locations = set(load(self.project).locations().values())
+        self.assertIn('Inventry/Data/RoomEntity+CoreDataProperties.swift', locations)
+
+        again = self.generate()
+        self.assertEqual((again.skipped, again.written, again.changes), (4, [], []))
+
+    def test_one_entity_change_rewrites_one_file(self):
+        self.generate()
+        class_file = os.path.join(self.data, 'RoomEntity+CoreDataClass.swift')
+        with open(class_file, 'a') as f:
+            f.write('// custom code\n')
+        self.edit_model(lambda entities: next(e for e in entities if e['name'] == 'RoomEntity')['attributes'].append(
+            {'name': 'floor', 'type': 'Integer 16'}))
+        result = self.generate()
+        self.assertEqual(result.written, [os.path.join(self.data, 'RoomEntity+CoreDataProperties.swift')])
+        self.assertEqual(result.skipped, 3)
+        with open(class_file) as f:
+            self.assertTrue(f.read().endswith('// custom code\n'))
+
+    def test_removed_entity_leaves_orphans(self):
+        self.edit_model(lambda entities: entities.append({'name': 'ShelfEntity'}))
+        self.generate()
+        self.edit_model(lambda entities: entities.pop())
+        result = self.generate()
+        self.assertEqual(result.orphans, [os.path.join(self.data, 'ShelfEntity+CoreDataClass.swift'),
+                                          os.path.join(self.data, 'ShelfEntity+CoreDataProperties.swift')])
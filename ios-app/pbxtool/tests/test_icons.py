@@ -0,0 +1,82 @@
+import json
+import os
+import struct
+import tempfile
+import unittest
+import zlib
+from unittest import mock
+
+from pbxtool import icons
+from pbxtool.project import load
+
+from . import copy_project
+
+
+def _png(path, width, height):
+    """A valid grey PNG, written without Pillow"""
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+    rows = b''.join(b'\0' + b'\x80' * width for _ in range(height))
+    with open(path, 'wb') as f:
+        f.write(b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 0, 0, 0, 0))
+                + chunk(b'IDAT', zlib.compress(rows)) + chunk(b'IEND', b''))
+
+
+class SpecTest(unittest.TestCase):
+    def test_every_slot_has_its_own_file(self):
+        names = [icons.filename(*entry) for entry in icons.ICONS]
+        self.assertEqual(len(set(names)), len(names))
+        self.assertIn('Icon-20pt@2x~ipad.png', names)
+        self.assertIn('Icon-83_5pt@2x.png', names)
+        self.assertEqual(icons.pixels(83.5, 2), 167)
+
+    def test_contents_lists_the_spec(self):
+        images = json.loads(icons.contents())['images']
+        self.assertEqual([(image['idiom'], image['filename']) for image in images],
+                         [(idiom, icons.filename(idiom, points, scale)) for idiom, points, scale in icons.ICONS])
+        self.assertEqual(images[-1]['size'], '1024x1024')
+
+
+class GenerateTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.project = copy_project(self.tmp.name)
+        self.master = os.path.join(self.tmp.name, 'Acme', 'icon-1024.png')
+        os.makedirs(os.path.dirname(self.master))
+        _png(self.master, 1024, 1024)
+        self.catalog = os.path.join(self.tmp.name, 'Inventry', 'Brands', '{name}.xcassets')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_masters_must_be_square_and_large_enough(self):
+        self.assertEqual(icons.png_size(self.master), (1024, 1024))
+        for size in ((1024, 1000), (512, 512)):
+            _png(self.master, *size)
+            with self.assertRaises(icons.IconError):
+                icons.generate(self.project, [self.master], catalog=self.catalog)
+        with open(self.master, 'wb') as f:
+            f.write(b'GIF89a')
+        with self.assertRaises(icons.IconError):
+            icons.png_size(self.master)
+
+    def test_no_resizer_is_reported_before_anything_is_written(self):
+        with mock.patch.object(icons, 'backend', return_value=None):
+            with self.assertRaises(icons.IconError):
+                icons.generate(self.project, [self.master], catalog=self.catalog)
+        self.assertFalse(os.path.exists(os.path.join(self.tmp.name, 'Inventry', 'Brands')))
+
+    @unittest.skipIf(icons.backend() is None, "needs Pillow or sips")
+    def test_render_register_and_skip(self):
+        result = icons.generate(self.project, [self.master], catalog=self.catalog, deterministic=True)
+        set_dir = os.path.join(self.tmp.name, 'Inventry', 'Brands', 'Acme.xcassets', 'AppIcon.appiconset')
+        self.assertEqual(len(result.rendered), len(icons.ICONS))
+        for idiom, points, scale in icons.ICONS:
+            path = os.path.join(set_dir, icons.filename(idiom, points, scale))
+            self.assertEqual(icons.png_size(path), (icons.pixels(points, scale),) * 2)
+        self.assertEqual(result.changes, ['Created group Inventry/Brands', 'Added Inventry/Brands/Acme.xcassets',
+                                          'Added Inventry/Brands/Acme.xcassets to Resources'])
+        self.assertIn('Inventry/Brands/Acme.xcassets', load(self.project).locations().values())
+
+        again = icons.generate(self.project, [self.master], catalog=self.catalog)
+        self.assertEqual((again.rendered, again.skipped, again.changes), ([], len(icons.ICONS), []))
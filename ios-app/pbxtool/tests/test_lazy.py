@@ -0,0 +1,86 @@
+import tempfile
+import unittest
+
+from pbxtool.project import _LazyObjects, load
+from pbxtool.records import IdList, PBXBuildFile, PBXFileReference, PBXGroup, intern_id
+from pbxtool.transaction import ProjectTransaction
+from pbxtool.writer import save
+
+from . import PROJECT, copy_project, read
+
+
+class LazyLoadTest(unittest.TestCase):
+    def test_objects_are_parsed_on_first_use(self):
+        project = load(PROJECT, lazy=True)
+        eager = load(PROJECT)
+        self.assertIsInstance(project.objects, _LazyObjects)
+        services = project.group('Inventry/Services')
+        self.assertTrue(project.objects.pending('PBXGroup'))
+        self.assertIn(services, dict.keys(project.objects))
+        self.assertLess(dict.__len__(project.objects), len(eager.objects) // 2)
+        self.assertEqual(len(project.objects), len(eager.objects))
+
+        self.assertEqual(list(project.objects_of('PBXGroup')), list(eager.objects_of('PBXGroup')))
+        self.assertFalse(project.objects.pending('PBXGroup'))
+        self.assertEqual(sorted(project.objects), sorted(eager.objects))
+
+    def test_removed_objects_stay_removed(self):
+        project = load(PROJECT, lazy=True)
+        group = project.group('Inventry/Services')
+        ref_id = project.objects[group]['children'][0]
+        count = len(project.objects)
+        removed, _ = project.remove_file_reference(ref_id)
+        self.assertNotIn(ref_id, project.objects)
+        self.assertEqual(len(project.objects), count - len(removed))
+        self.assertNotIn(ref_id, project.objects_of('PBXFileReference'))
+        for oid, _ in removed:
+            self.assertNotIn(oid, list(project.objects))
+        self.assertEqual(project.unresolved(), load(PROJECT).unresolved())
+
+    def test_references_are_found_without_parsing_sections(self):
+        project = load(PROJECT, lazy=True)
+        eager = load(PROJECT)
+        ref_id = project.objects[project.group('Inventry/Services')]['children'][0]
+        self.assertEqual(project.referrers(ref_id), eager.referrers(ref_id))
+        self.assertTrue(project.objects.pending('PBXBuildFile'))
+        sources = eager.build_phase(eager.target())
+        self.assertEqual(project.build_files_for(ref_id, sources), eager.build_files_for(ref_id, sources))
+
+    def test_lazy_sections_are_compacted_like_a_full_parse(self):
+        project = load(PROJECT, lazy=True)
+        eager = load(PROJECT)
+        for isa, cls in (('PBXGroup', PBXGroup), ('PBXFileReference', PBXFileReference),
+                         ('PBXBuildFile', PBXBuildFile)):
+            for oid, obj in project.objects_of(isa).items():
+                self.assertIs(type(obj), cls)
+                self.assertIs(oid, intern_id(oid))
+                self.assertEqual(dict(obj), dict(eager.objects[oid]))
+        group = project.objects[project.group('Inventry/Services')]
+        self.assertIs(type(group['children']), IdList)
+        target = project.objects[project.target()]
+        self.assertIs(type(target['buildPhases']), list)
+
+    def test_lazy_edit_matches_full_parse_edit(self):
+        outputs = []
+        for lazy in (True, False):
+            with tempfile.TemporaryDirectory() as tmp:
+                path = copy_project(tmp)
+                project = load(path, lazy=lazy)
+                project.ids.deterministic = True
+                group = project.group('Inventry/Services')
+                project.add_file_reference(group, 'ProbeService.swift', 'sourcecode.swift', key=('probe',))
+                save(project)
+                outputs.append(read(path))
+        self.assertEqual(outputs[0], outputs[1])
+
+    def test_transaction_loads_lazily(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = copy_project(tmp)
+            with ProjectTransaction(path, snapshot=False) as tx:
+                tx.add_file('Inventry/Services/ProbeService.swift')
+            self.assertIsInstance(tx.project.objects, _LazyObjects)
+            self.assertIs(type(tx.project.objects[tx.project.group('Inventry/Services')]), PBXGroup)
+
+
+if __name__ == '__main__':
+    unittest.main()
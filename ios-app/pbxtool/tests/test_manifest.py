@@ -0,0 +1,73 @@
+import json
+import os
+import tempfile
+import unittest
+
+from pbxtool.manifest import ManifestError, apply, load_manifest, plan
+from pbxtool.project import load
+from pbxtool.transaction import MissingAnchorError
+
+from . import copy_project, read
+
+MANIFESTS = os.path.join(os.path.dirname(__file__), '..', '..', 'manifests')
+
+
+class ManifestTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.project = copy_project(self.tmp.name)
+        self.original = read(self.project)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def manifest(self, name, **data):
+        """Load manifests/<name>, or write data to a temporary manifest named name first"""
+        path = os.path.join(MANIFESTS, name)
+        if data:
+            path = os.path.join(self.tmp.name, name)
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+        return load_manifest(path)
+
+    def test_second_apply_is_a_no_op(self):
+        manifest = self.manifest('core-data.json')
+        changes = apply(self.project, manifest, deterministic=True, snapshot=False, create_groups=True)
+        self.assertIn('Created group Inventry/Data', changes)
+        applied = read(self.project)
+        stat = os.stat(os.path.join(self.project, 'project.pbxproj'))
+
+        self.assertEqual(apply(self.project, manifest, deterministic=True, snapshot=False), [])
+        self.assertEqual(plan(load(self.project), manifest), [])
+        self.assertEqual(read(self.project), applied)
+        self.assertEqual(os.stat(os.path.join(self.project, 'project.pbxproj')).st_mtime_ns, stat.st_mtime_ns)
+
+    def test_dry_run_plans_without_writing(self):
+        manifest = self.manifest('services.json')
+        planned = apply(self.project, manifest, dry_run=True)
+        self.assertIn('add Inventry/Services/SyncService.swift to Sources', planned)
+        self.assertEqual(read(self.project), self.original)
+
+    def test_absent_undoes_present(self):
+        apply(self.project, self.manifest('services.json'), deterministic=True, snapshot=False)
+        changes = apply(self.project, self.manifest('without-sync-services.json'), deterministic=True, snapshot=False)
+        self.assertEqual(len(changes), 2)
+        self.assertEqual(read(self.project), self.original)
+        self.assertEqual(apply(self.project, self.manifest('without-sync-services.json'), snapshot=False), [])
+
+    def test_missing_group_needs_create_groups(self):
+        manifest = self.manifest('new-group.json', groups={'Inventry/Widgets': ['WidgetService.swift']})
+        with self.assertRaises(MissingAnchorError):
+            apply(self.project, manifest, snapshot=False)
+        self.assertEqual(read(self.project), self.original)
+        apply(self.project, manifest, create_groups=True, deterministic=True, snapshot=False)
+        self.assertEqual(apply(self.project, manifest, snapshot=False), [])
+
+    def test_inconsistent_manifests_are_rejected(self):
+        with self.assertRaises(ManifestError):
+            self.manifest('both.json', groups={'Inventry/Services': ['SyncService.swift']},
+                          absent=['Inventry/Services/SyncService.swift'])
+        with self.assertRaises(ManifestError):
+            self.manifest('self.json', include=['self.json'])
+        with self.assertRaises(ManifestError):
+            self.manifest('phase.json', phases={'Compile': ['Inventry/ContentView.swift']})
@@ -0,0 +1,59 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from pbxtool.merge import merge
+from pbxtool.project import load
+from pbxtool.transaction import ProjectTransaction
+
+from . import PBXPROJ, copy_project
+
+
+class MergeTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def side(self, name, *paths):
+        """A copy of the project with paths added; returns its project.pbxproj"""
+        project = copy_project(os.path.join(self.tmp.name, name))
+        if paths:
+            with ProjectTransaction(project, snapshot=False, deterministic=True) as tx:
+                for path in paths:
+                    tx.add_file(path)
+        return os.path.join(project, 'project.pbxproj')
+
+    def test_adds_on_both_sides_are_kept(self):
+        base = os.path.join(self.tmp.name, 'base.pbxproj')
+        shutil.copyfile(PBXPROJ, base)
+        ours = self.side('ours', 'Inventry/Services/OursService.swift')
+        theirs = self.side('theirs', 'Inventry/Services/TheirsService.swift', 'Inventry/Reports/Report.swift')
+
+        self.assertEqual(merge(base, ours, theirs), [])
+        with open(ours, 'rb') as f:
+            self.assertNotIn(b'<<<<<<<', f.read())
+        project = load(ours)
+        services = project.group('Inventry/Services')
+        for name in ('OursService.swift', 'TheirsService.swift'):
+            self.assertIsNotNone(project.find_child(services, name), name)
+        self.assertIsNotNone(project.find_child(project.group('Inventry/Reports'), 'Report.swift'))
+        sources = project.build_phase(project.target(), 'PBXSourcesBuildPhase')
+        self.assertEqual(len(project.objects[sources]['files']),
+                         len(load(PBXPROJ).objects[sources]['files']) + 3)
+
+    def test_same_add_on_both_sides_is_not_duplicated(self):
+        base = os.path.join(self.tmp.name, 'base.pbxproj')
+        shutil.copyfile(PBXPROJ, base)
+        ours = self.side('ours', 'Inventry/Services/SharedService.swift')
+        theirs = self.side('theirs', 'Inventry/Services/SharedService.swift')
+
+        self.assertEqual(merge(base, ours, theirs), [])
+        with open(ours, 'rb') as f, open(theirs, 'rb') as g:
+            self.assertEqual(f.read(), g.read())
+
+
+if __name__ == '__main__':
+    unittest.main()
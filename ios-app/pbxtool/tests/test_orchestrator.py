@@ -0,0 +1,106 @@
+import os
+import subprocess
+import tempfile
+import unittest
+
+from pbxtool.affected import BuildMapError, load_map, repo_root
+from pbxtool.orchestrator import FAILED, FRESH, RAN, RESTORED, SKIPPED, build, load_steps
+
+
+def _overlaps(a, b):
+    return a == b or a.startswith(b + '/') or b.startswith(a + '/')
+
+
+class BuildMapTest(unittest.TestCase):
+    """The repository's own build-map.json"""
+
+    def setUp(self):
+        self.root = repo_root(os.path.dirname(__file__))
+        self.steps = load_steps(self.root, load_map(self.root))
+
+    def test_dashboards_build_after_one_workspace_install(self):
+        installs = [step.id for step in self.steps.values() if step.run == 'npm install']
+        self.assertEqual(installs, ['workspace:install'])
+        self.assertEqual(self.steps['workspace:install'].cwd, '.')
+        for name in ('client-dashboard:build', 'company-dashboard:build'):
+            self.assertIn('workspace:install', self.steps[name].after)
+
+    def test_steps_writing_the_same_files_are_ordered(self):
+        def before(oid):
+            seen, pending = set(), list(self.steps[oid].after)
+            while pending:
+                dep = pending.pop()
+                if dep not in seen:
+                    seen.add(dep)
+                    pending.extend(self.steps[dep].after)
+            return seen
+
+        for a in self.steps.values():
+            for b in self.steps.values():
+                if a.id < b.id and any(_overlaps(x, y) for x in a.outputs for y in b.outputs):
+                    self.assertTrue(a.id in before(b.id) or b.id in before(a.id), f"{a.id} and {b.id}")
+
+
+class BuildTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        subprocess.run(['git', 'init', '-q', self.root], check=True)
+        with open(os.path.join(self.root, '.gitignore'), 'w') as f:
+            f.write('out/\n.build-cache/\n.pbxtool-cache/\n')
+        self.write('app/input.txt', 'one\n')
+        self.map = {
+            'app': {
+                'inputs': ['app/*'],
+                'steps': {
+                    'gen': {'run': 'mkdir -p out && cp app/input.txt out/copy.txt', 'cwd': '.',
+                            'outputs': ['out']},
+                    'check': {'run': 'test -s out/copy.txt', 'cwd': '.', 'after': ['gen']},
+                },
+            },
+        }
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path, text):
+        full = os.path.join(self.root, path)
+        os.makedirs(os.path.dirname(full), exist_ok=True)
+        with open(full, 'w') as f:
+            f.write(text)
+
+    def statuses(self, **kwargs):
+        return {step.id: step.status for step in build(self.root, self.map, log=lambda line: None, **kwargs)}
+
+    def test_fresh_restored_and_rerun(self):
+        self.assertEqual(self.statuses(), {'app:gen': RAN, 'app:check': RAN})
+        self.assertEqual(self.statuses(), {'app:gen': FRESH, 'app:check': FRESH})
+
+        os.unlink(os.path.join(self.root, 'out', 'copy.txt'))
+        self.assertEqual(self.statuses()['app:gen'], RESTORED)
+        with open(os.path.join(self.root, 'out', 'copy.txt')) as f:
+            self.assertEqual(f.read(), 'one\n')
+
+        self.write('app/input.txt', 'two\n')
+        self.assertEqual(self.statuses(), {'app:gen': RAN, 'app:check': RAN})
+        self.assertEqual(self.statuses(force=True)['app:gen'], RAN)
+
+    def test_failure_skips_the_steps_after_it(self):
+        self.map['app']['steps']['gen']['run'] = 'exit 3'
+        statuses = self.statuses()
+        self.assertEqual(statuses, {'app:gen': FAILED, 'app:check': SKIPPED})
+
+    def test_only_and_unknown_steps(self):
+        self.assertEqual(list(load_steps(self.root, self.map, only=['app:check'])), ['app:gen', 'app:check'])
+        self.map['app']['steps']['check']['after'] = ['missing']
+        with self.assertRaises(BuildMapError):
+            load_steps(self.root, self.map)
+
+    def test_cycle_is_refused(self):
+        self.map['app']['steps']['gen']['after'] = ['check']
+        with self.assertRaises(BuildMapError):
+            load_steps(self.root, self.map)
+
+
+if __name__ == '__main__':
+    unittest.main()
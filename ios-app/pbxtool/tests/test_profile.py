@@ -0,0 +1,77 @@
+import csv
+import io
+import os
+import tempfile
+import unittest
+
+from pbxtool import batch, profile
+from pbxtool.manifest import load_manifest
+from pbxtool.project import load
+from pbxtool.transaction import ProjectTransaction
+
+from . import PROJECT, copy_project
+
+MANIFEST = os.path.join(os.path.dirname(__file__), '..', '..', 'manifests', 'services.json')
+
+
+class ProfileTest(unittest.TestCase):
+    def test_no_hook_means_no_events(self):
+        self.assertFalse(profile.enabled())
+        with profile.phase('idle') as p:
+            p.add(objects=1)
+        with profile.profiling() as recorder:
+            pass
+        self.assertEqual(recorder.events, [])
+
+    def test_phases_nest_and_sum_their_counters(self):
+        with profile.profiling() as recorder:
+            with profile.phase('outer', bytes=10) as outer:
+                with profile.phase('inner') as inner:
+                    inner.add(objects=2)
+                    inner.add(objects=3)
+                outer.add(bytes=5)
+        self.assertFalse(profile.enabled())
+        events = {e.name: e for e in recorder.events}
+        self.assertEqual((events['outer'].depth, events['inner'].depth), (0, 1))
+        self.assertEqual(events['outer'].args['bytes'], 15)
+        self.assertEqual(events['inner'].args['objects'], 5)
+        self.assertGreaterEqual(events['outer'].duration, events['inner'].duration)
+
+        trace = recorder.trace()['traceEvents']
+        self.assertEqual([e['name'] for e in trace], ['outer', 'inner'])
+        self.assertEqual(trace[0]['ts'], 0)
+        out = io.StringIO()
+        recorder.write_csv(out)
+        rows = list(csv.DictReader(io.StringIO(out.getvalue())))
+        self.assertEqual([(row['phase'], row['objects']) for row in rows], [('outer', ''), ('inner', '5')])
+
+    def test_lazy_parses_count_the_objects_they_parse(self):
+        with profile.profiling() as recorder:
+            project = load(PROJECT, lazy=True)
+            project.objects_of('PBXGroup')
+        parses = [e for e in recorder.events if e.name == 'parse']
+        self.assertTrue(parses)
+        self.assertEqual(sum(e.args['objects'] for e in parses), len(load(PROJECT).objects_of('PBXGroup')))
+
+    def test_edit_phases(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = copy_project(tmp)
+            with profile.profiling() as recorder:
+                with ProjectTransaction(path, snapshot=False, deterministic=True) as tx:
+                    tx.add_file('Inventry/Services/ProbeService.swift')
+        names = {e.name for e in recorder.events}
+        self.assertTrue({'parse', 'splice', 'write'} <= names, names)
+
+    def test_batch_workers_report_their_phases(self):
+        manifest = load_manifest(MANIFEST)
+        with tempfile.TemporaryDirectory() as tmp:
+            projects = [copy_project(os.path.join(tmp, name)) for name in ('a', 'b')]
+            with profile.profiling() as recorder:
+                with profile.phase('command'):
+                    results = batch.run(projects, manifest, jobs=2, dry_run=True)
+        self.assertEqual([result.status for result in results], [batch.PLANNED] * 2)
+        plans = [e for e in recorder.events if e.name == 'manifest.plan']
+        self.assertEqual(len(plans), 2)
+        self.assertNotIn(os.getpid(), {e.pid for e in plans})
+        batch_depth = next(e.depth for e in recorder.events if e.name == 'batch')
+        self.assertTrue(all(e.depth > batch_depth for e in plans))
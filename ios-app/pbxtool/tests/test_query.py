@@ -0,0 +1,100 @@
+import os
+import tempfile
+import unittest
+
+from pbxtool.cache import cache_path, parse_cached
+from pbxtool.parser import parse_layout
+from pbxtool.project import PROJECT_FILE, load
+from pbxtool.query import QueryError, Session
+from pbxtool.transaction import ProjectTransaction
+
+from . import PROJECT, copy_project
+
+
+class QueryTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.session = Session(load(PROJECT))
+
+    def test_file_lookups(self):
+        run = self.session.run
+        self.assertEqual(run('owner ContentView.swift'), ['Inventry'])
+        self.assertTrue(run('in-phase ContentView.swift'))
+        self.assertTrue(run('in-phase Inventry/ContentView.swift Sources'))
+        self.assertFalse(run('in-phase Inventry/ContentView.swift Resources'))
+        self.assertFalse(run('in-phase NoSuchFile.swift'))
+        self.assertEqual(sorted(hit['path'] for hit in run('find *Service.swift')),
+                         [f'Inventry/Services/{name}Service.swift' for name in
+                          ('Authentication', 'DeletedItems', 'Firebase', 'Inventory', 'PDFGeneration', 'Property')])
+
+    def test_phases_targets_and_objects(self):
+        run = self.session.run
+        self.assertEqual([entry['name'] for entry in run('phase Resources')],
+                         ['Assets.xcassets', 'GoogleService-Info.plist'])
+        [target] = run('targets')
+        self.assertEqual(target['name'], 'Inventry')
+        self.assertEqual(target['phases'][:3], ['Sources', 'Frameworks', 'Resources'])
+        self.assertEqual(run(f"object {target['id']}")['isa'], 'PBXNativeTarget')
+        self.assertIsNone(run('object 000000000000000000000000'))
+        ref = run('find ContentView.swift')[0]['id']
+        self.assertIn('PBXBuildFile', {hit['isa'] for hit in run(f'referrers {ref}')})
+
+    def test_bad_queries(self):
+        for text in ('', 'frobnicate', 'owner', 'owner a b', 'phase Nope'):
+            with self.assertRaises(QueryError, msg=text):
+                self.session.run(text)
+
+
+class ParseCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.project = copy_project(self.tmp.name)
+        self.pbxproj = os.path.join(self.project, PROJECT_FILE)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def parse(self):
+        buffer, root, layout, hit = parse_cached(self.pbxproj)
+        buffer.close()
+        return root, layout, hit
+
+    def test_hit_after_miss(self):
+        root, layout, hit = self.parse()
+        self.assertFalse(hit)
+        self.assertTrue(os.path.exists(cache_path(self.pbxproj, 'parse-', '.bin')))
+        cached_root, cached_layout, hit = self.parse()
+        self.assertTrue(hit)
+        self.assertEqual(cached_root, root)
+        self.assertEqual(cached_layout.spans, layout.spans)
+        self.assertEqual(cached_layout.sections, layout.sections)
+
+    def test_rewritten_with_the_same_bytes_is_still_a_hit(self):
+        self.parse()
+        with open(self.pbxproj, 'rb') as f:
+            data = f.read()
+        os.remove(self.pbxproj)
+        with open(self.pbxproj, 'wb') as f:  # new inode and mtime, same content
+            f.write(data)
+        self.assertTrue(self.parse()[2])
+        self.assertTrue(self.parse()[2])
+
+    def test_edited_project_is_a_miss(self):
+        self.parse()
+        with ProjectTransaction(self.project, snapshot=False, deterministic=True) as tx:
+            tx.add_file('Inventry/Services/ProbeService.swift')
+        root, layout, hit = self.parse()
+        self.assertFalse(hit)
+        with open(self.pbxproj, 'rb') as f:
+            fresh_root, fresh_layout = parse_layout(f.read())
+        self.assertEqual(root, fresh_root)
+        self.assertEqual(layout.spans, fresh_layout.spans)
+
+    def test_corrupt_entry_is_a_miss(self):
+        self.parse()
+        with open(cache_path(self.pbxproj, 'parse-', '.bin'), 'r+b') as f:
+            f.seek(100)
+            f.write(b'\xff' * 64)
+        self.assertFalse(self.parse()[2])
+        self.assertTrue(self.parse()[2])
+        self.assertEqual(load(self.project, cache=True).objects.keys(), load(self.project).objects.keys())
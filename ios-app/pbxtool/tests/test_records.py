@@ -0,0 +1,74 @@
+import marshal
+import unittest
+
+from pbxtool.project import load
+from pbxtool.records import (IdList, PBXBuildFile, PBXFileReference, PBXGroup, compact, intern_id, pack_objects,
+                             unpack_objects)
+
+from . import PROJECT
+
+
+class RecordTest(unittest.TestCase):
+    def test_setdefault_returns_the_stored_list(self):
+        group = PBXGroup.from_dict({'isa': 'PBXGroup', 'name': 'x'})
+        group.setdefault('children', []).append('A')
+        self.assertEqual(list(group['children']), ['A'])
+        self.assertIs(type(group['children']), IdList)
+        self.assertEqual(list(group.setdefault('children', [])), ['A'])
+
+        group.setdefault('comments', []).append('B')
+        self.assertEqual(group['comments'], ['B'])
+
+    def test_append_to_a_missing_key(self):
+        project = load(PROJECT)
+        group_id = project.group('Inventry/Services')
+        ref_id = project.objects[group_id]['children'][0]
+        variant = project.add_object(project.new_id('test'), compact({'isa': 'PBXGroup', 'name': 'Empty'}))
+        project.append(variant, 'children', ref_id)
+        self.assertEqual(list(project.objects[variant]['children']), [ref_id])
+
+    def test_records_read_like_dicts(self):
+        obj = {'isa': 'PBXFileReference', 'lastKnownFileType': 'sourcecode.swift', 'path': 'A.swift',
+               'sourceTree': '<group>', 'usesTabs': '1'}
+        record = compact(dict(obj))
+        self.assertIs(type(record), PBXFileReference)
+        self.assertEqual(dict(record), obj)
+        self.assertEqual(record.get('name', 'none'), 'none')
+        self.assertNotIn('name', record)
+        del record['usesTabs']
+        self.assertEqual(len(record), 4)
+        with self.assertRaises(ValueError):
+            record['isa'] = 'PBXGroup'
+        with self.assertRaises(KeyError):
+            del record['name']
+
+    def test_ids_are_interned(self):
+        a = ''.join(['ABCDEF', '0123456789ABCDEF01'])
+        b = ''.join(['ABCDEF0123', '456789ABCDEF01'])
+        self.assertIsNot(a, b)
+        self.assertIs(intern_id(a), intern_id(b))
+        build = PBXBuildFile.from_dict({'isa': 'PBXBuildFile', 'fileRef': b})
+        self.assertIs(build['fileRef'], intern_id(a))
+
+    def test_id_list(self):
+        ids = IdList(['A', 'B', 'C'])
+        ids.remove('B')
+        ids.insert(0, 'Z')
+        self.assertEqual(ids, ['Z', 'A', 'C'])
+        self.assertIn('C', ids)
+        self.assertNotIn('B', ids)
+        with self.assertRaises(ValueError):
+            ids.index('never-seen-id')
+
+    def test_pack_round_trip(self):
+        objects = load(PROJECT).objects
+        ids, packed = marshal.loads(marshal.dumps(pack_objects(objects)))
+        unpacked = unpack_objects(ids, packed)
+        self.assertEqual(list(unpacked), list(objects))
+        for oid, obj in objects.items():
+            self.assertIs(type(unpacked[oid]), type(obj))
+            self.assertEqual(dict(unpacked[oid]), dict(obj))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+import os
+import tempfile
+import unittest
+
+from pbxtool.project import load
+from pbxtool.serializer import dumps
+from pbxtool.writer import is_canonical, save
+
+from . import PBXPROJ, PROJECT, copy_project, read
+
+
+class RoundTripTest(unittest.TestCase):
+    def setUp(self):
+        with open(PBXPROJ, 'rb') as f:
+            self.original = f.read()
+
+    def test_serializer_reproduces_the_file(self):
+        project = load(PROJECT)
+        self.assertTrue(is_canonical(project))
+        self.assertEqual(dumps(project).encode('utf-8'), self.original)
+
+    def test_full_write_is_byte_identical(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'project.pbxproj')
+            save(load(PROJECT), path, full=True)
+            with open(path, 'rb') as f:
+                self.assertEqual(f.read(), self.original)
+
+    def test_lazy_load_saves_unchanged(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            project_path = copy_project(tmp)
+            project = load(project_path, lazy=True)
+            self.assertIsNotNone(project.group('Inventry/Services'))
+            save(project)
+            self.assertEqual(read(project_path), self.original)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from pbxtool import transaction
+from pbxtool.project import load
+from pbxtool.server import APPLICATION_ERROR, INVALID_PARAMS, METHOD_NOT_FOUND, ProjectServer
+
+from . import copy_project, read
+
+
+class ServerTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.project = copy_project(self.tmp.name)
+        self.original = read(self.project)
+        self.server = ProjectServer(os.path.join(self.tmp.name, 'pbxtool.sock'), debounce=3600)
+
+    def tearDown(self):
+        if self.server._timer is not None:
+            self.server._timer.cancel()
+        self.server.server_close()
+        self.tmp.cleanup()
+
+    def call(self, method, **params):
+        response = self.server.handle_message(json.dumps({'jsonrpc': '2.0', 'id': 1, 'method': method,
+                                                          'params': params}))
+        if 'error' in response:
+            return response['error']
+        return response['result']
+
+    def names(self, group='Inventry/Services'):
+        project = load(self.project)
+        return [project.display_name(child) for child in project.objects[project.group(group)]['children']]
+
+    def test_edits_are_written_on_flush(self):
+        result = self.call('add_file', project=self.project, path='Inventry/Services/ProbeService.swift')
+        self.assertEqual(result['pending'], 2)
+        self.assertEqual(read(self.project), self.original)
+        written = self.call('flush')
+        self.assertEqual(len(written[os.path.abspath(os.path.join(self.project, 'project.pbxproj'))]), 2)
+        self.assertIn('ProbeService.swift', self.names())
+
+    def test_errors_are_answered(self):
+        self.assertEqual(self.call('nope')['code'], METHOD_NOT_FOUND)
+        self.assertEqual(self.call('add_file', project=self.project)['code'], INVALID_PARAMS)
+        error = self.call('add_to_phase', project=self.project, path='Inventry/Services/Missing.swift')
+        self.assertEqual(error['code'], APPLICATION_ERROR)
+
+    def test_failed_edit_is_rolled_back(self):
+        self.call('add_file', project=self.project, path='Inventry/Services/Keep.swift')
+        error = self.call('add_file', project=self.project, path='Inventry/Services/Half.swift', phase='NoSuchPhase')
+        self.assertEqual(error['code'], APPLICATION_ERROR)
+        self.call('flush')
+        names = self.names()
+        self.assertIn('Keep.swift', names)
+        self.assertNotIn('Half.swift', names)
+
+    def test_failed_write_keeps_edits_for_the_next_flush(self):
+        self.call('add_file', project=self.project, path='Inventry/Services/ProbeService.swift')
+        with mock.patch.object(transaction, 'save', side_effect=OSError(28, 'No space left on device')):
+            error = self.call('flush')
+        self.assertEqual(error['code'], APPLICATION_ERROR)
+        self.assertEqual(read(self.project), self.original)
+        self.assertEqual(len(self.call('status')[os.path.abspath(os.path.join(self.project, 'project.pbxproj'))]
+                             ['pending']), 2)
+        self.call('flush')
+        self.assertIn('ProbeService.swift', self.names())
+
+    def test_external_change_is_reloaded_and_edits_replayed(self):
+        self.call('add_file', project=self.project, path='Inventry/Services/Ours.swift')
+        with transaction.ProjectTransaction(self.project, snapshot=False) as tx:
+            tx.add_file('Inventry/Services/Theirs.swift')
+        self.call('flush')
+        names = self.names()
+        self.assertIn('Ours.swift', names)
+        self.assertIn('Theirs.swift', names)
+
+
+if __name__ == '__main__':
+    unittest.main()
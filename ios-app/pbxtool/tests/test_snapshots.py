@@ -0,0 +1,83 @@
+import hashlib
+import os
+import tempfile
+import unittest
+
+from pbxtool.snapshots import SnapshotError, SnapshotStore
+from pbxtool.transaction import ProjectTransaction
+
+from . import copy_project, read
+
+
+class SnapshotTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.project = copy_project(self.tmp.name)
+        self.original = read(self.project)
+        self.store = SnapshotStore(self.project)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_save_and_restore(self):
+        entry = self.store.save(label='before')
+        self.assertIsNone(self.store.save())  # unchanged since the last one
+        with ProjectTransaction(self.project, snapshot=False) as tx:
+            tx.add_file('Inventry/Services/ProbeService.swift')
+        edited = read(self.project)
+        self.assertNotEqual(edited, self.original)
+
+        restored = self.store.restore(entry['hash'][:8])
+        self.assertEqual(restored['hash'], entry['hash'])
+        self.assertEqual(read(self.project), self.original)
+        # Restoring snapshots the edited file first, as a delta against the keyframe
+        latest = self.store.resolve('latest')
+        self.assertEqual(latest['label'], f"before restore {entry['hash'][:10]}")
+        self.assertEqual(latest['depth'], 1)
+        self.assertEqual(self.store.text(latest['hash']).encode('utf-8'), edited)
+
+    def test_transaction_snapshots_before_writing(self):
+        with ProjectTransaction(self.project, label='add probe') as tx:
+            tx.add_file('Inventry/Services/ProbeService.swift')
+        entry = self.store.resolve('latest')
+        self.assertEqual(entry['label'], 'add probe')
+        self.assertEqual(SnapshotStore(self.project).text(entry['hash']).encode('utf-8'), self.original)
+
+    def test_unknown_snapshot(self):
+        with self.assertRaises(SnapshotError):
+            self.store.resolve('deadbeef')
+        with self.assertRaises(SnapshotError):
+            self.store.resolve('@0')
+
+    def test_positions_and_digit_only_prefixes(self):
+        # Content whose hash starts with four digits, which used to be read as a position
+        data = next(data for data in (b'%d\n' % i for i in range(1000))
+                    if hashlib.sha256(data).hexdigest()[:4].isdigit())
+        first = self.store.save(label='first')
+        second = self.store.save(data, label='digits')
+        self.assertEqual(self.store.resolve(second['hash'][:4]), second)
+        self.assertEqual(self.store.resolve('@0'), first)
+        self.assertEqual(self.store.resolve('@-1'), second)
+        self.assertEqual(self.store.resolve('-2'), first)
+        self.assertEqual(self.store.resolve('latest'), second)
+        for ref in ('@2', '@x'):
+            with self.assertRaises(SnapshotError):
+                self.store.resolve(ref)
+
+    def test_save_re_adds_a_lost_index_entry(self):
+        keyframe = self.store.save(label='keyframe')
+        delta = self.store.save(self.original + b'// edited\n', label='delta')
+        self.assertEqual((delta['depth'], delta['base']), (1, keyframe['hash']))
+        os.remove(self.store.index_path)
+
+        entry = self.store.save(self.original + b'// edited\n', label='again')
+        self.assertEqual((entry['hash'], entry['depth'], entry['base']), (delta['hash'], 1, keyframe['hash']))
+        entry = self.store.save(label='keyframe again')
+        self.assertEqual((entry['hash'], entry['depth'], entry['base']), (keyframe['hash'], 0, keyframe['hash']))
+        self.assertEqual([e['label'] for e in self.store.entries()], ['again', 'keyframe again'])
+        self.assertEqual(self.store.text(self.store.resolve('@0')['hash']).encode('utf-8'),
+                         self.original + b'// edited\n')
+
+
+if __name__ == '__main__':
+    unittest.main()
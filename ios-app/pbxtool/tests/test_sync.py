@@ -0,0 +1,72 @@
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+from pbxtool.cli import main
+from pbxtool.project import PROJECT_FILE, load
+from pbxtool.sync import sync
+
+from . import PROJECT, copy_project, read
+
+
+class SyncTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.project = copy_project(self.tmp.name)
+        self.folder = os.path.join(self.tmp.name, 'Inventry')
+        shutil.copytree(os.path.join(PROJECT, '..', 'Inventry'), self.folder)
+        sync(self.project, deterministic=True)  # the checked-in project lags the folder
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def touch(self, path):
+        with open(os.path.join(self.folder, path), 'w') as f:
+            f.write('import Foundation\n')
+
+    def test_unchanged_folder_is_not_listed_or_written(self):
+        before = read(self.project)
+        changes, tree = sync(self.project, deterministic=True)
+        self.assertEqual(changes, [])
+        self.assertEqual(tree.listed, 0)
+        self.assertEqual(read(self.project), before)
+
+    def test_added_then_deleted_file(self):
+        self.touch('Services/ProbeService.swift')
+        changes, tree = sync(self.project, deterministic=True)
+        self.assertEqual(changes, ['Added Inventry/Services/ProbeService.swift',
+                                   'Added Inventry/Services/ProbeService.swift to Sources'])
+        self.assertEqual(tree.listed, 1)
+        project = load(self.project)
+        self.assertIsNotNone(project.find_child(project.group('Inventry/Services'), 'ProbeService.swift'))
+
+        os.unlink(os.path.join(self.folder, 'Services', 'ProbeService.swift'))
+        changes, _ = sync(self.project, deterministic=True, remove=False)
+        self.assertEqual(changes, [])
+        changes, _ = sync(self.project, deterministic=True)
+        self.assertEqual(len(changes), 1)
+        self.assertTrue(changes[0].startswith('Removed Inventry/Services/ProbeService.swift'))
+
+    def test_dry_run_and_exclude(self):
+        self.touch('Services/ProbeService.swift')
+        self.touch('Services/Probe_Old.swift')
+        before = read(self.project)
+        changes, _ = sync(self.project, deterministic=True, dry_run=True, exclude=['*_Old.swift'])
+        self.assertEqual(changes, ['Added Inventry/Services/ProbeService.swift',
+                                   'Added Inventry/Services/ProbeService.swift to Sources'])
+        self.assertEqual(read(self.project), before)
+
+    def test_cli_reports_unreadable_projects_on_one_line(self):
+        with open(os.path.join(self.project, PROJECT_FILE), 'ab') as f:
+            f.write(b'{')
+        for args in (['--project', self.project, 'sync', '--no-cache'],
+                     ['--project', os.path.join(self.tmp.name, 'Missing.xcodeproj'), 'sync'],
+                     ['--project', self.project, 'sync', '--dir', 'Nowhere']):
+            err = io.StringIO()
+            with contextlib.redirect_stderr(err), contextlib.redirect_stdout(io.StringIO()):
+                self.assertEqual(main(args), 1, args)
+            self.assertEqual(len(err.getvalue().splitlines()), 1, err.getvalue())
+            self.assertTrue(err.getvalue().startswith('❌ '))
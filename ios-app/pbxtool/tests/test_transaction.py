@@ -0,0 +1,61 @@
+import tempfile
+import unittest
+
+from pbxtool.project import load
+from pbxtool.transaction import MissingAnchorError, ProjectTransaction
+
+from . import copy_project, read
+
+
+class TransactionTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.project = copy_project(self.tmp.name)
+        self.original = read(self.project)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_add_then_remove_restores_the_file(self):
+        with ProjectTransaction(self.project, snapshot=False, deterministic=True) as tx:
+            tx.add_file('Inventry/Services/ProbeService.swift')
+        self.assertEqual(tx.changes, ['Added Inventry/Services/ProbeService.swift',
+                                      'Added Inventry/Services/ProbeService.swift to Sources'])
+
+        project = load(self.project)
+        ref_id = project.find_child(project.group('Inventry/Services'), 'ProbeService.swift')
+        self.assertIsNotNone(ref_id)
+        self.assertEqual(len(project.build_files_for(ref_id, project.build_phase(project.target(),
+                                                                                 'PBXSourcesBuildPhase'))), 1)
+
+        with ProjectTransaction(self.project, snapshot=False) as tx:
+            tx.remove_file('Inventry/Services/ProbeService.swift')
+        self.assertEqual(len(tx.changes), 1)
+        self.assertEqual(read(self.project), self.original)
+
+    def test_deterministic_edits_are_repeatable(self):
+        outputs = []
+        for _ in range(2):
+            with tempfile.TemporaryDirectory() as tmp:
+                project = copy_project(tmp)
+                with ProjectTransaction(project, snapshot=False, deterministic=True) as tx:
+                    tx.add_file('Inventry/Services/ProbeService.swift')
+                outputs.append(read(project))
+        self.assertEqual(outputs[0], outputs[1])
+
+    def test_no_edits_no_write(self):
+        with ProjectTransaction(self.project, snapshot=False) as tx:
+            tx.remove_file('Inventry/Services/Missing.swift')
+        self.assertEqual(tx.changes, [])
+        self.assertEqual(read(self.project), self.original)
+
+    def test_missing_group_is_not_created_on_request(self):
+        tx = ProjectTransaction(self.project, snapshot=False, create_groups=False)
+        tx.add_file('Inventry/Nowhere/ProbeService.swift')
+        with self.assertRaises(MissingAnchorError):
+            tx.commit()
+        self.assertEqual(read(self.project), self.original)
+
+
+if __name__ == '__main__':
+    unittest.main()
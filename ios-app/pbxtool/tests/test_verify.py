@@ -0,0 +1,50 @@
+import tempfile
+import unittest
+
+from pbxtool.project import load
+from pbxtool.verify import ERROR, WARNING, summarize, verify
+
+from . import PROJECT, copy_project
+
+
+def _checks(issues):
+    return sorted((issue['check'], issue['severity'], issue['id']) for issue in issues)
+
+
+class VerifyTest(unittest.TestCase):
+    def setUp(self):
+        self.project = load(PROJECT)
+        self.sources = self.project.build_phase(self.project.target(), 'PBXSourcesBuildPhase')
+        self.build_id = self.project.objects[self.sources]['files'][0]
+
+    def test_the_checked_in_project_is_clean(self):
+        self.assertEqual(verify(self.project, check_disk=False), [])
+
+    def test_dangling_reference(self):
+        ref_id = self.project.objects[self.build_id]['fileRef']
+        holders = sorted({holder for holder, _ in self.project.referrers(ref_id)})
+        self.project.remove_object(ref_id)
+        issues = verify(self.project, check_disk=False)
+        dangling = {issue['id']: issue for issue in issues if issue['check'] == 'dangling-reference'}
+        self.assertEqual(sorted(dangling), holders)
+        self.assertIn(self.build_id, dangling)
+        self.assertEqual({issue['ref'] for issue in dangling.values()}, {ref_id})
+        self.assertIn('fileRef', dangling[self.build_id]['message'])
+
+    def test_duplicate_and_orphan_build_files(self):
+        self.project.append(self.sources, 'files', self.build_id)
+        orphan = self.project.add_object(self.project.new_id('orphan'), {
+            'isa': 'PBXBuildFile', 'fileRef': self.project.objects[self.build_id]['fileRef']})
+        issues = verify(self.project, check_disk=False)
+        self.assertEqual(_checks(issues), [('duplicate-build-file', ERROR, self.build_id),
+                                           ('orphan-build-file', WARNING, orphan)])
+        self.assertEqual(summarize(issues), (1, 1))
+
+    def test_missing_file_in_a_build_phase_is_an_error(self):
+        # Only the .xcodeproj is copied, so none of its files exist beside it
+        with tempfile.TemporaryDirectory() as tmp:
+            path = copy_project(tmp)
+            project = load(path)
+            ref_id = project.objects[self.build_id]['fileRef']
+            missing = [issue for issue in verify(project) if issue['check'] == 'missing-file']
+            self.assertIn((ref_id, ERROR), [(issue['id'], issue['severity']) for issue in missing])
@@ -0,0 +1,116 @@
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+from pbxtool import watch
+
+
+class _Script:
+    """A watcher whose wait() replays a script of answers, each taking `step` seconds of a fake clock"""
+
+    kind = 'script'
+
+    def __init__(self, answers, step=0.1):
+        self.answers = list(answers)
+        self.step = step
+        self.now = 0.0
+        self.closed = False
+
+    def monotonic(self):
+        return self.now
+
+    def wait(self, timeout=None):
+        if not self.answers:
+            raise KeyboardInterrupt
+        self.now += self.step
+        return self.answers.pop(0)
+
+    def close(self):
+        self.closed = True
+
+
+class DebounceTest(unittest.TestCase):
+    def run_watch(self, watcher, **options):
+        synced = []
+
+        def sync(*args, **kwargs):
+            synced.append(watcher.now)
+            return [], mock.Mock(listed=0)
+
+        with mock.patch.object(watch, 'open_watcher', return_value=watcher), \
+                mock.patch.object(watch, 'sync', sync), \
+                mock.patch.object(watch.time, 'monotonic', watcher.monotonic):
+            with self.assertRaises(KeyboardInterrupt):
+                watch.watch('Inventry.xcodeproj', log=lambda message: None, **options)
+        self.assertTrue(watcher.closed)
+        return synced
+
+    def test_a_burst_is_synced_once(self):
+        # initial sync; a burst of five events, quiet; another event, quiet
+        watcher = _Script([True, True, True, True, True, False, True, False])
+        self.assertEqual(len(self.run_watch(watcher, debounce=0.5)), 3)
+
+    def test_continuous_activity_is_synced_every_max_delay(self):
+        watcher = _Script([True] * 40, step=0.1)
+        synced = self.run_watch(watcher, debounce=0.5, max_delay=1.0)
+        self.assertEqual(len(synced), 1 + 3)
+        self.assertTrue(all(later - earlier <= 1.2 for earlier, later in zip(synced[1:], synced[2:])))
+
+    def test_a_failing_sync_keeps_watching(self):
+        watcher = _Script([True, False, True, False])
+        calls = []
+
+        def sync(*args, **kwargs):
+            calls.append(1)
+            raise watch.PBXParseError("Unexpected '<<<<<<<'", 10)
+
+        logged = []
+        with mock.patch.object(watch, 'open_watcher', return_value=watcher), \
+                mock.patch.object(watch, 'sync', sync), \
+                mock.patch.object(watch.time, 'monotonic', watcher.monotonic):
+            with self.assertRaises(KeyboardInterrupt):
+                watch.watch('Inventry.xcodeproj', log=logged.append)
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(sum('retrying on the next change' in message for message in logged), 3)
+
+
+class WatcherTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.base = self.tmp.name
+        os.makedirs(os.path.join(self.base, 'Inventry', 'Views'))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def touch(self, path):
+        with open(os.path.join(self.base, 'Inventry', path), 'w') as f:
+            f.write('')
+
+    def check(self, watcher):
+        try:
+            self.touch('notes.txt')
+            self.assertFalse(watcher.wait(0.2))
+            self.touch('Views/A.swift')
+            self.assertTrue(watcher.wait(2))
+            os.makedirs(os.path.join(self.base, 'Inventry', 'New'))
+            self.assertTrue(watcher.wait(2))
+            while watcher.wait(0.1):
+                pass
+            self.touch('New/B.swift')  # in a folder created after the watch started
+            self.assertTrue(watcher.wait(2))
+        finally:
+            watcher.close()
+
+    @unittest.skipUnless(sys.platform.startswith('linux'), "inotify is Linux only")
+    def test_inotify(self):
+        watcher = watch.open_watcher(self.base, 'Inventry')
+        self.assertEqual(watcher.kind, 'inotify')
+        self.check(watcher)
+
+    def test_polling(self):
+        watcher = watch.open_watcher(self.base, 'Inventry', poll=0.05)
+        self.assertEqual(watcher.kind, 'polling')
+        self.check(watcher)
@@ -0,0 +1,190 @@
+"""
+Batch edits: parse once, apply any number of queued mutations, write once
+"""
+import posixpath
+
+from . import profile
+from .project import FILE_TYPES, PHASE_ISAS, load, resolve_path
+from .snapshots import SIZE_LIMIT, SnapshotStore
+from .writer import save
+
+
+class MissingAnchorError(LookupError):
+    """A group, target or build phase an edit depends on does not exist"""
+
+
+class ProjectTransaction:
+    """
+    Queue edits against a project and commit them with a single write.
+
+        with ProjectTransaction('Inventry.xcodeproj') as tx:
+            tx.add_file('Inventry/Services/SyncService.swift')
+            tx.remove_file('Inventry/Views/RoomDetailView_Old.swift')
+
+    Paths are group paths from the main group, ending in the file name.
+    Nothing is read until the transaction is entered (or committed) and
+    nothing is written unless at least one queued edit changed the project.
+
+    With deterministic=True new object IDs are derived from the target,
+    group path and file path instead of drawn at random, so re-running the
+    same edits yields byte-identical output.
+
+    Before writing, the original file is recorded in the snapshot store
+    under label (see pbxtool.snapshots): by default when it is at most
+    SIZE_LIMIT bytes, always with snapshot=True, never with False. With
+    cache=True the parse comes from the on-disk parse cache when the file is
+    unchanged since it was last read (see pbxtool.cache). With
+    create_groups=False a missing group raises MissingAnchorError instead of
+    being created.
+    """
+
+    def __init__(self, path, target=None, deterministic=False, snapshot=None, label='', cache=False,
+                 create_groups=True):
+        self.path = resolve_path(path)
+        self.target_name = target
+        self.deterministic = deterministic
+        self.snapshot = snapshot
+        self.label = label
+        self.cache = cache
+        self.create_groups = create_groups
+        self.project = None
+        self.changes = []
+        self._ops = []
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        return False
+
+    def open(self):
+        if self.project is None:
+            self.project = load(self.path, cache=self.cache, lazy=True)
+            self.project.ids.deterministic = self.deterministic
+        return self.project
+
+    # -- queued operations -----------------------------------------------
+
+    def add_file(self, path, file_type=None, phase=None):
+        """
+        Add a file reference to its group (created if needed) and, for source
+        files, to a build phase; phase='' adds it to none
+        """
+        self._ops.append(('add_file', path, file_type, phase))
+
+    def remove_file(self, path):
+        """Remove a file reference, its build files and its group membership; the change lists every removed object"""
+        self._ops.append(('remove_file', path))
+
+    def add_to_group(self, path, group):
+        """Move an existing file reference into another group (its path attribute is kept as is)"""
+        self._ops.append(('add_to_group', path, group))
+
+    def add_to_phase(self, path, phase='Sources'):
+        """Make sure an existing file reference is built in the given phase"""
+        self._ops.append(('add_to_phase', path, phase))
+
+    # -- commit ----------------------------------------------------------
+
+    def apply(self):
+        """Apply the queued edits to the in-memory model without writing; returns the changes they made"""
+        project = self.open()
+        ops, self._ops = self._ops, []
+        start = len(self.changes)
+        with profile.phase('apply', edits=len(ops)) as p:
+            for op, *args in ops:
+                getattr(self, '_' + op)(project, *args)
+            p.add(objects=len(project.dirty) + len(project.removed))
+        return self.changes[start:]
+
+    def commit(self):
+        """Apply every queued edit to one in-memory model and write the result once"""
+        self.apply()
+        project = self.project
+        if self.changes:
+            snapshot = self.snapshot
+            if snapshot is None:
+                snapshot = project.buffer is not None and len(project.buffer) <= SIZE_LIMIT
+            if snapshot and project.buffer is not None:
+                with profile.phase('snapshot', bytes=len(project.buffer)):
+                    SnapshotStore(self.path).save(project.buffer, self.label)
+            with profile.phase('save'):
+                save(project, self.path)
+        return self.changes
+
+    def _target(self, project):
+        target = project.target(self.target_name)
+        if target is None:
+            raise MissingAnchorError(f"Target {self.target_name or '(first)'} not found")
+        return target
+
+    def _phase(self, project, phase):
+        isa = PHASE_ISAS.get(phase, phase)
+        phase_id = project.build_phase(self._target(project), isa)
+        if phase_id is None:
+            raise MissingAnchorError(f"{phase} build phase not found")
+        return phase_id
+
+    def _group(self, project, group_path, create=False):
+        group_id = project.group(group_path)
+        if group_id is not None or not create:
+            if group_id is None:
+                raise MissingAnchorError(f"Group {group_path} not found")
+            return group_id
+        parent_path, name = posixpath.split(group_path)
+        if not parent_path:
+            raise MissingAnchorError(f"Group {group_path} not found")
+        group_id = project.add_group(self._group(project, parent_path, create=True), name, key=(group_path,))
+        self.changes.append(f"Created group {group_path}")
+        return group_id
+
+    def _file(self, project, path):
+        group_path, name = posixpath.split(path)
+        ref_id = project.find_child(self._group(project, group_path), name)
+        if ref_id is None:
+            raise MissingAnchorError(f"File {path} not found")
+        return ref_id
+
+    def _add_file(self, project, path, file_type, phase):
+        group_path, name = posixpath.split(path)
+        default_type, default_phase = FILE_TYPES.get(posixpath.splitext(name)[1], ('file', None))
+        group_id = self._group(project, group_path, create=self.create_groups)
+        ref_id = project.find_child(group_id, name)
+        if ref_id is None:
+            ref_id = project.add_file_reference(group_id, name, file_type or default_type, key=(path,))
+            self.changes.append(f"Added {path}")
+        if phase is None:
+            phase = default_phase
+        if phase:
+            self._add_ref_to_phase(project, ref_id, path, phase)
+
+    def _remove_file(self, project, path):
+        group_path, name = posixpath.split(path)
+        group_id = project.group(group_path)
+        ref_id = project.find_child(group_id, name) if group_id else None
+        if ref_id is not None:
+            removed = project.remove_file_reference(ref_id)
+            self.changes.append(f"Removed {path}: {project.describe_removal(*removed)}")
+
+    def _add_to_group(self, project, path, group):
+        ref_id = self._file(project, path)
+        old_group = project.group(posixpath.dirname(path))
+        new_group = self._group(project, group, create=self.create_groups)
+        if old_group == new_group:
+            return
+        project.remove_value(old_group, 'children', ref_id)
+        project.append(new_group, 'children', ref_id)
+        self.changes.append(f"Moved {path} to {group}")
+
+    def _add_to_phase(self, project, path, phase):
+        self._add_ref_to_phase(project, self._file(project, path), path, phase)
+
+    def _add_ref_to_phase(self, project, ref_id, path, phase):
+        phase_id = self._phase(project, phase)
+        if not project.build_files_for(ref_id, phase_id):
+            target = project.objects[self._target(project)].get('name')
+            project.add_build_file(phase_id, ref_id, key=(target, phase, path))
+            self.changes.append(f"Added {path} to {phase}")
@@ -0,0 +1,400 @@
+"""
+Dead-source and duplicate-declaration report for the Swift tree.
+
+Every .swift file is lexed for the types it declares at top level, the
+types it extends and every identifier it uses; comments and string
+literals are skipped, string interpolations are not. Files are lexed in a
+process pool, and results are cached in .pbxtool-cache/ by content digest,
+so a repeated run only reads files whose size or mtime changed and only
+lexes those whose content did.
+
+The results are joined with the Sources phase of the target. Starting from
+the entry points (@main, @objc(Name) classes the runtime instantiates by
+name, and any --root files), a type use reaches the files declaring that
+type, preferring compiled ones. Extending a reached type reaches the
+extension's file too. That gives:
+
+- compiled but unreferenced: in Sources, never reached;
+- referenced but not compiled: reached, but not in Sources;
+- dead on disk: neither compiled nor reached, safe to delete;
+- duplicate declarations: a top-level type declared in more than one file.
+
+Type names resolve by name alone, so a type shadowing a framework type or
+only reached through reflection can be misjudged; --root keeps such files.
+"""
+import fnmatch
+import json
+import os
+import posixpath
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+from . import profile
+from .cache import cache_path, digest
+from .project import load, resolve_path
+from .sync import scan
+from .transaction import MissingAnchorError, ProjectTransaction
+from .writer import replace_file
+
+_CACHE_VERSION = 1
+# Below this many files to lex, starting worker processes costs more than it saves
+_POOL_THRESHOLD = 32
+
+_DECLARATIONS = frozenset(['actor', 'class', 'enum', 'protocol', 'struct', 'typealias'])
+_PRIVATE = frozenset(['private', 'fileprivate'])
+_ENTRY_ATTRIBUTES = frozenset(['@main', '@UIApplicationMain', '@NSApplicationMain'])
+
+_TOKEN = re.compile(r'''
+    (?P<space>\s+)
+  | (?P<line>//[^\n]*)
+  | (?P<block>/\*)
+  | (?P<string>(?P<hashes>\#*)(?P<quotes>"""|"))
+  | (?P<attribute>@\w+(?:\(\s*\w+\s*\))?)
+  | (?P<ident>`?[A-Za-z_][A-Za-z0-9_]*`?)
+  | (?P<dot>\.)
+  | (?P<open>[{(\[])
+  | (?P<close>[})\]])
+  | (?P<other>.)
+''', re.X | re.S)
+_BLOCK_PARTS = re.compile(r'/\*|\*/')
+
+
+class _Lexer:
+    """Collects one file's declarations and identifier uses in a single pass"""
+
+    def __init__(self, text):
+        self.text = text
+        self.depth = 0
+        self.declared = []
+        self.hidden = []        # private / fileprivate top-level types
+        self.extends = []
+        self.uses = set()
+        self.entry = []
+        self._string_ends = {}
+
+    def run(self):
+        self.code(0, False)
+        return {
+            'declared': self.declared,
+            'hidden': self.hidden,
+            'extends': self.extends,
+            'uses': sorted(self.uses),
+            'entry': self.entry,
+        }
+
+    def code(self, pos, interpolation):
+        """Lex code from pos; inside an interpolation, stop after its closing parenthesis"""
+        text, uses = self.text, self.uses
+        parens = 0
+        after_dot = False
+        keyword = previous = None
+        modifiers, attributes = [], []
+        match = _TOKEN.match
+        while pos < len(text):
+            m = match(text, pos)
+            kind = m.lastgroup
+            pos = m.end()
+            if kind == 'space' or kind == 'line':
+                continue
+            if kind == 'block':
+                pos = self.comment(pos)
+                continue
+            if kind == 'string':
+                pos = self.string(pos, m.group('quotes'), len(m.group('hashes')))
+            elif kind == 'ident':
+                name = m.group().strip('`')
+                if keyword is not None:
+                    self.declare(keyword, name, modifiers, attributes)
+                    keyword = None
+                    modifiers, attributes = [], []
+                elif (name in _DECLARATIONS or name == 'extension') and previous != 'import':
+                    keyword = name
+                elif name in _PRIVATE:
+                    modifiers.append(name)
+                elif not after_dot:
+                    uses.add(name)
+                previous = name
+            elif kind == 'attribute':
+                attributes.append(m.group())
+            elif kind == 'open':
+                keyword = None
+                modifiers, attributes = [], []
+                if m.group() == '{':
+                    self.depth += 1
+                elif m.group() == '(':
+                    parens += 1
+            elif kind == 'close':
+                keyword = None
+                if m.group() == '}':
+                    self.depth -= 1
+                elif m.group() == ')':
+                    if interpolation and parens == 0:
+                        return pos
+                    parens -= 1
+            after_dot = kind == 'dot'
+        return pos
+
+    def declare(self, keyword, name, modifiers, attributes):
+        if self.depth != 0:
+            return
+        if keyword == 'extension':
+            self.extends.append(name)
+            return
+        (self.hidden if modifiers else self.declared).append(name)
+        for attribute in attributes:
+            if attribute in _ENTRY_ATTRIBUTES or attribute.startswith('@objc('):
+                self.entry.append(f"{attribute} {name}")
+
+    def comment(self, pos):
+        """Skip a block comment, nested ones included"""
+        nesting = 1
+        while nesting:
+            m = _BLOCK_PARTS.search(self.text, pos)
+            if m is None:
+                return len(self.text)
+            nesting += 1 if m.group() == '/*' else -1
+            pos = m.end()
+        return pos
+
+    def string(self, pos, quotes, hashes):
+        """Skip a string literal, lexing the code in its \\( ) interpolations"""
+        key = (quotes, hashes)
+        if key not in self._string_ends:
+            escape = re.escape('\\' + '#' * hashes)
+            self._string_ends[key] = re.compile(f'(?P<escape>{escape}(?P<interpolation>\\()?)|'
+                                                + re.escape(quotes + '#' * hashes))
+        ends = self._string_ends[key]
+        while True:
+            m = ends.search(self.text, pos)
+            if m is None:
+                return len(self.text)
+            if m.group('escape') is None:
+                return m.end()
+            if m.group('interpolation'):
+                pos = self.code(m.end(), True)
+            else:
+                pos = m.end() + 1
+
+
+def lex(text):
+    """{declared, hidden, extends, uses, entry} for one Swift source text"""
+    return _Lexer(text).run()
+
+
+def _lex_file(path):
+    with open(path, 'rb') as f:
+        data = f.read()
+    return digest(data).hex(), lex(data.decode('utf-8', 'replace'))
+
+
+def _stamp(st):
+    return [st.st_size, st.st_mtime_ns, st.st_ino]
+
+
+def lex_tree(base, paths, cache_file=None, jobs=None):
+    """
+    {path: lex() result} for paths relative to base. Unchanged files come
+    from cache_file; the rest are lexed in a process pool of jobs workers
+    when there are enough of them. Returns (results, number lexed).
+    """
+    cache = {}
+    if cache_file and os.path.exists(cache_file):
+        try:
+            with open(cache_file, encoding='utf-8') as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            cache = {}
+        if cache.get('version') != _CACHE_VERSION:
+            cache = {}
+    stamps, by_digest = cache.get('stamps', {}), cache.get('results', {})
+
+    results, digests, stale = {}, {}, []
+    for path in paths:
+        st = os.stat(os.path.join(base, path))
+        known = stamps.get(path)
+        if known and known[:3] == _stamp(st) and known[3] in by_digest:
+            digests[path] = known[3]
+            results[path] = by_digest[known[3]]
+            continue
+        with open(os.path.join(base, path), 'rb') as f:
+            key = digest(f.read()).hex()
+        if key in by_digest:
+            # touched, checked out again or renamed: same content, same result
+            digests[path] = key
+            results[path] = by_digest[key]
+        else:
+            stale.append(path)
+
+    full = [os.path.join(base, path) for path in stale]
+    if len(stale) >= _POOL_THRESHOLD and jobs != 1:
+        with ProcessPoolExecutor(jobs) as pool:
+            lexed = list(pool.map(_lex_file, full, chunksize=max(1, len(full) // (4 * (jobs or os.cpu_count() or 1)))))
+    else:
+        lexed = [_lex_file(path) for path in full]
+    for path, (key, result) in zip(stale, lexed):
+        digests[path] = key
+        results[path] = result
+
+    if cache_file and (stale or stamps.keys() != set(paths)):
+        state = {
+            'version': _CACHE_VERSION,
+            'stamps': {path: _stamp(os.stat(os.path.join(base, path))) + [digests[path]] for path in paths},
+            'results': {digests[path]: results[path] for path in paths},
+        }
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        replace_file(cache_file, [json.dumps(state, separators=(',', ':')).encode('utf-8')], durable=False)
+    return results, len(stale)
+
+
+class Report:
+    """What analyze() found; paths are relative to the folder holding the .xcodeproj"""
+
+    def __init__(self):
+        self.files = 0
+        self.lexed = 0
+        self.compiled = set()
+        self.reached = set()
+        self.entry = {}             # path -> why it is an entry point
+        self.unreferenced = []      # compiled, never reached
+        self.uncompiled = {}        # reached but not compiled -> the names it is needed for
+        self.dead = []              # neither compiled nor reached
+        self.duplicates = {}        # type name -> files declaring it
+
+    def as_dict(self):
+        return {
+            'files': self.files,
+            'lexed': self.lexed,
+            'entry': self.entry,
+            'unreferenced': self.unreferenced,
+            'uncompiled': self.uncompiled,
+            'dead': self.dead,
+            'duplicates': self.duplicates,
+        }
+
+
+def _sources(project, target_id):
+    """{path on disk: (build file ID, file reference ID)} of the Swift files in the target's Sources phase"""
+    phase_id = project.build_phase(target_id)
+    if phase_id is None:
+        raise MissingAnchorError("Sources build phase not found")
+    locations = project.locations()
+    compiled = {}
+    for build_id in project.objects[phase_id].get('files', []):
+        ref = project.objects.get(build_id, {}).get('fileRef')
+        path = locations.get(ref)
+        if path and path.endswith('.swift'):
+            compiled[path] = (build_id, ref)
+    return compiled
+
+
+def _reach(results, compiled, roots):
+    """
+    The set of files reached from roots, and for each file reached outside
+    compiled the names it was reached for
+    """
+    declarers, extenders = {}, {}
+    for path, result in results.items():
+        for name in result['declared']:
+            declarers.setdefault(name, []).append(path)
+        for name in result['extends']:
+            extenders.setdefault(name, []).append(path)
+
+    def targets(name, user):
+        paths = declarers.get(name, ())
+        if user in paths:
+            return ()  # its own declaration shadows any other
+        built = [path for path in paths if path in compiled]
+        return built or paths
+
+    reached, needed = set(roots), {}
+    pending = list(roots)
+    while pending:
+        path = pending.pop()
+        result = results[path]
+        for name in result['uses']:
+            for other in targets(name, path):
+                if other not in compiled:
+                    needed.setdefault(other, set()).add(name)
+                if other not in reached:
+                    reached.add(other)
+                    pending.append(other)
+        # An extension is live with its type, but only one already compiled; others are not needed
+        for name in result['declared']:
+            for other in extenders.get(name, ()):
+                if other in compiled and other not in reached:
+                    reached.add(other)
+                    pending.append(other)
+    return reached, needed
+
+
+def analyze(project, base, directory='Inventry', target=None, roots=(), exclude=(), jobs=None, use_cache=True):
+    """Lex the Swift files under directory and those compiled from elsewhere, then join them with Sources"""
+    target_id = project.target(target)
+    if target_id is None:
+        raise MissingAnchorError(f"Target {target or '(first)'} not found")
+    compiled = _sources(project, target_id)
+    with profile.phase('unused.scan') as p:
+        paths = {path for path in scan(base, directory, None, exclude).files if path.endswith('.swift')}
+        paths.update(path for path in compiled if os.path.isfile(os.path.join(base, path)))
+        paths = sorted(paths)
+        p.add(files=len(paths))
+    cache_file = cache_path(project.path, 'swift-', '.json') if use_cache and project.path else None
+    with profile.phase('unused.lex') as p:
+        results, lexed = lex_tree(base, paths, cache_file, jobs)
+        p.add(files=lexed)
+
+    report = Report()
+    report.files, report.lexed = len(paths), lexed
+    report.compiled = {path for path in compiled if path in results}
+    for path in paths:
+        reasons = list(results[path]['entry'])
+        if any(fnmatch.fnmatchcase(path, pattern) or fnmatch.fnmatchcase(posixpath.basename(path), pattern)
+               for pattern in roots):
+            reasons.append('--root')
+        if reasons and (path in report.compiled or '--root' in reasons):
+            report.entry[path] = ', '.join(reasons)
+    with profile.phase('unused.reach'):
+        report.reached, needed = _reach(results, report.compiled, report.entry)
+    report.unreferenced = sorted(report.compiled - report.reached)
+    report.uncompiled = {path: sorted(names) for path, names in sorted(needed.items())}
+    report.dead = [path for path in paths if path not in report.compiled and path not in report.reached]
+
+    declared = {}
+    for path in paths:
+        for name in results[path]['declared']:
+            declared.setdefault(name, []).append(path)
+    report.duplicates = {name: files for name, files in sorted(declared.items()) if len(files) > 1}
+    return report
+
+
+def fix(project_path, report, target=None, deterministic=False):
+    """
+    Take the unreferenced files out of Sources and add the uncompiled ones,
+    in one transaction. File references and files on disk are left alone.
+    """
+    tx = ProjectTransaction(project_path, target=target, deterministic=deterministic, label='pbxtool unused --fix')
+    project = tx.open()
+    target_id = project.target(target)
+    compiled = _sources(project, target_id)
+    refs = {location: oid for oid, location in project.locations().items()}
+    for path in report.unreferenced:
+        if path in compiled:
+            removed = project.remove_cascade([compiled[path][0]])
+            tx.changes.append(f"Removed {path} from Sources: {project.describe_removal(*removed)}")
+    phase_id = project.build_phase(target_id)
+    target_name = project.objects[target_id].get('name')
+    for path in report.uncompiled:
+        if path in refs:
+            project.add_build_file(phase_id, refs[path], key=(target_name, 'Sources', path))
+            tx.changes.append(f"Added {path} to Sources")
+        else:
+            tx.add_file(path)  # not in the project at all: its group path follows the folders
+    tx.commit()
+    return tx.changes
+
+
+def unused(project_path, directory='Inventry', **options):
+    """analyze() the project at project_path, read through the parse cache"""
+    pbxproj = resolve_path(project_path)
+    base = os.path.dirname(os.path.dirname(os.path.abspath(pbxproj)))
+    return analyze(load(pbxproj, cache=True), base, posixpath.normpath(directory).strip('/'), **options)
@@ -0,0 +1,136 @@
+"""
+Integrity checks for a parsed project, meant to run before xcodebuild or as
+a pre-commit hook.
+
+Dangling references come straight from the reverse-reference index and
+every other check visits each group, build phase and build file once, so
+the cost is O(objects), plus one lstat per file when on-disk checks are
+enabled.
+"""
+import os
+
+from . import profile
+from .project import BUILD_PHASE_NAMES
+
+ERROR = 'error'
+WARNING = 'warning'
+
+# isas that stand for a file on disk
+_FILE_ISAS = ('PBXFileReference', 'PBXVariantGroup', 'XCVersionGroup')
+
+
+def verify(project, check_disk=True):
+    """
+    Return a list of issues, each a dict with check, severity ('error' or
+    'warning'), id, isa and message, plus ref / path where relevant.
+    """
+    with profile.phase('verify', objects=len(project.objects)):
+        return _verify(project, check_disk)
+
+
+def _verify(project, check_disk):
+    objects = project.objects
+    issues = []
+
+    def report(check, severity, oid, message, **extra):
+        obj = objects.get(oid) or {}
+        issues.append(dict(check=check, severity=severity, id=oid, isa=obj.get('isa'), message=message, **extra))
+
+    root_id = project.root.get('rootObject')
+    if root_id not in objects:
+        report('dangling-reference', ERROR, None, f"rootObject points to missing object {root_id}", ref=root_id)
+        return issues
+
+    for holder, key, ref in project.unresolved():
+        isa = objects[holder]['isa']
+        report('dangling-reference', ERROR, holder, f"{isa} {holder} {key} points to missing object {ref}", ref=ref)
+
+    parents = {}
+    for isa in ('PBXGroup',) + _FILE_ISAS:
+        for oid, obj in project.objects_of(isa).items():
+            for child in obj.get('children', ()):
+                parents.setdefault(child, []).append(oid)
+
+    phases_of = {}
+    for isa in project.isas():
+        if not isa.endswith('BuildPhase'):
+            continue
+        for phase_id, phase in project.objects_of(isa).items():
+            seen_builds, seen_refs = set(), {}
+            for build_id in phase.get('files', ()):
+                if build_id in seen_builds:
+                    report('duplicate-build-file', ERROR, build_id,
+                           f"PBXBuildFile {build_id} is listed twice in {_phase_name(phase)}", phase=phase_id)
+                    continue
+                seen_builds.add(build_id)
+                phases_of.setdefault(build_id, []).append(phase_id)
+                build = objects.get(build_id, {})
+                ref = build.get('fileRef') or build.get('productRef')
+                if ref is None:
+                    continue
+                if ref in seen_refs:
+                    report('duplicate-build-file', ERROR, build_id,
+                           f"{_name(project, ref)} is built twice in {_phase_name(phase)} "
+                           f"({seen_refs[ref]} and {build_id})", ref=ref, phase=phase_id)
+                else:
+                    seen_refs[ref] = build_id
+
+    for oid, obj in project.objects_of('PBXBuildFile').items():
+        if 'fileRef' not in obj and 'productRef' not in obj:
+            report('empty-build-file', ERROR, oid, f"PBXBuildFile {oid} has neither fileRef nor productRef")
+        phases = phases_of.get(oid, ())
+        if not phases:
+            report('orphan-build-file', WARNING, oid,
+                   f"PBXBuildFile {oid} ({_name(project, obj.get('fileRef'))}) is in no build phase")
+        elif len(phases) > 1:
+            report('duplicate-build-file', ERROR, oid,
+                   f"PBXBuildFile {oid} is shared by {len(phases)} build phases", phases=phases)
+
+    for isa in ('PBXGroup',) + _FILE_ISAS:
+        for oid in project.objects_of(isa):
+            owners = parents.get(oid, ())
+            if not owners and oid != project.main_group:
+                report('orphan-group' if isa == 'PBXGroup' else 'orphan-file-reference', WARNING, oid,
+                       f"{isa} {oid} ({_name(project, oid)}) is not in any group")
+            elif len(owners) > 1:
+                report('multiple-parents', WARNING, oid,
+                       f"{isa} {oid} ({_name(project, oid)}) is in {len(owners)} groups", parents=owners)
+
+    if check_disk and project.path:
+        _check_disk(project, phases_of, report)
+    return issues
+
+
+def _check_disk(project, phases_of, report):
+    """Every reachable file and group folder must exist relative to the folder holding the .xcodeproj"""
+    base = os.path.dirname(os.path.dirname(os.path.abspath(project.path)))
+    for oid, location in project.locations().items():
+        obj = project.objects[oid]
+        if obj['isa'] == 'PBXGroup':
+            if 'path' in obj and not os.path.isdir(os.path.join(base, location)):
+                report('missing-folder', WARNING, oid, f"Group {_name(project, oid)} points to missing folder {location}/",
+                       path=location)
+        elif not os.path.lexists(os.path.join(base, location)):
+            built = any(key == 'fileRef' and holder in phases_of for holder, key in project.referrers(oid))
+            report('missing-file', ERROR if built else WARNING, oid,
+                   f"{location} does not exist" + (" but is in a build phase" if built else ""), path=location)
+
+
+def _name(project, oid):
+    if oid not in project.objects:
+        return oid
+    return project.display_name(oid) or oid
+
+
+def _phase_name(phase):
+    return phase.get('name') or BUILD_PHASE_NAMES.get(phase['isa'], phase['isa'])
+
+
+def summarize(issues):
+    errors = sum(issue['severity'] == ERROR for issue in issues)
+    return errors, len(issues) - errors
+
+
+def format_issue(issue):
+    icon = '❌' if issue['severity'] == ERROR else '⚠️ '
+    return f"{icon} [{issue['check']}] {issue['message']}"
@@ -0,0 +1,211 @@
+"""
+Watch mode: keep the project in step with a folder as files come and go.
+
+Events come from inotify (through ctypes, Linux only) or, where that is not
+available, from polling directory mtimes. A burst of events (a git checkout
+touching hundreds of files) is collected until the folder has been quiet for
+the debounce interval, then reconciled with one sync, i.e. one transaction
+and at most one write. Content edits are not watched since they never
+change the project.
+"""
+import ctypes
+import ctypes.util
+import errno
+import os
+import posixpath
+import select
+import struct
+import sys
+import time
+
+from .parser import PBXParseError
+from .project import resolve_path
+from .sync import is_excluded, is_tracked, scan, sync
+from .transaction import MissingAnchorError
+
+# inotify(7)
+_IN_MOVED_FROM = 0x40
+_IN_MOVED_TO = 0x80
+_IN_CREATE = 0x100
+_IN_DELETE = 0x200
+_IN_DELETE_SELF = 0x400
+_IN_MOVE_SELF = 0x800
+_IN_Q_OVERFLOW = 0x4000
+_IN_IGNORED = 0x8000
+_IN_ONLYDIR = 0x1000000
+_IN_ISDIR = 0x40000000
+_IN_NONBLOCK = os.O_NONBLOCK
+_IN_CLOEXEC = getattr(os, 'O_CLOEXEC', 0o2000000)
+_MASK = (_IN_CREATE | _IN_DELETE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_DELETE_SELF | _IN_MOVE_SELF
+         | _IN_ONLYDIR)
+_EVENT = struct.Struct('iIII')
+
+DEFAULT_DEBOUNCE = 0.5
+DEFAULT_POLL = 1.0
+
+
+class InotifyWatcher:
+    """One inotify watch per directory below base/directory, added as directories appear"""
+
+    kind = 'inotify'
+
+    def __init__(self, base, directory, exclude=()):
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.base = base
+        self.exclude = exclude
+        self.paths = {}
+        try:
+            self._watch_tree(directory)
+        except OSError:
+            os.close(self.fd)
+            raise
+
+    def _watch_tree(self, rel):
+        stack = [rel]
+        while stack:
+            rel = stack.pop()
+            wd = self._add_watch(self.fd, os.fsencode(os.path.join(self.base, rel)), _MASK)
+            if wd < 0:
+                code = ctypes.get_errno()
+                if code in (errno.ENOENT, errno.ENOTDIR):
+                    continue  # gone again before we got to it; the next sync sees that
+                raise OSError(code, f"inotify_add_watch {rel}: {os.strerror(code)}")
+            self.paths[wd] = rel
+            with os.scandir(os.path.join(self.base, rel)) as entries:
+                for entry in entries:
+                    path = rel + '/' + entry.name
+                    if entry.is_dir(follow_symlinks=False) and not entry.name.startswith('.') \
+                            and not is_tracked(entry.name) and not is_excluded(path, self.exclude):
+                        stack.append(path)
+
+    def wait(self, timeout=None):
+        """Block up to timeout seconds (None: forever); True if something relevant happened"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if deadline is None else max(0, deadline - time.monotonic())
+            if not select.select([self.fd], [], [], remaining)[0]:
+                return False
+            if self._drain():
+                return True
+
+    def _drain(self):
+        relevant = False
+        try:
+            data = os.read(self.fd, 1 << 16)
+        except BlockingIOError:
+            return False
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _EVENT.unpack_from(data, offset)
+            name = data[offset + _EVENT.size:offset + _EVENT.size + length].rstrip(b'\0').decode('utf-8', 'replace')
+            offset += _EVENT.size + length
+            if mask & _IN_Q_OVERFLOW:
+                relevant = True
+            elif mask & _IN_IGNORED:
+                self.paths.pop(wd, None)
+            elif mask & (_IN_DELETE_SELF | _IN_MOVE_SELF):
+                relevant = True
+            elif wd in self.paths and not name.startswith('.'):
+                path = self.paths[wd] + '/' + name
+                if mask & _IN_ISDIR and not is_tracked(name):
+                    relevant = True
+                    if mask & (_IN_CREATE | _IN_MOVED_TO) and not is_excluded(path, self.exclude):
+                        self._watch_tree(path)
+                elif is_tracked(name):
+                    relevant = True
+        return relevant
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """Re-stat every directory each interval; only directories whose mtime changed are listed"""
+
+    kind = 'polling'
+
+    def __init__(self, base, directory, exclude=(), interval=DEFAULT_POLL):
+        self.base = base
+        self.directory = directory
+        self.exclude = exclude
+        self.interval = interval
+        self.tree = scan(base, directory, None, exclude)
+
+    def wait(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            tree = scan(self.base, self.directory, self.tree.state, self.exclude)
+            changed = tree.files != self.tree.files or tree.dirs != self.tree.dirs
+            self.tree = tree
+            if changed:
+                return True
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(self.interval if deadline is None else
+                       max(0, min(self.interval, deadline - time.monotonic())))
+
+    def close(self):
+        pass
+
+
+def open_watcher(base, directory, exclude=(), poll=None):
+    """inotify where it works, else polling every poll (or DEFAULT_POLL) seconds"""
+    if poll is None and sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher(base, directory, exclude)
+        except (OSError, AttributeError):
+            pass  # no inotify, or out of watches (fs.inotify.max_user_watches)
+    return PollingWatcher(base, directory, exclude, poll or DEFAULT_POLL)
+
+
+def watch(project_path, directory='Inventry', debounce=DEFAULT_DEBOUNCE, poll=None, log=print,
+          max_delay=None, **options):
+    """
+    Sync once, then again after every burst of changes below directory, until
+    interrupted. options are passed to sync(). A burst ends once nothing has
+    happened for debounce seconds, or after max_delay (default: ten debounce
+    intervals) of continuous activity, so the project is written at most
+    once per window.
+    """
+    pbxproj = resolve_path(project_path)
+    base = os.path.dirname(os.path.dirname(os.path.abspath(pbxproj)))
+    directory = posixpath.normpath(directory).strip('/')
+    max_delay = max_delay or debounce * 10
+
+    def reconcile():
+        started = time.perf_counter()
+        try:
+            changes, tree = sync(project_path, directory, **options)
+        except MissingAnchorError as e:
+            log(f"❌ {e}")
+            return
+        except (PBXParseError, OSError) as e:
+            # e.g. conflict markers during a rebase, or a file gone between the event and its stat
+            log(f"❌ {e} (retrying on the next change)")
+            return
+        except Exception as e:
+            log(f"❌ {type(e).__name__}: {e} (retrying on the next change)")
+            return
+        for change in changes:
+            log(f"✅ {change}")
+        if changes:
+            log(f"💾 {len(changes)} changes written in one transaction "
+                f"({(time.perf_counter() - started) * 1e3:.0f} ms, {tree.listed} folders listed)")
+
+    reconcile()
+    watcher = open_watcher(base, directory, options.get('exclude', ()), poll)
+    log(f"👀 Watching {directory}/ ({watcher.kind}, {debounce:g}s debounce)")
+    try:
+        while True:
+            watcher.wait(None)
+            burst = time.monotonic()
+            while time.monotonic() - burst < max_delay and watcher.wait(debounce):
+                pass
+            reconcile()
+    finally:
+        watcher.close()
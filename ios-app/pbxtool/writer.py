@@ -0,0 +1,271 @@
+"""
+Span-preserving incremental writer.
+
+The original project.pbxproj stays memory-mapped after parsing. A save
+copies every untouched byte range straight from the mapping and splices in
+freshly serialized text only for objects that were added, changed or
+removed, so an edit costs O(edit size) in serialization and leaves the
+rest of the file (and its git diff) exactly as it was. Full writes stream
+the serializer's output a chunk at a time instead.
+
+Every write goes to a temporary file that is fsynced and then renamed over
+the original, so a crash leaves either the old project or the new one.
+"""
+import bisect
+import os
+import tempfile
+
+from . import profile
+from .parser import Layout, parse_layout, scan_layout
+from .project import map_file
+from .serializer import dump_chunks, object_writer
+
+
+class _Edit:
+    """
+    Replace buf[start:end] with pieces, a list of (kind, name, text) where
+    kind is 'object' (name is the ID), 'begin'/'end' (name is the section
+    isa) or 'raw'.
+    """
+
+    __slots__ = ('start', 'end', 'pieces')
+
+    def __init__(self, start, end, pieces):
+        self.start = start
+        self.end = end
+        self.pieces = pieces
+
+
+def _plan(project):
+    layout = project.layout
+    spans, sections = layout.spans, layout.sections
+    render = object_writer(project)
+    edits = []
+    emptied = {isa for isa in sections if not project.has_objects(isa)}
+
+    for oid in project.removed:
+        if oid in spans:
+            start, end = spans[oid]
+            edits.append(_Edit(start, end, []))
+
+    added = {}
+    for oid in project.dirty:
+        if oid in spans:
+            start, end = spans[oid]
+            edits.append(_Edit(start, end, [('object', oid, render(oid))]))
+        else:
+            added.setdefault(project.objects[oid]['isa'], []).append(oid)
+
+    for isa, oids in added.items():
+        oids.sort()
+        if isa in sections:
+            order = layout.order.get(isa, [])
+            inserts = {}
+            for oid in oids:
+                i = bisect.bisect_left(order, oid)
+                pos = spans[order[i]][0] if i < len(order) else sections[isa][1][0]
+                inserts.setdefault(pos, []).append(('object', oid, render(oid)))
+            edits.extend(_Edit(pos, pos, pieces) for pos, pieces in inserts.items())
+            continue
+        # A section that does not exist yet goes before the next one alphabetically
+        later = [name for name in sections if name > isa and name not in emptied]
+        pieces = [('begin', isa, f"/* Begin {isa} section */\n")]
+        pieces += [('object', oid, render(oid)) for oid in oids]
+        pieces.append(('end', isa, f"/* End {isa} section */\n"))
+        if later:
+            pos = sections[min(later)][0][0]
+            pieces.append(('raw', None, "\n"))
+        else:
+            pos = layout.objects_end
+            pieces.insert(0, ('raw', None, "\n"))
+        edits.append(_Edit(pos, pos, pieces))
+
+    # Sections left with no objects are dropped together with their blank line
+    for isa in emptied:
+        begin, end = sections[isa]
+        start = begin[0] - 1 if project.buffer[begin[0] - 2:begin[0]] == b'\n\n' else begin[0]
+        edits = [e for e in edits if not (start <= e.start and e.end <= end[1])]
+        edits.append(_Edit(start, end[1], []))
+
+    edits.sort(key=lambda e: (e.start, e.end))
+    return edits
+
+
+class _Rebased(Layout):
+    """
+    The Layout of a written file. Shifting every object's span costs a pass
+    over the whole project, so it is done the first time spans is read: a
+    one-off edit never reads it, a resident project does on its next edit.
+    """
+
+    def __init__(self, shift_spans):
+        super().__init__()
+        self._spans, self._shift_spans = None, shift_spans
+
+    @property
+    def spans(self):
+        if self._spans is None:
+            self._spans, self._shift_spans = self._shift_spans(), None
+        return self._spans
+
+    @spans.setter
+    def spans(self, spans):
+        self._spans = spans
+
+
+def _rebase(layout, edits, placed, removed, emptied):
+    """Compute the Layout of the written file from the old one and the applied edits"""
+    ends, deltas, total = [], [], 0
+    for edit, length in edits:
+        total += length - (edit.end - edit.start)
+        ends.append(edit.end)
+        deltas.append(total)
+
+    def shift(span):
+        # Text inserted exactly at a boundary lands after whatever ends there
+        # and before whatever starts there.
+        i = bisect.bisect_right(ends, span[0])
+        j = bisect.bisect_left(ends, span[1])
+        return (span[0] + (deltas[i - 1] if i else 0), span[1] + (deltas[j - 1] if j else 0))
+
+    def shift_spans():
+        spans = {oid: shift(span) for oid, span in layout.spans.items() if oid not in placed and oid not in removed}
+        spans.update(placed)
+        return spans
+
+    placed, removed = dict(placed), set(removed)  # the project's own sets are cleared once it is saved
+    new = _Rebased(shift_spans)
+    for isa, (begin, end) in layout.sections.items():
+        if isa not in emptied:
+            new.sections[isa] = [shift(begin), shift(end)]
+    new.objects_start = layout.objects_start
+    new.objects_end = shift((layout.objects_end, layout.objects_end))[0]
+    return new
+
+
+def splice(project, buf):
+    """
+    Return (chunks, layout): the new file contents as a list of zero-copy
+    slices of buf (a memoryview of the original mapping) interleaved with
+    new fragments, and the byte layout of the result.
+    """
+    layout = project.layout
+    chunks, applied, placed, new_sections = [], [], {}, {}
+    prev = out = 0
+    for edit in _plan(project):
+        if edit.start > prev:
+            chunks.append(buf[prev:edit.start])
+            out += edit.start - prev
+        length = 0
+        for kind, name, text in edit.pieces:
+            data = text.encode('utf-8')
+            chunks.append(data)
+            span = (out + length, out + length + len(data))
+            if kind == 'object':
+                placed[name] = span
+            elif kind != 'raw':
+                new_sections.setdefault(name, [None, None])[kind == 'end'] = span
+            length += len(data)
+        applied.append((edit, length))
+        out += length
+        prev = edit.end
+    chunks.append(buf[prev:])
+
+    emptied = {isa for isa in layout.sections if not project.has_objects(isa)}
+    new_layout = _rebase(layout, applied, placed, project.removed, emptied)
+    new_layout.sections.update(new_sections)
+    for isa, oids in layout.order.items():
+        new_layout.order[isa] = [oid for oid in oids if oid not in project.removed]
+    for oid in project.dirty:
+        if oid not in layout.spans:
+            bisect.insort(new_layout.order.setdefault(project.objects[oid]['isa'], []), oid)
+    return chunks, new_layout
+
+
+def replace_file(path, chunks, durable=True):
+    """
+    Write chunks (any iterable of bytes) to a temporary file beside path and
+    rename it into place, so readers see either the old file or the new one
+    and never a truncated one. With durable=True the data, then the rename,
+    are flushed to disk before returning.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(prefix='.' + os.path.basename(path) + '.', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.writelines(chunks)
+            if durable:
+                f.flush()
+                os.fsync(f.fileno())
+        if os.path.exists(path):
+            os.chmod(tmp, os.stat(path).st_mode & 0o7777)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    if durable:
+        _fsync_directory(directory)
+
+
+def _fsync_directory(directory):
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return  # not possible on every platform (Windows)
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def is_canonical(project):
+    """True if the project's file is already byte for byte what a full write would produce"""
+    buf, offset = project.buffer, 0
+    for chunk in dump_chunks(project):
+        if buf[offset:offset + len(chunk)] != chunk:
+            return False
+        offset += len(chunk)
+    return offset == len(buf)
+
+
+def _counted(chunks, phase):
+    for chunk in chunks:
+        phase.add(bytes=len(chunk))
+        yield chunk
+
+
+def save(project, path=None, full=False):
+    """
+    Write the project back. If it was loaded from the same file only the
+    changed objects are re-serialized; otherwise, or with full=True, the
+    whole graph is streamed out in canonical order.
+    """
+    path = path or project.path
+    if full or project.buffer is None or path != project.path:
+        with profile.phase('write.full', objects=len(project.objects)) as p:
+            replace_file(path, _counted(dump_chunks(project), p))
+        if path == project.path and project.buffer is not None:
+            # Remap the new text; its layout comes from the section markers alone
+            old, buffer = project.buffer, map_file(path)
+            project.mark_saved(buffer, scan_layout(buffer) or parse_layout(buffer)[1])
+            old.close()
+        elif project.buffer is None:
+            project.mark_saved()
+        return
+    buf = memoryview(project.buffer)
+    chunks = []
+    try:
+        with profile.phase('splice', objects=len(project.dirty) + len(project.removed)):
+            chunks, layout = splice(project, buf)
+        with profile.phase('write', bytes=sum(map(len, chunks))):
+            replace_file(path, chunks)
+    finally:
+        for chunk in chunks:
+            if isinstance(chunk, memoryview):
+                chunk.release()
+        buf.release()
+    old = project.buffer
+    project.mark_saved(map_file(path), layout)
+    old.close()